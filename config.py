@@ -9,18 +9,136 @@ class Settings:
     POSTGRES_PASSWORD: str = os.environ.get("POSTGRES_PASSWORD")
     POSTGRES_DB: str = os.environ.get("POSTGRES_DB")
     POSTGRES_PORT: int = os.environ.get("POSTGRES_PORT")
+    # Реплики через запятую в формате host:port, например "pg-r1:5432,pg-r2:5432"
+    POSTGRES_REPLICA_SERVERS: str = os.environ.get("POSTGRES_REPLICA_SERVERS") or ""
+    POSTGRES_REPLICA_MAX_LAG: float = float(
+        os.environ.get("POSTGRES_REPLICA_MAX_LAG") or 5
+    )
+    POSTGRES_REPLICA_CHECK_INTERVAL: float = float(
+        os.environ.get("POSTGRES_REPLICA_CHECK_INTERVAL") or 10
+    )
+    # Сколько секунд ждать ответа реплики при проверке отставания
+    POSTGRES_REPLICA_CHECK_TIMEOUT: float = float(
+        os.environ.get("POSTGRES_REPLICA_CHECK_TIMEOUT") or 2
+    )
+    REL_DB_MAX_ENGINES: int = int(os.environ.get("REL_DB_MAX_ENGINES") or 16)
+    REL_DB_ENGINE_TTL: float = float(os.environ.get("REL_DB_ENGINE_TTL") or 600)
+    REL_DB_POOL_SIZE: int = int(os.environ.get("REL_DB_POOL_SIZE") or 5)
+    # Общий лимит соединений ко всем внешним БД из одного процесса
+    REL_DB_MAX_CONNECTIONS: int = int(os.environ.get("REL_DB_MAX_CONNECTIONS") or 20)
     MINIO_BACK_HOST: str = os.environ.get("MINIO_BACK_HOST")
+    MINIO_ACCESS_KEY: str = os.environ.get("MINIO_ACCESS_KEY")
+    MINIO_SECURE: bool = os.environ.get("MINIO_SECURE", "false").lower() == "true"
+    MINIO_TIERING_WORKERS: int = int(os.environ.get("MINIO_TIERING_WORKERS") or 16)
+    # Операций в секунду на один бакет
+    MINIO_BUCKET_RATE_LIMIT: float = float(
+        os.environ.get("MINIO_BUCKET_RATE_LIMIT") or 50
+    )
+    MINIO_MULTIPART_COPY_PART_SIZE: int = int(
+        os.environ.get("MINIO_MULTIPART_COPY_PART_SIZE") or 512 * 1024 * 1024
+    )
     BUCKET_FOR_COPY: str = os.environ.get("BUCKET_FOR_COPY")
     ES_HOST: str = os.environ.get("ES_HOST")
     ES_PORT: int = os.environ.get("ES_PORT")
+    ES_FILE_INDEX: str = os.environ.get("ES_FILE_INDEX") or "file_list"
+    ES_SYNC_BATCH_SIZE: int = int(os.environ.get("ES_SYNC_BATCH_SIZE") or 1000)
+    ES_SYNC_CONCURRENCY: int = int(os.environ.get("ES_SYNC_CONCURRENCY") or 4)
+    ES_SYNC_MAX_RETRIES: int = int(os.environ.get("ES_SYNC_MAX_RETRIES") or 3)
+    # Сколько секунд до водяного знака перечитывать при синхронизации: строки,
+    # закоммиченные позже, но с более ранним updateDate. Не меньше самой
+    # долгой транзакции записи в FileList и расхождения часов серверов api
+    ES_SYNC_SAFETY_WINDOW: float = float(
+        os.environ.get("ES_SYNC_SAFETY_WINDOW") or 300
+    )
     REDIS_HOST: str = os.environ.get("REDIS_HOST", "redis")
     REDIS_PORT: int = 6379
+    # Брокер Celery; по умолчанию redis://:REDIS_PASSWORD@REDIS_HOST:REDIS_PORT/0
+    CELERY_BROKER_URL: str = os.environ.get("CELERY_BROKER_URL") or ""
+    ROLE2_FILE_TYPE_JOB_CHUNK_SIZE: int = int(
+        os.environ.get("ROLE2_FILE_TYPE_JOB_CHUNK_SIZE") or 5000
+    )
+    # Сколько хранится ответ на запрос с Idempotency-Key
+    IDEMPOTENCY_TTL: int = int(os.environ.get("IDEMPOTENCY_TTL") or 24 * 60 * 60)
+    # Не меньше таймаута воркера gunicorn: пока жив запрос, жива его блокировка
+    IDEMPOTENCY_LOCK_TTL: int = int(os.environ.get("IDEMPOTENCY_LOCK_TTL") or 600)
+    IDEMPOTENCY_WAIT_TIMEOUT: float = float(
+        os.environ.get("IDEMPOTENCY_WAIT_TIMEOUT") or 60
+    )
+    # Сколько секунд помнить, что объекта нет (0 - не кэшировать промахи)
+    NEGATIVE_CACHE_TTL: float = float(os.environ.get("NEGATIVE_CACHE_TTL") or 5)
+    NEGATIVE_CACHE_MAX_SIZE: int = int(
+        os.environ.get("NEGATIVE_CACHE_MAX_SIZE") or 10000
+    )
+    DICTIONARY_CACHE_TTL: float = float(os.environ.get("DICTIONARY_CACHE_TTL") or 30)
+    NSI_CACHE_MAX_DELTAS: int = int(os.environ.get("NSI_CACHE_MAX_DELTAS") or 256)
+    REFERENCE_SNAPSHOT_DIR: str = (
+        os.environ.get("REFERENCE_SNAPSHOT_DIR") or "/dev/shm/uis_reference"
+    )
+    REFERENCE_SNAPSHOT_TTL: float = float(
+        os.environ.get("REFERENCE_SNAPSHOT_TTL") or 60
+    )
+    REFERENCE_DATA_MAX_AGE: int = int(os.environ.get("REFERENCE_DATA_MAX_AGE") or 300)
+    FILE_INGEST_BATCH_SIZE: int = int(os.environ.get("FILE_INGEST_BATCH_SIZE") or 5000)
+    FILE_EXPORT_CHUNK_SIZE: int = int(os.environ.get("FILE_EXPORT_CHUNK_SIZE") or 2000)
+    REQUEST_TIMEOUT: float = float(os.environ.get("REQUEST_TIMEOUT") or 60)
+    ADMISSION_DEFAULT_CONCURRENCY: int = int(
+        os.environ.get("ADMISSION_DEFAULT_CONCURRENCY") or 32
+    )
+    ADMISSION_DEFAULT_QUEUE: int = int(os.environ.get("ADMISSION_DEFAULT_QUEUE") or 64)
+    ADMISSION_QUEUE_TIMEOUT: float = float(
+        os.environ.get("ADMISSION_QUEUE_TIMEOUT") or 5
+    )
+    # "путь=параллельность:очередь[:таймаут];...", дополняет ROUTE_LIMITS
+    ADMISSION_ROUTE_LIMITS: str = os.environ.get("ADMISSION_ROUTE_LIMITS") or ""
+    # Профилирование запросов (src/profiling.py); без ключа и при нулевой
+    # доле выборки выключено
+    PROFILE_SECRET_KEY: str = os.environ.get("PROFILE_SECRET_KEY") or ""
+    PROFILE_SAMPLE_RATE: float = float(os.environ.get("PROFILE_SAMPLE_RATE") or 0)
+    PROFILE_INTERVAL: float = float(os.environ.get("PROFILE_INTERVAL") or 0.005)
+    PROFILE_MAX_ACTIVE: int = int(os.environ.get("PROFILE_MAX_ACTIVE") or 2)
+    PROFILE_DIR: str = os.environ.get("PROFILE_DIR") or "logs/profiles"
+    # speedscope или pstats
+    PROFILE_FORMAT: str = os.environ.get("PROFILE_FORMAT") or "speedscope"
+    PROFILE_MAX_STATEMENT_LENGTH: int = int(
+        os.environ.get("PROFILE_MAX_STATEMENT_LENGTH") or 2000
+    )
+    # Доля вызовов верхнего уровня под @trace, которые пишутся в лог
+    TRACE_SAMPLE_RATE: float = float(os.environ.get("TRACE_SAMPLE_RATE") or 0.01)
+    TRACE_MAX_ARG_LENGTH: int = int(os.environ.get("TRACE_MAX_ARG_LENGTH") or 200)
+    # Лог запросов (LoggingMiddleware): text или json (одна строка orjson)
+    LOG_FORMAT: str = os.environ.get("LOG_FORMAT") or "text"
+    # Доля успешных быстрых запросов в логе; ошибки и медленные пишутся всегда
+    LOG_SAMPLE_RATE: float = float(os.environ.get("LOG_SAMPLE_RATE") or 1)
+    # "путь=доля;...", дополняет LOG_SAMPLE_RATES
+    LOG_ROUTE_SAMPLE_RATES: str = os.environ.get("LOG_ROUTE_SAMPLE_RATES") or ""
+    LOG_SLOW_REQUEST: float = float(os.environ.get("LOG_SLOW_REQUEST") or 1)
+    LOG_ERROR_STATUS: int = int(os.environ.get("LOG_ERROR_STATUS") or 500)
+    LOG_BODY_MAX_BYTES: int = int(os.environ.get("LOG_BODY_MAX_BYTES") or 4096)
+    LOG_REDACT_HEADERS: str = (
+        os.environ.get("LOG_REDACT_HEADERS")
+        or "authorization,proxy-authorization,cookie,set-cookie,x-api-key,x-profile"
+    )
+    LOG_REDACT_FIELDS: str = (
+        os.environ.get("LOG_REDACT_FIELDS")
+        or "password,passwd,secret,secret_key,token,access_token,refresh_token"
+    )
+    # Размер блока сжатого сегмента лога (src/log_segments.py), байт
+    LOG_SEGMENT_BLOCK_SIZE: int = int(
+        os.environ.get("LOG_SEGMENT_BLOCK_SIZE") or 256 * 1024
+    )
+    # Сколько секунд сегмент не должен меняться перед сжатием: воркеры,
+    # еще не заметившие ротацию, дописывают в старый файл
+    LOG_SEGMENT_GRACE: float = float(os.environ.get("LOG_SEGMENT_GRACE") or 5)
     AUTH_URL: str = os.environ.get("AUTH_URL")
     MINIO_SECRET_KEY: str = os.environ.get("MINIO_SECRET_KEY")
     NIFI_SECRET_KEY: str = os.environ.get("NIFI_SECRET_KEY")
     OTHER_SERVICE_SECRET_KEY: str = os.environ.get("OTHER_SERVICE_SECRET_KEY")
     REDIS_PASSWORD: str = os.environ.get("REDIS_PASSWORD")
     FTP_SECRET_KEY: str = os.environ.get("FTP_SECRET_KEY")
+    FTP_POOL_SIZE: int = int(os.environ.get("FTP_POOL_SIZE") or 4)
+    FTP_DOWNLOAD_BLOCK_SIZE: int = int(
+        os.environ.get("FTP_DOWNLOAD_BLOCK_SIZE") or 1024 * 1024
+    )
     REQUEST_MINIO_SECRET: str = os.environ.get("REQUEST_MINIO_SECRET")
     BUCKET_FOR_UPLOAD: str = os.environ.get("BUCKET_FOR_UPLOAD")
     PLICANTE_API: str = os.environ.get("PLICANTE_API")
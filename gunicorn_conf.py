@@ -0,0 +1,34 @@
+# Боевой режим запуска: gunicorn -c gunicorn_conf.py main:app
+#
+# Приложение со всеми импортами загружается один раз в мастер-процессе,
+# кэши прогреваются до fork, а воркеры получают их как общие страницы памяти.
+# Для разработки по-прежнему используется команда из docker-compose.yml с --reload.
+import os
+
+bind = os.environ.get("GUNICORN_BIND") or "0.0.0.0:8000"
+workers = int(os.environ.get("GUNICORN_WORKERS") or 10)
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = 600
+# GUNICORN_PRELOAD=0 - старое поведение, каждый воркер импортирует приложение сам
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") != "0"
+
+
+def when_ready(server) -> None:
+    # Вызывается в мастере после загрузки приложения и до запуска воркеров
+    if not preload_app:
+        return
+    from src.startup import prepare_master
+
+    try:
+        prepare_master()
+    except Exception as e:
+        # Без прогрева воркеры заполнят кэши при первых запросах
+        server.log.warning("Cache warm-up failed: %s", e)
+
+
+def post_fork(server, worker) -> None:
+    if not preload_app:
+        return
+    from src.startup import reset_after_fork
+
+    reset_after_fork()
@@ -4,12 +4,34 @@ from typing import AsyncGenerator
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from src.setup_logger import setup_logger
+from src.api.services.file_search_index import close_es_client
+from src.api.services.redis_client import close_redis_client
+from src.api.services.rel_db_engines import rel_db_engines
 
-from src.api.routers import role2_file_type_routers
+from src.api.routers import (
+    role2_file_type_routers,
+    dictionary_routers,
+    nsi_value_routers,
+    file_meta_routers,
+    file_ingest_routers,
+    file_export_routers,
+    file_search_routers,
+    bucket_tiering_routers,
+    ftp_ingest_routers,
+    rel_db_routers,
+    directory_stats_routers,
+    file_access_routers,
+    reference_data_routers,
+    negative_cache_routers,
+)
 
 from src.middleware import (
+    AdmissionControlMiddleware,
     CatchExceptionsMiddleware,
+    IdempotencyMiddleware,
     LoggingMiddleware,
+    ProfilingMiddleware,
+    RequestIdMiddleware,
 )
 
 
@@ -20,6 +42,9 @@ os.environ["TZ"] = "Europe/Moscow"
 async def lifespan(app: FastAPI) -> AsyncGenerator:
     await setup_logger()
     yield
+    await close_es_client()
+    await rel_db_engines.dispose_all()
+    await close_redis_client()
 
 
 app = FastAPI(
@@ -38,4 +63,23 @@ app.add_middleware(
 app.add_middleware(CatchExceptionsMiddleware)
 
 app.add_middleware(LoggingMiddleware)
+# Последним добавленный мидлварь - внешний: отказ не доходит до логирования тела
+app.add_middleware(AdmissionControlMiddleware)
+# Повтор с Idempotency-Key отвечает из Redis, не занимая слот маршрута
+app.add_middleware(IdempotencyMiddleware)
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(RequestIdMiddleware)
 app.include_router(role2_file_type_routers.router)
+app.include_router(dictionary_routers.router)
+app.include_router(nsi_value_routers.router)
+app.include_router(file_meta_routers.router)
+app.include_router(file_ingest_routers.router)
+app.include_router(file_export_routers.router)
+app.include_router(file_search_routers.router)
+app.include_router(bucket_tiering_routers.router)
+app.include_router(ftp_ingest_routers.router)
+app.include_router(rel_db_routers.router)
+app.include_router(directory_stats_routers.router)
+app.include_router(file_access_routers.router)
+app.include_router(reference_data_routers.router)
+app.include_router(negative_cache_routers.router)
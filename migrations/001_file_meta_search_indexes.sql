@@ -0,0 +1,10 @@
+-- Индексы для поиска по FileMeta.meta (/api/v3/searchFileMeta).
+-- jsonb_path_ops обслуживает операторы @>, @? и @@, которыми компилируются фильтры.
+-- CONCURRENTLY не блокирует запись в таблицу, поэтому файл нельзя выполнять внутри транзакции.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_file_meta_meta_gin
+    ON stg."FileMeta" USING gin (meta jsonb_path_ops);
+
+-- Keyset-пагинация по (fileId, id)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_file_meta_file_id_id
+    ON stg."FileMeta" ("fileId", id);
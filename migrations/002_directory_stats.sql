@@ -0,0 +1,255 @@
+-- Агрегаты по каталогам (/api/v3/getDirectoryStats): число файлов и суммарный
+-- fileSize самого каталога и всего его поддерева.
+-- Поддерживаются триггерами уровня оператора на FileList и DirectoryList,
+-- поэтому массовая вставка пачкой обновляет каждую строку агрегатов один раз.
+-- Расхождения (ручные правки с отключенными триггерами, одновременный перенос
+-- вложенных каталогов одним UPDATE) исправляет stg.directory_stats_reconcile().
+
+CREATE TABLE IF NOT EXISTS stg."DirectoryStats" (
+    "directoryId" integer PRIMARY KEY,
+    "fileCount" bigint NOT NULL DEFAULT 0,
+    "totalSize" bigint NOT NULL DEFAULT 0,
+    "subtreeFileCount" bigint NOT NULL DEFAULT 0,
+    "subtreeTotalSize" bigint NOT NULL DEFAULT 0
+);
+
+-- Глубина обхода вверх ограничена на случай цикла в parentId
+CREATE OR REPLACE FUNCTION stg.directory_stats_apply_subtree(
+    p_ids integer[], p_files bigint[], p_sizes bigint[]
+) RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+    WITH RECURSIVE up(id, files, size, depth) AS (
+        SELECT dl.id, d.files, d.size, 0
+        FROM unnest(p_ids, p_files, p_sizes) AS d(id, files, size)
+        JOIN stg."DirectoryList" dl ON dl.id = d.id
+        UNION ALL
+        SELECT p.id, up.files, up.size, up.depth + 1
+        FROM up
+        JOIN stg."DirectoryList" dl ON dl.id = up.id
+        JOIN stg."DirectoryList" p ON p.id = dl."parentId"
+        WHERE up.depth < 1000
+    )
+    INSERT INTO stg."DirectoryStats" AS s
+        ("directoryId", "subtreeFileCount", "subtreeTotalSize")
+    SELECT id, sum(files), sum(size)
+    FROM up
+    GROUP BY id
+    HAVING sum(files) <> 0 OR sum(size) <> 0
+    -- Единый порядок блокировок строк снижает вероятность взаимоблокировок
+    ORDER BY id
+    ON CONFLICT ("directoryId") DO UPDATE SET
+        "subtreeFileCount" = s."subtreeFileCount" + excluded."subtreeFileCount",
+        "subtreeTotalSize" = s."subtreeTotalSize" + excluded."subtreeTotalSize";
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION stg.directory_stats_apply(
+    p_ids integer[], p_files bigint[], p_sizes bigint[]
+) RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO stg."DirectoryStats" AS s ("directoryId", "fileCount", "totalSize")
+    SELECT d.id, sum(d.files), sum(d.size)
+    FROM unnest(p_ids, p_files, p_sizes) AS d(id, files, size)
+    JOIN stg."DirectoryList" dl ON dl.id = d.id
+    GROUP BY d.id
+    HAVING sum(d.files) <> 0 OR sum(d.size) <> 0
+    ORDER BY d.id
+    ON CONFLICT ("directoryId") DO UPDATE SET
+        "fileCount" = s."fileCount" + excluded."fileCount",
+        "totalSize" = s."totalSize" + excluded."totalSize";
+    PERFORM stg.directory_stats_apply_subtree(p_ids, p_files, p_sizes);
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION stg.file_list_directory_stats() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM stg.directory_stats_apply(
+            array_agg("directoryId"),
+            array_agg(1::bigint),
+            array_agg(coalesce("fileSize", 0))
+        )
+        FROM new_rows
+        WHERE "directoryId" IS NOT NULL;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM stg.directory_stats_apply(
+            array_agg("directoryId"),
+            array_agg(-1::bigint),
+            array_agg(-coalesce("fileSize", 0))
+        )
+        FROM old_rows
+        WHERE "directoryId" IS NOT NULL;
+    ELSE
+        PERFORM stg.directory_stats_apply(
+            array_agg(d.id), array_agg(d.files), array_agg(d.size)
+        )
+        FROM (
+            SELECT o."directoryId" AS id, -1::bigint AS files,
+                -coalesce(o."fileSize", 0) AS size
+            FROM old_rows o
+            JOIN new_rows n ON n.id = o.id
+            WHERE (o."directoryId", o."fileSize")
+                IS DISTINCT FROM (n."directoryId", n."fileSize")
+            UNION ALL
+            SELECT n."directoryId", 1::bigint, coalesce(n."fileSize", 0)
+            FROM old_rows o
+            JOIN new_rows n ON n.id = o.id
+            WHERE (o."directoryId", o."fileSize")
+                IS DISTINCT FROM (n."directoryId", n."fileSize")
+        ) d
+        WHERE d.id IS NOT NULL;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+-- При удалении каталога его файлы удаляются каскадом, но каталога уже нет,
+-- и триггер FileList их не учитывает: поддерево целиком вычитается здесь.
+-- Перенос каталога переносит его поддерево от старых предков к новым.
+CREATE OR REPLACE FUNCTION stg.directory_list_directory_stats() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM stg.directory_stats_apply_subtree(
+            array_agg(o."parentId"),
+            array_agg(-s."subtreeFileCount"),
+            array_agg(-s."subtreeTotalSize")
+        )
+        FROM old_rows o
+        JOIN stg."DirectoryStats" s ON s."directoryId" = o.id
+        WHERE o."parentId" IS NOT NULL;
+        DELETE FROM stg."DirectoryStats" s
+        USING old_rows o
+        WHERE s."directoryId" = o.id;
+    ELSE
+        PERFORM stg.directory_stats_apply_subtree(
+            array_agg(d.id), array_agg(d.files), array_agg(d.size)
+        )
+        FROM (
+            SELECT o."parentId" AS id, -s."subtreeFileCount" AS files,
+                -s."subtreeTotalSize" AS size
+            FROM old_rows o
+            JOIN new_rows n ON n.id = o.id
+            JOIN stg."DirectoryStats" s ON s."directoryId" = n.id
+            WHERE o."parentId" IS DISTINCT FROM n."parentId"
+            UNION ALL
+            SELECT n."parentId", s."subtreeFileCount", s."subtreeTotalSize"
+            FROM old_rows o
+            JOIN new_rows n ON n.id = o.id
+            JOIN stg."DirectoryStats" s ON s."directoryId" = n.id
+            WHERE o."parentId" IS DISTINCT FROM n."parentId"
+        ) d
+        WHERE d.id IS NOT NULL;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS file_list_directory_stats_insert ON stg."FileList";
+CREATE TRIGGER file_list_directory_stats_insert
+    AFTER INSERT ON stg."FileList"
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION stg.file_list_directory_stats();
+
+DROP TRIGGER IF EXISTS file_list_directory_stats_update ON stg."FileList";
+CREATE TRIGGER file_list_directory_stats_update
+    AFTER UPDATE ON stg."FileList"
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION stg.file_list_directory_stats();
+
+DROP TRIGGER IF EXISTS file_list_directory_stats_delete ON stg."FileList";
+CREATE TRIGGER file_list_directory_stats_delete
+    AFTER DELETE ON stg."FileList"
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION stg.file_list_directory_stats();
+
+DROP TRIGGER IF EXISTS directory_list_directory_stats_update ON stg."DirectoryList";
+CREATE TRIGGER directory_list_directory_stats_update
+    AFTER UPDATE ON stg."DirectoryList"
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION stg.directory_list_directory_stats();
+
+DROP TRIGGER IF EXISTS directory_list_directory_stats_delete ON stg."DirectoryList";
+CREATE TRIGGER directory_list_directory_stats_delete
+    AFTER DELETE ON stg."DirectoryList"
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION stg.directory_list_directory_stats();
+
+-- Пересчет агрегатов с нуля и исправление расхождений.
+-- EXCLUSIVE-блокировка DirectoryStats не мешает чтению, но задерживает триггеры
+-- параллельных транзакций до конца пересчета, поэтому их дельты не теряются.
+CREATE OR REPLACE FUNCTION stg.directory_stats_reconcile(
+    OUT repaired bigint, OUT removed bigint
+) LANGUAGE plpgsql AS $$
+BEGIN
+    LOCK TABLE stg."DirectoryStats" IN EXCLUSIVE MODE;
+
+    WITH RECURSIVE own AS (
+        SELECT "directoryId" AS id, count(*) AS files,
+            coalesce(sum("fileSize"), 0) AS size
+        FROM stg."FileList"
+        WHERE "directoryId" IS NOT NULL
+        GROUP BY "directoryId"
+    ), up(id, files, size, depth) AS (
+        SELECT dl.id, own.files, own.size, 0
+        FROM own
+        JOIN stg."DirectoryList" dl ON dl.id = own.id
+        UNION ALL
+        SELECT p.id, up.files, up.size, up.depth + 1
+        FROM up
+        JOIN stg."DirectoryList" dl ON dl.id = up.id
+        JOIN stg."DirectoryList" p ON p.id = dl."parentId"
+        WHERE up.depth < 1000
+    ), subtree AS (
+        SELECT id, sum(files) AS files, sum(size) AS size
+        FROM up
+        GROUP BY id
+    ), expected AS (
+        SELECT dl.id,
+            coalesce(own.files, 0) AS file_count,
+            coalesce(own.size, 0) AS total_size,
+            coalesce(subtree.files, 0) AS subtree_file_count,
+            coalesce(subtree.size, 0) AS subtree_total_size
+        FROM stg."DirectoryList" dl
+        LEFT JOIN own ON own.id = dl.id
+        LEFT JOIN subtree ON subtree.id = dl.id
+    ), drift AS (
+        SELECT e.*
+        FROM expected e
+        LEFT JOIN stg."DirectoryStats" s ON s."directoryId" = e.id
+        WHERE (
+            s."directoryId" IS NOT NULL
+            OR e.subtree_file_count <> 0
+            OR e.subtree_total_size <> 0
+        )
+        AND (s."fileCount", s."totalSize", s."subtreeFileCount", s."subtreeTotalSize")
+            IS DISTINCT FROM
+            (e.file_count, e.total_size, e.subtree_file_count, e.subtree_total_size)
+    ), upserted AS (
+        INSERT INTO stg."DirectoryStats" AS s (
+            "directoryId", "fileCount", "totalSize",
+            "subtreeFileCount", "subtreeTotalSize"
+        )
+        SELECT id, file_count, total_size, subtree_file_count, subtree_total_size
+        FROM drift
+        ON CONFLICT ("directoryId") DO UPDATE SET
+            "fileCount" = excluded."fileCount",
+            "totalSize" = excluded."totalSize",
+            "subtreeFileCount" = excluded."subtreeFileCount",
+            "subtreeTotalSize" = excluded."subtreeTotalSize"
+        RETURNING 1
+    ), deleted AS (
+        DELETE FROM stg."DirectoryStats" s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM stg."DirectoryList" dl WHERE dl.id = s."directoryId"
+        )
+        RETURNING 1
+    )
+    SELECT (SELECT count(*) FROM upserted), (SELECT count(*) FROM deleted)
+    INTO repaired, removed;
+END;
+$$;
+
+-- Первоначальное заполнение
+SELECT * FROM stg.directory_stats_reconcile();
@@ -0,0 +1,53 @@
+-- Составные индексы для связей ролей и выборок файлов.
+-- Проверка планов: python scripts/explain_queries.py
+-- CONCURRENTLY не блокирует запись в таблицу, поэтому файл нельзя выполнять внутри транзакции.
+-- Если построение индекса прервалось, остается невалидный индекс, который
+-- IF NOT EXISTS не пересоздаст: удалить его (DROP INDEX CONCURRENTLY) и выполнить файл снова.
+
+-- Role2FileType: дубли пар (roleGroupId, fileTypeId) удаляются, остается связь
+-- с наименьшим id. Все запросы role2_file_type_queries.py ищут по этой паре.
+DELETE FROM stg."Role2FileType" a
+    USING stg."Role2FileType" b
+    WHERE a."roleGroupId" = b."roleGroupId"
+      AND a."fileTypeId" = b."fileTypeId"
+      AND a.id > b.id;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ux_role2_file_type_role_group_id_file_type_id
+    ON stg."Role2FileType" ("roleGroupId", "fileTypeId");
+
+-- Каскадное удаление FileType
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_role2_file_type_file_type_id
+    ON stg."Role2FileType" ("fileTypeId");
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_role2_directory_role_id_directory_id
+    ON stg."Role2Directory" ("roleId", "directoryId");
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_role2_directory_directory_id
+    ON stg."Role2Directory" ("directoryId");
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_role2_root_list_role_group_id_root_list_id
+    ON stg."Role2RootList" ("roleGroupId", "rootListId");
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_role2_root_list_root_list_id
+    ON stg."Role2RootList" ("rootListId");
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_role2_dictionary_value_role_group_id_codes
+    ON stg."Role2DictionaryValue" ("roleGroupId", "dictionaryCode", "dictionaryValueCode");
+
+-- Выгрузка (/api/v3/exportFileList) фильтрует по каталогу или типу и идет по id
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_file_list_directory_id_id
+    ON stg."FileList" ("directoryId", id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_file_list_file_type_id_id
+    ON stg."FileList" ("fileTypeId", id);
+
+-- Водяной знак синхронизации поискового индекса (updateDate, id)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_file_list_update_date_id
+    ON stg."FileList" ("updateDate", id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_file_attribute_value_file_id_attribute_id
+    ON stg."FileAttributeValue" ("fileId", "attributeId");
+
+-- Дочерние каталоги (/api/v3/getDirectoryChildrenStats)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_directory_list_parent_id_id
+    ON stg."DirectoryList" ("parentId", id);
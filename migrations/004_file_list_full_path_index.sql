@@ -0,0 +1,7 @@
+-- Поиск уже забранных с FTP файлов по пути объекта (FtpIngestQuery.get_registered_paths).
+-- CONCURRENTLY не блокирует запись в таблицу, поэтому файл нельзя выполнять внутри транзакции.
+-- Если построение индекса прервалось, остается невалидный индекс, который
+-- IF NOT EXISTS не пересоздаст: удалить его (DROP INDEX CONCURRENTLY) и выполнить файл снова.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_file_list_full_path
+    ON stg."FileList" ("fullPath");
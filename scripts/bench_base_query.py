@@ -0,0 +1,87 @@
+"""
+Микробенчмарк запросов BaseQuery по kwargs: запрос, построенный заново на
+каждый вызов (как было до kwargs_statement), против шаблона из кэша.
+
+Печатает среднее время одного вызова:
+  - build: построение запроса и ключа кэша компиляции SQLAlchemy, без БД;
+  - execute: session.execute в одной сессии на primary (с флагом --db).
+
+Запуск из корня репозитория с теми же переменными окружения, что и у api:
+    python scripts/bench_base_query.py --calls 20000 --db
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from sqlalchemy import exists, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.api.models import Role2FileType  # noqa: E402
+from src.api.services.base_qurey import kwargs_statement  # noqa: E402
+from src.database import engine  # noqa: E402
+
+CASES = (
+    ("object", {"id": 1}),
+    ("id", {"role_group_id": 1, "file_type_id": 1}),
+    ("exists", {"role_group_id": 1, "file_type_id": 1}),
+)
+
+
+def rebuilt_statement(kind: str, model, kwargs: dict) -> tuple:
+    conditions = [getattr(model, key) == value for key, value in kwargs.items()]
+    if kind == "object":
+        return select(model).where(*conditions), {}
+    if kind == "id":
+        return select(model.id).where(*conditions), {}
+    return exists().where(*conditions).select(), {}
+
+
+def bench_build(build, kind: str, kwargs: dict, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        statement, _ = build(kind, Role2FileType, kwargs)
+        statement._generate_cache_key()
+    return (time.perf_counter() - started) / calls
+
+
+async def bench_execute(build, kind: str, kwargs: dict, calls: int) -> float:
+    async with AsyncSession(engine) as session:
+        # Прогрев: соединение, кэш компиляции, подготовленный запрос asyncpg
+        await session.execute(*build(kind, Role2FileType, kwargs))
+        started = time.perf_counter()
+        for _ in range(calls):
+            await session.execute(*build(kind, Role2FileType, kwargs))
+        elapsed = time.perf_counter() - started
+    return elapsed / calls
+
+
+async def main_async(calls: int, db: bool) -> None:
+    print("case | build before, us | build after, us", end="")
+    print(" | execute before, us | execute after, us" if db else "")
+    for kind, kwargs in CASES:
+        row = [f"{kind}({', '.join(kwargs)})"]
+        for build in (rebuilt_statement, kwargs_statement):
+            row.append(f"{bench_build(build, kind, kwargs, calls) * 1e6:.2f}")
+        if db:
+            for build in (rebuilt_statement, kwargs_statement):
+                elapsed = await bench_execute(build, kind, kwargs, calls // 10)
+                row.append(f"{elapsed * 1e6:.1f}")
+        print(" | ".join(row))
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--db", action="store_true", help="замерить и execute")
+    args = parser.parse_args()
+    asyncio.run(main_async(args.calls, args.db))
+
+
+if __name__ == "__main__":
+    main()
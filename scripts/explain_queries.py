@@ -0,0 +1,335 @@
+"""
+Проверка планов горячих запросов query-классов на локальном postgres.
+
+Скрипт наполняет таблицы синтетическими данными, собирает статистику
+(ANALYZE) и вызывает методы query-классов. Перед выполнением каждого
+SQL-запроса делается EXPLAIN (FORMAT JSON) с теми же параметрами. Скрипт
+завершается с кодом 1, если в каком-то плане есть Seq Scan по таблице, в
+которой не меньше --min-rows строк (кроме таблиц, которые метод читает
+целиком), или если вызов метода упал.
+
+Все выполняется в одной транзакции, которая в конце откатывается: commit в
+методах освобождает только точку сохранения, и в базе остаются только
+сдвинутые последовательности id.
+
+Запуск из корня репозитория с теми же переменными окружения, что и у api:
+    python scripts/explain_queries.py --rows 100000 --min-rows 10000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime
+from typing import Callable
+
+import orjson
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.api.schemas.file_export_schemas import FileExportFilter  # noqa: E402
+from src.api.schemas.role2_file_type_schemas import (  # noqa: E402
+    RoleFileTypeList,
+    SyncRole2FileTypeData,
+)
+from src.api.services.dictionary_queries import DictionaryQuery  # noqa: E402
+from src.api.services.directory_stats_queries import (  # noqa: E402
+    DirectoryStatsQuery,
+)
+from src.api.services.file_access_queries import FileAccessQuery  # noqa: E402
+from src.api.services.file_export_queries import FileExportQuery  # noqa: E402
+from src.api.services.file_search_queries import FileSearchQuery  # noqa: E402
+from src.api.services.role2_file_type_queries import Role2FileTypeQuery  # noqa: E402
+from src.database import engine  # noqa: E402
+
+ROLES = 200
+FILE_TYPES = 500
+ATTRIBUTES = 20
+DIRECTORIES_PER_ROLE = 50
+DICTIONARY_VALUES_PER_ROLE = 100
+
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+SEED_TABLES = (
+    "RoleGroupList",
+    "FileType",
+    "Role2FileType",
+    "DirectoryList",
+    "Role2Directory",
+    "AttributeList",
+    "FileList",
+    "FileAttributeValue",
+    "Role2DictionaryValue",
+)
+
+
+async def seed(conn: AsyncConnection, rows: int) -> dict[str, int]:
+    """
+    Добавить синтетические строки с id после существующих.
+
+    :param conn: соединение внутри откатываемой транзакции
+    :param rows: число строк FileList
+    :return: dict[str, int] - начальные id добавленных строк по таблицам
+    """
+    base = {}
+    for table in SEED_TABLES:
+        base[table] = await conn.scalar(
+            text(f'SELECT coalesce(max(id), 0) FROM stg."{table}"')
+        )
+    directories = max(rows // 10, DIRECTORIES_PER_ROLE)
+    params = {
+        "roles": ROLES,
+        "file_types": FILE_TYPES,
+        "attributes": ATTRIBUTES,
+        "directories": directories,
+        "directories_per_role": DIRECTORIES_PER_ROLE,
+        "dictionary_values": DICTIONARY_VALUES_PER_ROLE,
+        "rows": rows,
+        "role0": base["RoleGroupList"],
+        "type0": base["FileType"],
+        "dir0": base["DirectoryList"],
+        "attr0": base["AttributeList"],
+        "file0": base["FileList"],
+        "role2type0": base["Role2FileType"],
+        "role2dir0": base["Role2Directory"],
+        "value0": base["FileAttributeValue"],
+        "role2value0": base["Role2DictionaryValue"],
+    }
+    statements = (
+        """INSERT INTO stg."RoleGroupList" (id, name)
+        SELECT :role0 + g, 'explain role ' || g FROM generate_series(1, :roles) g""",
+        """INSERT INTO stg."FileType" (id, code, name)
+        SELECT :type0 + g, 'explain_' || g, 'explain ' || g
+        FROM generate_series(1, :file_types) g""",
+        """INSERT INTO stg."Role2FileType" (id, "roleGroupId", "fileTypeId")
+        SELECT :role2type0 + (r - 1) * :file_types + t, :role0 + r, :type0 + t
+        FROM generate_series(1, :roles) r, generate_series(1, :file_types) t""",
+        """INSERT INTO stg."DirectoryList" (id, "parentId", name, "fullPath")
+        SELECT :dir0 + g, CASE WHEN g > 10 THEN :dir0 + g / 10 END,
+            'd' || g, '/explain/' || g
+        FROM generate_series(1, :directories) g""",
+        """INSERT INTO stg."Role2Directory" (id, "roleId", "directoryId")
+        SELECT :role2dir0 + (r - 1) * :directories_per_role + d, :role0 + r,
+            :dir0 + (r * :directories_per_role + d) % :directories + 1
+        FROM generate_series(1, :roles) r,
+            generate_series(1, :directories_per_role) d""",
+        """INSERT INTO stg."AttributeList" (id, code, name)
+        SELECT :attr0 + g, 'explain_' || g, 'explain ' || g
+        FROM generate_series(1, :attributes) g""",
+        """INSERT INTO stg."FileList"
+            (id, "fileTypeId", "directoryId", "fileName", "fileSize", "updateDate")
+        SELECT :file0 + g, :type0 + g % :file_types + 1,
+            :dir0 + g % :directories + 1, 'f' || g, g,
+            now() - make_interval(secs => g)
+        FROM generate_series(1, :rows) g""",
+        """INSERT INTO stg."FileAttributeValue"
+            (id, "fileId", "attributeId", "valueStr")
+        SELECT :value0 + g + 1, :file0 + g / 3 + 1,
+            :attr0 + g % :attributes + 1, 'v' || g
+        FROM generate_series(0, :rows * 3 - 1) g""",
+        """INSERT INTO stg."Role2DictionaryValue"
+            (id, "roleGroupId", "dictionaryCode", "dictionaryValueCode")
+        SELECT :role2value0 + (r - 1) * :dictionary_values + v, :role0 + r,
+            'explain', 'v' || v
+        FROM generate_series(1, :roles) r, generate_series(1, :dictionary_values) v""",
+    )
+    for statement in statements:
+        await conn.execute(text(statement), params)
+    for table in SEED_TABLES:
+        await conn.execute(text(f'ANALYZE stg."{table}"'))
+    return base
+
+
+def seq_scans(plan: dict, min_rows: dict[str, int]) -> list[str]:
+    """Таблицы из min_rows, которые план читает последовательным сканированием."""
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in min_rows:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", ()):
+        found.extend(seq_scans(child, min_rows))
+    return found
+
+
+def scenarios(base: dict[str, int]) -> list[tuple[str, Callable, tuple[str, ...]]]:
+    """
+    Вызовы методов: (имя, функция от сессии, таблицы, которые читаются целиком).
+    """
+    role = base["RoleGroupList"] + ROLES // 2
+    file_type = base["FileType"] + FILE_TYPES // 2
+    directory = base["DirectoryList"] + 1
+    file_ids = [base["FileList"] + i for i in range(1, 1000, 7)]
+    pairs = [[role, base["FileType"] + t] for t in range(1, 50)]
+    records = RoleFileTypeList.model_validate(
+        [{"role_group_id": r, "file_type_id": t} for r, t in pairs]
+    )
+
+    async def export_rows(session: AsyncSession, data: FileExportFilter) -> None:
+        async for _ in FileExportQuery(session).stream_rows(data, chunk_size=100):
+            break
+
+    return [
+        (
+            "Role2FileTypeQuery.get_all_file_type_by_role_id",
+            lambda s: Role2FileTypeQuery(s).get_all_file_type_by_role_id(
+                role_group_id=role
+            ),
+            (),
+        ),
+        (
+            "Role2FileTypeQuery.check_exists",
+            lambda s: Role2FileTypeQuery(s).check_exists(
+                Role2FileTypeQuery(s).model,
+                role_group_id=role,
+                file_type_id=file_type,
+            ),
+            (),
+        ),
+        (
+            "Role2FileTypeQuery.post_role2_file_type_by_list",
+            lambda s: Role2FileTypeQuery(s).post_role2_file_type_by_list(records),
+            (),
+        ),
+        (
+            "Role2FileTypeQuery.delete_role2_file_type",
+            lambda s: Role2FileTypeQuery(s).delete_role2_file_type(records),
+            (),
+        ),
+        (
+            "Role2FileTypeQuery.sync_role2_file_types",
+            lambda s: Role2FileTypeQuery(s).sync_role2_file_types(
+                SyncRole2FileTypeData(
+                    role_group_id=role, file_type_ids=[t for _, t in pairs]
+                )
+            ),
+            (),
+        ),
+        (
+            "Role2FileTypeQuery.insert_role2_file_type_pairs",
+            lambda s: Role2FileTypeQuery(s).insert_role2_file_type_pairs(pairs),
+            (),
+        ),
+        (
+            "Role2FileTypeQuery.delete_role2_file_type_pairs",
+            lambda s: Role2FileTypeQuery(s).delete_role2_file_type_pairs(pairs),
+            (),
+        ),
+        (
+            "FileAccessQuery.get_allowed_file_ids",
+            lambda s: FileAccessQuery(s).get_allowed_file_ids(role, file_ids),
+            (),
+        ),
+        (
+            "FileSearchQuery.get_changed_files",
+            lambda s: FileSearchQuery(s).get_changed_files(datetime.now(), 0, 500),
+            (),
+        ),
+        (
+            "FileSearchQuery.get_attributes",
+            lambda s: FileSearchQuery(s).get_attributes(file_ids),
+            (),
+        ),
+        (
+            "FileExportQuery.stream_rows(directory_id)",
+            lambda s: export_rows(s, FileExportFilter(directory_id=directory)),
+            (),
+        ),
+        (
+            "FileExportQuery.stream_rows(file_type_id)",
+            lambda s: export_rows(s, FileExportFilter(file_type_id=file_type)),
+            (),
+        ),
+        (
+            "DirectoryStatsQuery.get_children_stats",
+            lambda s: DirectoryStatsQuery(s).get_children_stats(directory),
+            (),
+        ),
+        (
+            "DictionaryQuery.get_role_grants",
+            lambda s: DictionaryQuery(s).get_role_grants(),
+            ("Role2DictionaryValue",),
+        ),
+    ]
+
+
+async def run(rows: int, min_rows: int) -> int:
+    failures = 0
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            base = await seed(conn, rows)
+            sizes = dict(
+                (
+                    await conn.execute(
+                        text(
+                            "SELECT relname, reltuples::bigint FROM pg_class "
+                            "WHERE relnamespace = 'stg'::regnamespace "
+                            "AND relkind = 'r' AND reltuples >= :min_rows"
+                        ),
+                        {"min_rows": min_rows},
+                    )
+                ).all()
+            )
+            print(f"tables with >= {min_rows} rows: {sizes}")
+
+            plans: list[tuple[str, list[str]]] = []
+
+            def explain(conn, cursor, statement, parameters, context, executemany):
+                if executemany or not statement.lstrip().upper().startswith(
+                    EXPLAINABLE
+                ):
+                    return
+                explain_cursor = conn.connection.cursor()
+                explain_cursor.execute(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+                plan = explain_cursor.fetchone()[0]
+                if isinstance(plan, (str, bytes)):
+                    plan = orjson.loads(plan)
+                explain_cursor.close()
+                plans.append((statement, seq_scans(plan[0]["Plan"], sizes)))
+
+            event.listen(conn.sync_connection, "before_cursor_execute", explain)
+            for name, call, full_scan in scenarios(base):
+                plans.clear()
+                session = AsyncSession(
+                    bind=conn, join_transaction_mode="create_savepoint"
+                )
+                try:
+                    await call(session)
+                    error = None
+                except Exception as e:
+                    error = repr(e)
+                finally:
+                    await session.close()
+                scans = sorted(
+                    {t for _, found in plans for t in found if t not in full_scan}
+                )
+                # Упавший сценарий тоже провал: его запросы выпали из проверки
+                failed = bool(scans) or error is not None
+                status = "FAIL" if failed else "ok"
+                failures += failed
+                print(f"{status:4} {name}: {len(plans)} statements", end="")
+                print(f", seq scan: {', '.join(scans)}" if scans else "")
+                if error is not None:
+                    print(f"     error: {error}")
+                for statement, found in plans:
+                    if set(found) - set(full_scan):
+                        print("     " + " ".join(statement.split())[:300])
+            event.remove(conn.sync_connection, "before_cursor_execute", explain)
+        finally:
+            await transaction.rollback()
+    await engine.dispose()
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=100000, help="строк FileList")
+    parser.add_argument("--min-rows", type=int, default=10000)
+    args = parser.parse_args()
+    failures = asyncio.run(run(args.rows, args.min_rows))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Замер холодного старта и памяти воркеров gunicorn с gunicorn_conf.py.
+
+Запускает приложение в режимах с предзагрузкой (GUNICORN_PRELOAD=1) и без
+нее, и для каждого печатает:
+  - время импорта main в чистом интерпретаторе;
+  - время до первого ответа и до готовности всех воркеров;
+  - PSS и USS мастера и воркеров (Linux, /proc/<pid>/smaps_rollup).
+
+Запуск из корня репозитория с теми же переменными окружения, что и у api:
+    python scripts/measure_startup.py --workers 4 --runs 3
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+READY_LINE = b"Application startup complete"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import(runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import main"], cwd=ROOT, check=True)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def children(pid: int) -> list[int]:
+    result = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Имя процесса в скобках может содержать пробелы
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            result.append(int(entry))
+    return result
+
+
+def memory_kb(pid: int) -> tuple[int, int]:
+    """
+    :return: tuple[PSS, USS] в килобайтах
+    """
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                values[parts[0].rstrip(":")] = int(parts[1])
+    uss = values.get("Private_Clean", 0) + values.get("Private_Dirty", 0)
+    return values.get("Pss", 0), uss
+
+
+def measure_mode(preload: bool, workers: int, timeout: float) -> dict:
+    port = free_port()
+    env = dict(
+        os.environ,
+        GUNICORN_BIND=f"127.0.0.1:{port}",
+        GUNICORN_WORKERS=str(workers),
+        GUNICORN_PRELOAD="1" if preload else "0",
+    )
+    log_path = os.path.join(ROOT, "logs", f"measure_startup_{port}.log")
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    with open(log_path, "wb") as log:
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", "gunicorn_conf.py", "main:app"],
+            cwd=ROOT,
+            env=env,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+    result = {"mode": "preload" if preload else "default"}
+    try:
+        deadline = started + timeout
+        while "first_response" not in result and time.perf_counter() < deadline:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/docs", timeout=1)
+                result["first_response"] = time.perf_counter() - started
+            except OSError:
+                time.sleep(0.05)
+        while time.perf_counter() < deadline:
+            with open(log_path, "rb") as f:
+                if f.read().count(READY_LINE) >= workers:
+                    result["all_workers_ready"] = time.perf_counter() - started
+                    break
+            time.sleep(0.05)
+
+        master = memory_kb(process.pid)
+        workers_memory = [memory_kb(pid) for pid in children(process.pid)]
+        result["master_pss_mb"] = master[0] / 1024
+        result["workers_pss_mb"] = sum(pss for pss, _ in workers_memory) / 1024
+        result["worker_uss_mb"] = (
+            statistics.mean(uss for _, uss in workers_memory) / 1024
+            if workers_memory
+            else 0
+        )
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+        os.remove(log_path)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    print(f"import main: {measure_import(args.runs):.3f}s (median of {args.runs})")
+    columns = (
+        "mode",
+        "first_response",
+        "all_workers_ready",
+        "master_pss_mb",
+        "workers_pss_mb",
+        "worker_uss_mb",
+    )
+    print(" | ".join(columns))
+    for preload in (False, True):
+        runs = [
+            measure_mode(preload, args.workers, args.timeout) for _ in range(args.runs)
+        ]
+        row = [runs[0]["mode"]]
+        for column in columns[1:]:
+            values = [run[column] for run in runs if column in run]
+            row.append(f"{statistics.median(values):.2f}" if values else "-")
+        print(" | ".join(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,7 @@ from sqlalchemy import (
     text,
     Boolean,
     UniqueConstraint,
+    Index,
 )
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.dialects.postgresql import JSONB
@@ -234,7 +235,23 @@ class DirectoryList(Base):
         "Role2Directory", back_populates="directory", cascade="all, delete"
     )
 
-    __table_args__ = (UniqueConstraint("name", "fullPath", name="unique_subdirectory"),)
+    __table_args__ = (
+        UniqueConstraint("name", "fullPath", name="unique_subdirectory"),
+        # migrations/003_link_table_indexes.sql
+        Index("ix_directory_list_parent_id_id", "parentId", "id"),
+    )
+
+
+class DirectoryStats(Base):
+    """Агрегаты по каталогу, поддерживаются триггерами (migrations/002_directory_stats.sql)"""
+
+    __tablename__ = "DirectoryStats"
+
+    directory_id = Column(Integer, primary_key=True, name="directoryId")
+    file_count = Column(BigInteger, name="fileCount", default=0)
+    total_size = Column(BigInteger, name="totalSize", default=0)
+    subtree_file_count = Column(BigInteger, name="subtreeFileCount", default=0)
+    subtree_total_size = Column(BigInteger, name="subtreeTotalSize", default=0)
 
 
 class RootList(Base):
@@ -312,6 +329,15 @@ class FileList(Base):
     )
     file_meta = relationship("FileMeta", back_populates="file", cascade="all, delete")
 
+    __table_args__ = (
+        # migrations/003_link_table_indexes.sql
+        Index("ix_file_list_directory_id_id", "directoryId", "id"),
+        Index("ix_file_list_file_type_id_id", "fileTypeId", "id"),
+        Index("ix_file_list_update_date_id", "updateDate", "id"),
+        # migrations/004_file_list_full_path_index.sql
+        Index("ix_file_list_full_path", "fullPath"),
+    )
+
 
 class FileAttributeValue(Base):
     __tablename__ = "FileAttributeValue"
@@ -331,6 +357,11 @@ class FileAttributeValue(Base):
     file_type_id = Column(Integer, name="fileTypeId")
     value_number = Column(Float, name="valueNumber")
 
+    __table_args__ = (
+        # migrations/003_link_table_indexes.sql
+        Index("ix_file_attribute_value_file_id_attribute_id", "fileId", "attributeId"),
+    )
+
 
 class FileMeta(Base):
     __tablename__ = "FileMeta"
@@ -342,6 +373,17 @@ class FileMeta(Base):
     file = relationship("FileList", back_populates="file_meta")
     meta = Column(JSONB)
 
+    __table_args__ = (
+        # migrations/001_file_meta_search_indexes.sql
+        Index(
+            "ix_file_meta_meta_gin",
+            "meta",
+            postgresql_using="gin",
+            postgresql_ops={"meta": "jsonb_path_ops"},
+        ),
+        Index("ix_file_meta_file_id_id", "fileId", "id"),
+    )
+
 
 class Rules(Base):
     __tablename__ = "Rules"
@@ -426,6 +468,17 @@ class Role2FileType(Base):
     )
     file_type = relationship("FileType", back_populates="role_to_file_type")
 
+    __table_args__ = (
+        # migrations/003_link_table_indexes.sql
+        Index(
+            "ux_role2_file_type_role_group_id_file_type_id",
+            "roleGroupId",
+            "fileTypeId",
+            unique=True,
+        ),
+        Index("ix_role2_file_type_file_type_id", "fileTypeId"),
+    )
+
 
 class Role2RootList(Base):
     __tablename__ = "Role2RootList"
@@ -440,6 +493,14 @@ class Role2RootList(Base):
     )
     root_list = relationship("RootList", back_populates="role_to_root_list")
 
+    __table_args__ = (
+        # migrations/003_link_table_indexes.sql
+        Index(
+            "ix_role2_root_list_role_group_id_root_list_id", "roleGroupId", "rootListId"
+        ),
+        Index("ix_role2_root_list_root_list_id", "rootListId"),
+    )
+
 
 class Role2DictionaryValue(Base):
     __tablename__ = "Role2DictionaryValue"
@@ -452,6 +513,16 @@ class Role2DictionaryValue(Base):
     dictionary_value_code = Column(String, name="dictionaryValueCode")
     dictionary_code = Column(String, name="dictionaryCode")
 
+    __table_args__ = (
+        # migrations/003_link_table_indexes.sql
+        Index(
+            "ix_role2_dictionary_value_role_group_id_codes",
+            "roleGroupId",
+            "dictionaryCode",
+            "dictionaryValueCode",
+        ),
+    )
+
 
 class Notification(Base):
     __tablename__ = "Notification"
@@ -515,6 +586,12 @@ class Role2Directory(Base):
     )
     directory = relationship("DirectoryList", back_populates="role_to_directory")
 
+    __table_args__ = (
+        # migrations/003_link_table_indexes.sql
+        Index("ix_role2_directory_role_id_directory_id", "roleId", "directoryId"),
+        Index("ix_role2_directory_directory_id", "directoryId"),
+    )
+
 
 class Events(Base):
     __tablename__ = "Events"
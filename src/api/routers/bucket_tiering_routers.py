@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends
+from src.api.schemas.bucket_tiering_schemas import BucketMovePlan, BucketMoveReport
+from src.api.services.bucket_tiering import BucketTieringExecutor, get_minio_client
+from src.api.services.uow import UnitOfWork, get_uow
+
+router = APIRouter(prefix="/api/v3", tags=["Перенос файлов между бакетами"])
+
+
+@router.post(
+    "/moveFilesBetweenBuckets",
+    response_model=BucketMoveReport,
+    status_code=200,
+    summary="Перенести пачку файлов между уровнями хранения BucketList",
+)
+async def move_files_between_buckets(
+    data: BucketMovePlan, uow: UnitOfWork = Depends(get_uow)
+) -> BucketMoveReport:
+    executor = BucketTieringExecutor(client=get_minio_client())
+    result = await executor.execute(query=uow.bucket_tiering, plan=data)
+    return result
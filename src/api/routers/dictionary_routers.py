@@ -0,0 +1,74 @@
+from fastapi import APIRouter, Depends, Query
+from src.api.schemas.dictionary_schemas import AccessCheckResult
+from src.api.services.uow import UnitOfWork, get_uow
+
+router = APIRouter(prefix="/api/v3", tags=["Иерархия справочников"])
+
+
+@router.get(
+    "/getDictionaryValueDescendants",
+    status_code=200,
+    summary="Получить всех потомков значения справочника",
+)
+async def get_dictionary_value_descendants(
+    dictionary_code: str = Query(...),
+    value_code: str = Query(...),
+    uow: UnitOfWork = Depends(get_uow),
+) -> list:
+    result = await uow.dictionary.get_value_descendants(
+        dictionary_code=dictionary_code, value_code=value_code
+    )
+    return result
+
+
+@router.get(
+    "/getDictionaryValueAncestors",
+    status_code=200,
+    summary="Получить предков значения справочника",
+)
+async def get_dictionary_value_ancestors(
+    dictionary_code: str = Query(...),
+    value_code: str = Query(...),
+    uow: UnitOfWork = Depends(get_uow),
+) -> list:
+    result = await uow.dictionary.get_value_ancestors(
+        dictionary_code=dictionary_code, value_code=value_code
+    )
+    return result
+
+
+@router.get(
+    "/checkRoleDictionaryValueAccess",
+    response_model=AccessCheckResult,
+    status_code=200,
+    summary="Проверить доступ роли к значению справочника",
+)
+async def check_role_dictionary_value_access(
+    role_group_id: int = Query(...),
+    dictionary_code: str = Query(...),
+    value_code: str = Query(...),
+    uow: UnitOfWork = Depends(get_uow),
+) -> AccessCheckResult:
+    allowed = await uow.dictionary.check_role_dictionary_value_access(
+        role_group_id=role_group_id,
+        dictionary_code=dictionary_code,
+        value_code=value_code,
+    )
+    return AccessCheckResult(allowed=allowed)
+
+
+@router.get(
+    "/checkRoleFileTypeAccess",
+    response_model=AccessCheckResult,
+    status_code=200,
+    summary="Проверить доступ роли к типу файла по значениям справочников",
+)
+async def check_role_file_type_access(
+    role_group_id: int = Query(...),
+    file_type_code: str = Query(...),
+    uow: UnitOfWork = Depends(get_uow),
+) -> AccessCheckResult:
+    allowed = await uow.dictionary.check_role_file_type_access(
+        role_group_id=role_group_id, file_type_code=file_type_code
+    )
+    return AccessCheckResult(allowed=allowed)
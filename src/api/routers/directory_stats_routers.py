@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends, Query
+from src.api.schemas.directory_stats_schemas import (
+    DirectoryStatsBase,
+    DirectoryStatsList,
+    DirectoryStatsReconcileReport,
+)
+from src.api.services.uow import UnitOfWork, get_uow
+
+router = APIRouter(prefix="/api/v3", tags=["Статистика каталогов"])
+
+
+@router.get(
+    "/getDirectoryStats",
+    response_model=DirectoryStatsBase,
+    status_code=200,
+    summary="Число файлов и суммарный размер каталога и его поддерева",
+)
+async def get_directory_stats(
+    id: int = Query(...), uow: UnitOfWork = Depends(get_uow)
+) -> DirectoryStatsBase:
+    result = await uow.directory_stats.get_directory_stats(id=id)
+    return result
+
+
+@router.get(
+    "/getDirectoryChildrenStats",
+    response_model=DirectoryStatsList,
+    status_code=200,
+    summary="Статистика подкаталогов",
+)
+async def get_directory_children_stats(
+    parent_id: int = Query(...), uow: UnitOfWork = Depends(get_uow)
+) -> DirectoryStatsList:
+    result = await uow.directory_stats.get_children_stats(parent_id=parent_id)
+    return DirectoryStatsList(items=result)
+
+
+@router.post(
+    "/reconcileDirectoryStats",
+    response_model=DirectoryStatsReconcileReport,
+    status_code=200,
+    summary="Пересчитать статистику каталогов и исправить расхождения",
+)
+async def reconcile_directory_stats(
+    uow: UnitOfWork = Depends(get_uow),
+) -> DirectoryStatsReconcileReport:
+    result = await uow.directory_stats.reconcile()
+    return result
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends
+from src.api.schemas.file_access_schemas import (
+    FileAccessCheckRequest,
+    FileAccessCheckResult,
+)
+from src.api.services.uow import UnitOfWork, get_uow
+
+router = APIRouter(prefix="/api/v3", tags=["Доступ к файлам"])
+
+
+@router.post(
+    "/checkFileAccess",
+    response_model=FileAccessCheckResult,
+    status_code=200,
+    summary="Проверить доступ группы ролей к списку файлов",
+)
+async def check_file_access(
+    data: FileAccessCheckRequest, uow: UnitOfWork = Depends(get_uow)
+) -> FileAccessCheckResult:
+    result = await uow.file_access.check_file_access(data=data)
+    return result
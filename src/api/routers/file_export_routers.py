@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator
+from src.api.schemas.file_export_schemas import FileExportFormat, FileExportFilter
+from src.api.services.file_export_encoders import ENCODERS
+from src.api.services.uow import UnitOfWork
+from src.api.utils import raise_http_exception
+from src.database import SessionLocal
+from config import settings
+
+router = APIRouter(prefix="/api/v3", tags=["Выгрузка FileList"])
+
+
+async def stream_export(
+    export_format: FileExportFormat, data: FileExportFilter
+) -> AsyncIterator[bytes]:
+    # Сессия живет столько же, сколько поток: зависимости с yield закрываются
+    # до отправки StreamingResponse, поэтому get_uow здесь не подходит
+    encoder, _ = ENCODERS[export_format.value]
+    async with UnitOfWork(SessionLocal) as uow:
+        attribute_codes = await uow.file_export.get_attribute_codes(
+            file_type_id=data.file_type_id
+        )
+        chunks = uow.file_export.stream_rows(
+            data=data, chunk_size=settings.FILE_EXPORT_CHUNK_SIZE
+        )
+        async for part in encoder(chunks, attribute_codes):
+            if part:
+                yield part
+
+
+@router.get(
+    "/exportFileList",
+    status_code=200,
+    summary="Потоковая выгрузка FileList с атрибутами в NDJSON, CSV или Parquet",
+)
+async def export_file_list(
+    export_format: FileExportFormat = Query(FileExportFormat.ndjson, alias="format"),
+    data: FileExportFilter = Depends(),
+) -> StreamingResponse:
+    if export_format == FileExportFormat.parquet:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            await raise_http_exception(
+                status_code=400, detail="Parquet export requires pyarrow"
+            )
+    _, media_type = ENCODERS[export_format.value]
+    return StreamingResponse(
+        stream_export(export_format, data),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="file_list.{export_format.value}"'
+        },
+    )
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, Query, Request
+from typing import List
+from src.api.schemas.file_ingest_schemas import FileIngestBatchReport
+from src.api.services.uow import UnitOfWork, get_uow
+
+router = APIRouter(prefix="/api/v3", tags=["Массовая регистрация файлов"])
+
+
+@router.post(
+    "/ingestFileList",
+    response_model=List[FileIngestBatchReport],
+    status_code=200,
+    summary="Массово зарегистрировать файлы из NDJSON (application/x-ndjson)",
+)
+async def ingest_file_list(
+    request: Request,
+    batch_size: int | None = Query(None, ge=1, le=100000),
+    uow: UnitOfWork = Depends(get_uow),
+) -> List[FileIngestBatchReport]:
+    result = await uow.file_ingest.ingest_ndjson(
+        chunks=request.stream(), batch_size=batch_size
+    )
+    return result
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends
+from src.api.schemas.file_meta_schemas import FileMetaSearch, FileMetaPage
+from src.api.services.uow import UnitOfWork, get_uow
+
+router = APIRouter(prefix="/api/v3", tags=["Поиск по FileMeta"])
+
+
+@router.post(
+    "/searchFileMeta",
+    response_model=FileMetaPage,
+    status_code=200,
+    summary="Поиск файлов по meta с проекцией ключей",
+)
+async def search_file_meta(
+    data: FileMetaSearch, uow: UnitOfWork = Depends(get_uow)
+) -> FileMetaPage:
+    result = await uow.file_meta.search_file_meta(data=data)
+    return result
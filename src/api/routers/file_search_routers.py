@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, Query
+from src.api.schemas.file_search_schemas import (
+    FileSearchRequest,
+    FileSearchResult,
+    FileSearchSyncReport,
+)
+from src.api.services.file_search_index import (
+    FileSearchIndexer,
+    get_es_client,
+    search_files,
+)
+from src.api.services.uow import UnitOfWork, get_uow
+
+router = APIRouter(prefix="/api/v3", tags=["Поиск файлов"])
+
+
+@router.post(
+    "/searchFiles",
+    response_model=FileSearchResult,
+    status_code=200,
+    summary="Полнотекстовый поиск файлов с фасетами",
+)
+async def search_file_list(data: FileSearchRequest) -> FileSearchResult:
+    result = await search_files(client=get_es_client(), data=data)
+    return result
+
+
+@router.post(
+    "/syncFileSearchIndex",
+    response_model=FileSearchSyncReport,
+    status_code=200,
+    summary="Синхронизировать поисковый индекс файлов с FileList",
+)
+async def sync_file_search_index(
+    full: bool = Query(False), uow: UnitOfWork = Depends(get_uow)
+) -> FileSearchSyncReport:
+    indexer = FileSearchIndexer(client=get_es_client())
+    result = await indexer.sync(query=uow.file_search, full=full)
+    return result
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends
+from src.api.schemas.ftp_ingest_schemas import FtpPollRequest, FtpPollReport
+from src.api.services.ftp_ingest import get_ftp_ingest_poller
+from src.api.services.uow import UnitOfWork, get_uow
+
+router = APIRouter(prefix="/api/v3", tags=["Забор файлов с FTP"])
+
+
+@router.post(
+    "/pollFtpSetting",
+    response_model=FtpPollReport,
+    status_code=200,
+    summary="Забрать новые файлы с FTP в хранилище и зарегистрировать в FileList",
+)
+async def poll_ftp_setting(
+    data: FtpPollRequest, uow: UnitOfWork = Depends(get_uow)
+) -> FtpPollReport:
+    result = await get_ftp_ingest_poller().poll(
+        ftp_query=uow.ftp_ingest, ingest_query=uow.file_ingest, data=data
+    )
+    return result
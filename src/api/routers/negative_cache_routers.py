@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from src.api.services.negative_cache import negative_cache
+
+router = APIRouter(prefix="/api/v3", tags=["Кэш промахов поиска"])
+
+
+@router.get(
+    "/getNegativeCacheStats",
+    status_code=200,
+    summary="Счетчики кэша отсутствующих объектов (по текущему воркеру)",
+)
+async def get_negative_cache_stats() -> list:
+    """
+    Счетчики и размер кэша свои у каждого процесса: ответ описывает только
+    воркер, обработавший запрос, а не приложение в целом.
+    """
+    return negative_cache.stats()
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import Response
+from src.api.services.uow import UnitOfWork, get_uow
+from src.api.utils import gzip_response, representation_etag
+
+router = APIRouter(prefix="/api/v3", tags=["Версии НСИ"])
+
+
+@router.get(
+    "/getNsiValue",
+    status_code=200,
+    summary="Получить последнюю версию справочника НСИ",
+)
+async def get_nsi_value(
+    request: Request,
+    dictionary_code: str = Query(...),
+    uow: UnitOfWork = Depends(get_uow),
+) -> Response:
+    entry = await uow.nsi_value.get_latest_nsi_value(dictionary_code=dictionary_code)
+    etag = representation_etag(request, entry.etag)
+    headers = {"ETag": etag, "X-Nsi-Version": str(entry.version)}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return gzip_response(request, entry.payload, "text/plain; charset=utf-8", headers)
+
+
+@router.get(
+    "/getNsiValueDelta",
+    status_code=200,
+    summary="Получить изменения справочника НСИ между двумя версиями",
+)
+async def get_nsi_value_delta(
+    request: Request,
+    dictionary_code: str = Query(...),
+    from_version: int = Query(...),
+    to_version: int | None = Query(None),
+    uow: UnitOfWork = Depends(get_uow),
+) -> Response:
+    payload = await uow.nsi_value.get_nsi_value_delta(
+        dictionary_code=dictionary_code,
+        from_version=from_version,
+        to_version=to_version,
+    )
+    return gzip_response(request, payload, "application/json", {})
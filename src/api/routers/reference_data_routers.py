@@ -0,0 +1,65 @@
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import Response
+from config import settings
+from src.api.schemas.reference_data_schemas import ReferenceDataVersion
+from src.api.services.uow import UnitOfWork, get_uow
+from src.api.utils import gzip_response, representation_etag
+
+router = APIRouter(prefix="/api/v3", tags=["Справочные данные"])
+
+
+@router.get(
+    "/getReferenceData",
+    status_code=200,
+    summary="Получить снимок справочных таблиц",
+)
+async def get_reference_data(
+    request: Request,
+    table: str | None = Query(None),
+    version: str | None = Query(None),
+    uow: UnitOfWork = Depends(get_uow),
+) -> Response:
+    snapshot, payload = await uow.reference_data.get_reference_section(table=table)
+    etag = representation_etag(request, snapshot.etag)
+    headers = {
+        "ETag": etag,
+        "X-Reference-Generation": str(snapshot.generation),
+    }
+    # Ссылка с актуальной версией неизменяема и кэшируется навсегда
+    if version == snapshot.version:
+        headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    else:
+        headers["Cache-Control"] = f"public, max-age={settings.REFERENCE_DATA_MAX_AGE}"
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return gzip_response(request, payload, "application/json", headers)
+
+
+@router.get(
+    "/getReferenceDataVersion",
+    response_model=ReferenceDataVersion,
+    status_code=200,
+    summary="Получить текущую версию снимка справочных таблиц",
+)
+async def get_reference_data_version(
+    uow: UnitOfWork = Depends(get_uow),
+) -> ReferenceDataVersion:
+    snapshot = await uow.reference_data.get_reference_snapshot()
+    return ReferenceDataVersion(
+        version=snapshot.version,
+        generation=snapshot.generation,
+        tables=snapshot.tables,
+    )
+
+
+@router.post(
+    "/refreshReferenceData",
+    response_model=ReferenceDataVersion,
+    status_code=200,
+    summary="Перечитать справочные таблицы и обновить снимок",
+)
+async def refresh_reference_data(
+    uow: UnitOfWork = Depends(get_uow),
+) -> ReferenceDataVersion:
+    result = await uow.reference_data.refresh_reference_data()
+    return result
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, Query
+from src.api.services.rel_db_engines import rel_db_engines
+from src.api.services.uow import UnitOfWork, get_uow
+
+router = APIRouter(prefix="/api/v3", tags=["Внешние БД"])
+
+
+@router.get(
+    "/checkRelDBConnection",
+    status_code=200,
+    summary="Проверить подключение к внешней БД",
+)
+async def check_rel_db_connection(
+    id: int = Query(...), uow: UnitOfWork = Depends(get_uow)
+) -> dict:
+    result = await uow.rel_db.check_rel_db_connection(id=id)
+    return result
+
+
+@router.get(
+    "/getRelDBEngineStats",
+    status_code=200,
+    summary="Состояние пулов соединений к внешним БД",
+)
+async def get_rel_db_engine_stats() -> list:
+    return rel_db_engines.stats()
@@ -1,9 +1,15 @@
+from uuid import UUID
 from fastapi import APIRouter, Depends, Query
 from src.api.schemas.role2_file_type_schemas import (
     Role2FileTypeBase,
+    Role2FileTypeJob,
+    Role2FileTypeJobData,
     PutRole2FileTypeData,
     RoleFileTypeList,
+    SyncRole2FileTypeData,
+    SyncRole2FileTypeReport,
 )
+from src.api.services.role2_file_type_jobs import submit_role2_file_type_job
 from src.api.services.uow import UnitOfWork, get_uow
 
 router = APIRouter(prefix="/api/v3", tags=["CRUD для Role2FileType"])
@@ -73,3 +79,42 @@ async def delete_role2_file_type(
 ) -> None:
     await uow.role2_file_type.delete_role2_file_type(data=data)
     return
+
+
+@router.put(
+    "/syncRole2FileType",
+    response_model=SyncRole2FileTypeReport,
+    status_code=200,
+    summary="Привести типы файлов роли к заданному набору",
+)
+async def sync_role2_file_type(
+    data: SyncRole2FileTypeData, uow: UnitOfWork = Depends(get_uow)
+) -> SyncRole2FileTypeReport:
+    result = await uow.role2_file_type.sync_role2_file_types(data=data)
+    return result
+
+
+@router.post(
+    "/createRole2FileTypeJob",
+    response_model=Role2FileTypeJob,
+    status_code=202,
+    summary="Поставить в очередь пакетное создание или удаление связей",
+)
+async def create_role2_file_type_job(
+    data: Role2FileTypeJobData, uow: UnitOfWork = Depends(get_uow)
+) -> Role2FileTypeJob:
+    result = await submit_role2_file_type_job(uow=uow, data=data)
+    return result
+
+
+@router.get(
+    "/getRole2FileTypeJob",
+    response_model=Role2FileTypeJob,
+    status_code=200,
+    summary="Получить состояние пакетного задания",
+)
+async def get_role2_file_type_job(
+    job_id: UUID = Query(...), uow: UnitOfWork = Depends(get_uow)
+) -> Role2FileTypeJob:
+    result = await uow.role2_file_type_job.get_job(job_id=job_id)
+    return result
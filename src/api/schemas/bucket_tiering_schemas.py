@@ -0,0 +1,24 @@
+from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List
+
+
+class FileMove(BaseModel):
+    file_id: int
+    target_bucket_id: int
+    target_status_id: Optional[int] = None
+
+
+class BucketMovePlan(BaseModel):
+    moves: List[FileMove] = Field(..., min_length=1, max_length=100000)
+
+
+class FileMoveError(BaseModel):
+    file_id: int
+    error: str
+
+
+class BucketMoveReport(BaseModel):
+    moved: int = 0
+    skipped: int = 0
+    errors: List[FileMoveError] = []
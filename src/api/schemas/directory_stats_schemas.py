@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import List
+
+
+class DirectoryStatsBase(BaseModel):
+    directory_id: int
+    file_count: int = 0
+    total_size: int = 0
+    subtree_file_count: int = 0
+    subtree_total_size: int = 0
+
+
+class DirectoryStatsList(BaseModel):
+    items: List[DirectoryStatsBase] = []
+
+
+class DirectoryStatsReconcileReport(BaseModel):
+    repaired: int = 0
+    removed: int = 0
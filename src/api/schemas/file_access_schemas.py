@@ -0,0 +1,15 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+
+class FileAccessCheckRequest(BaseModel):
+    role_group_id: int
+    file_ids: List[int] = Field(..., min_length=1, max_length=10000)
+
+
+class FileAccessCheckResult(BaseModel):
+    role_group_id: int
+    count: int
+    allowed: int
+    # Бит i (байт i // 8, бит i % 8 от младшего) - доступ к file_ids[i], base64
+    bitmap: str
@@ -0,0 +1,18 @@
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+from pydantic import BaseModel
+
+
+class FileExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+    parquet = "parquet"
+
+
+class FileExportFilter(BaseModel):
+    file_type_id: Optional[int] = None
+    directory_id: Optional[int] = None
+    status_id: Optional[int] = None
+    bucket_id: Optional[int] = None
+    updated_since: Optional[datetime] = None
@@ -0,0 +1,42 @@
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+from pydantic import BaseModel
+from typing import List
+
+
+class FileIngestAttribute(BaseModel):
+    attribute_id: int
+    value_str: Optional[str] = None
+    value_code: Optional[str] = None
+    value_date: Optional[datetime] = None
+    value_number: Optional[float] = None
+
+
+class FileIngestRecord(BaseModel):
+    fid: Optional[UUID] = None
+    file_type_id: int
+    file_name: str
+    file_size: Optional[int] = None
+    directory_id: Optional[int] = None
+    full_path: Optional[str] = None
+    status_id: Optional[int] = None
+    bucket_id: Optional[int] = None
+    flag: Optional[int] = None
+    create_user: Optional[str] = None
+    actual_date: Optional[datetime] = None
+    attributes: List[FileIngestAttribute] = []
+    meta: Optional[dict] = None
+
+
+class FileIngestError(BaseModel):
+    line: Optional[int] = None
+    error: str
+
+
+class FileIngestBatchReport(BaseModel):
+    batch: int
+    files: int = 0
+    attributes: int = 0
+    meta: int = 0
+    errors: List[FileIngestError] = []
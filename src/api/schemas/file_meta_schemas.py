@@ -0,0 +1,29 @@
+from typing import Optional, Any
+from pydantic import BaseModel, Field
+from typing import List
+
+
+class FileMetaSearch(BaseModel):
+    # {"a": {"b": 1}} -> meta @> '{"a": {"b": 1}}'
+    contains: Optional[dict] = None
+    # jsonpath-предикаты, например "$.size > 100" -> meta @@ '$.size > 100'
+    match: List[str] = []
+    # jsonpath-пути, которые должны существовать, например "$.a.b" -> meta @? '$.a.b'
+    exists: List[str] = []
+    # Ключи для проекции, вложенные - через точку, например "a.b"
+    fields: List[str] = Field(..., min_length=1)
+    after_file_id: Optional[int] = None
+    after_meta_id: Optional[int] = None
+    limit: int = Field(100, ge=1, le=1000)
+
+
+class FileMetaItem(BaseModel):
+    file_id: int
+    meta_id: int
+    meta: dict[str, Any]
+
+
+class FileMetaPage(BaseModel):
+    items: List[FileMetaItem]
+    next_after_file_id: Optional[int] = None
+    next_after_meta_id: Optional[int] = None
@@ -0,0 +1,28 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List
+
+
+class FileSearchRequest(BaseModel):
+    text: Optional[str] = None
+    file_type_id: Optional[int] = None
+    status_id: Optional[int] = None
+    bucket_id: Optional[int] = None
+    # Фильтр по точному значению атрибута: {код атрибута: значение}
+    attributes: dict[str, str] = {}
+    offset: int = Field(0, ge=0, le=10000)
+    limit: int = Field(50, ge=1, le=1000)
+
+
+class FileSearchResult(BaseModel):
+    total: int
+    items: List[dict]
+    facets: dict[str, dict[str, int]]
+
+
+class FileSearchSyncReport(BaseModel):
+    indexed: int = 0
+    watermark_date: Optional[datetime] = None
+    watermark_id: Optional[int] = None
+    errors: List[str] = []
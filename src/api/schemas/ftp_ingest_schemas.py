@@ -0,0 +1,24 @@
+from typing import Optional
+from pydantic import BaseModel
+from typing import List
+
+
+class FtpPollRequest(BaseModel):
+    ftp_setting_id: int
+    path: str = "/"
+    file_type_id: int
+    directory_id: Optional[int] = None
+    status_id: Optional[int] = None
+    bucket_id: Optional[int] = None
+
+
+class FtpPollError(BaseModel):
+    path: str
+    error: str
+
+
+class FtpPollReport(BaseModel):
+    listed: int = 0
+    uploaded: int = 0
+    registered: int = 0
+    errors: List[FtpPollError] = []
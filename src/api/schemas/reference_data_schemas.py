@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+from typing import List
+
+
+class ReferenceDataVersion(BaseModel):
+    version: str
+    generation: int
+    tables: List[str] = []
@@ -1,6 +1,8 @@
+from datetime import datetime
 from typing import Optional
+from uuid import UUID
 from pydantic import BaseModel, RootModel
-from typing import List
+from typing import List, Literal
 
 
 class Role2FileTypeBase(BaseModel):
@@ -28,3 +30,36 @@ class Role2FileTypeBaseWithoutID(BaseModel):
 
 class RoleFileTypeList(RootModel[List[Role2FileTypeBaseWithoutID]]):
     pass
+
+
+class SyncRole2FileTypeData(BaseModel):
+    role_group_id: int
+    file_type_ids: List[int]
+
+
+class SyncRole2FileTypeReport(BaseModel):
+    role_group_id: int
+    inserted: int = 0
+    deleted: int = 0
+    unknown_file_type_ids: List[int] = []
+
+
+class Role2FileTypeJobData(BaseModel):
+    action: Literal["create", "delete"]
+    records: List[Role2FileTypeBaseWithoutID]
+    user_name: Optional[str] = None
+
+
+class Role2FileTypeJobProgress(BaseModel):
+    action: str
+    total: int
+    processed: int = 0
+    inserted: int = 0
+    deleted: int = 0
+
+
+class Role2FileTypeJob(Role2FileTypeJobProgress):
+    job_id: UUID
+    status: str
+    message: Optional[str] = None
+    finished_at: Optional[datetime] = None
@@ -1,7 +1,48 @@
-from sqlalchemy import select, exists, Result
+from sqlalchemy import select, exists, bindparam, Executable, Result
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.api.services.negative_cache import negative_cache
 from src.api.utils import raise_http_exception
+from src.database import PIN_PRIMARY_KEY, REPLICA_KEY
+
+# Шаблоны запросов по kwargs: (вид, модель, ключи) -> statement. Набор ключей
+# задается кодом, поэтому кэш не растет от входных данных
+_statements: dict[tuple, Executable] = {}
+
+
+def kwargs_statement(kind: str, model, kwargs: dict) -> tuple[Executable, dict]:
+    """
+    Получить запрос по условиям "поле == значение" из кэша шаблонов.
+
+    Шаблон строится один раз на модель и набор ключей, значения передаются
+    параметрами. Повторный вызов не строит select заново, а SQLAlchemy не
+    пересчитывает ключ кэша компиляции у того же объекта. Для None в шаблон
+    попадает IS NULL, поэтому он входит в ключ шаблона.
+
+    :param kind: object - select(model), id - select(model.id), exists - exists()
+    :param model: модель
+    :param kwargs: параметры для поиска, например "id=1"
+    :return: tuple[Executable, dict] - запрос и значения параметров
+    """
+    keys = tuple(sorted((key, value is None) for key, value in kwargs.items()))
+    statement = _statements.get((kind, model, keys))
+    if statement is None:
+        conditions = [
+            (
+                getattr(model, key).is_(None)
+                if is_null
+                else getattr(model, key) == bindparam(key)
+            )
+            for key, is_null in keys
+        ]
+        if kind == "object":
+            statement = select(model).where(*conditions)
+        elif kind == "id":
+            statement = select(model.id).where(*conditions)
+        else:
+            statement = exists().where(*conditions).select()
+        _statements[(kind, model, keys)] = statement
+    return statement, {key: value for key, value in kwargs.items() if value is not None}
 
 
 class BaseQuery:
@@ -9,6 +50,14 @@ class BaseQuery:
         self.session = session
         self.model = model
 
+    def use_primary(self) -> None:
+        """
+        Закрепить сессию за primary: все дальнейшие запросы, включая чтение,
+        пойдут мимо реплик. Вызывается в начале методов, которые пишут в БД.
+        :return: None
+        """
+        self.session.info[PIN_PRIMARY_KEY] = True
+
     async def get_all_fields(self) -> Result:
         """
         Получить список всех полей объекта
@@ -24,9 +73,8 @@ class BaseQuery:
         :param kwargs: параметры для поиска, например "id=1"
         :return: Result
         """
-        conditions = [getattr(model, key) == value for key, value in kwargs.items()]
-        query = select(model.id).where(*conditions)
-        result = await self.session.execute(query)
+        query, params = kwargs_statement("id", model, kwargs)
+        result = await self.session.execute(query, params)
         return result
 
     async def get_object_by_kwargs(self, model, **kwargs) -> Result:
@@ -36,23 +84,32 @@ class BaseQuery:
         :param kwargs: параметры для поиска, например "id=1"
         :return: Result
         """
-        conditions = [getattr(model, key) == value for key, value in kwargs.items()]
-        query = select(model).where(*conditions)
-        result = await self.session.execute(query)
+        query, params = kwargs_statement("object", model, kwargs)
+        result = await self.session.execute(query, params)
         return result
 
     async def check_exists(self, model_name, **kwargs) -> bool:
         """
-        Проверяет, существует ли объект с параметрами
+        Проверяет, существует ли объект с параметрами. Недавний промах
+        отвечается из negative_cache без запроса к БД. Промах, прочитанный
+        с реплики, кэшируется на срок не больше допустимого отставания реплики
         :param model_name: модель
         :param kwargs: параметры для поиска, например "id=1"
         :return: bool
         """
-        conditions = [
-            getattr(model_name, key) == value for key, value in kwargs.items()
-        ]
-        query = exists().where(*conditions).select()
-        result = await self.session.scalar(query)
+        table = model_name.__tablename__
+        cache_key = negative_cache.make_key(kwargs)
+        if cache_key is not None and negative_cache.is_missing(table, cache_key):
+            return False
+
+        query, params = kwargs_statement("exists", model_name, kwargs)
+        result = await self.session.scalar(query, params)
+        read_from_primary = (
+            self.session.info.get(PIN_PRIMARY_KEY)
+            or self.session.info.get(REPLICA_KEY) is None
+        )
+        if not result and cache_key is not None:
+            negative_cache.add(table, cache_key, from_replica=not read_from_primary)
         return result
 
     async def check_exists_or_raise(
@@ -0,0 +1,244 @@
+import asyncio
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import urllib3
+from minio import Minio
+from minio.commonconfig import CopySource, ComposeSource
+
+from config import settings
+from src.api.schemas.bucket_tiering_schemas import (
+    BucketMovePlan,
+    BucketMoveReport,
+    FileMoveError,
+)
+from src.api.services.bucket_tiering_queries import BucketTieringQuery
+
+
+_client: Minio | None = None
+
+
+def get_minio_client() -> Minio:
+    """
+    Получить общий на процесс клиент MinIO с пулом соединений под воркеров переноса.
+
+    :return: Minio
+    """
+    global _client
+    if _client is None:
+        _client = Minio(
+            settings.MINIO_BACK_HOST,
+            access_key=settings.MINIO_ACCESS_KEY,
+            secret_key=settings.MINIO_SECRET_KEY,
+            secure=settings.MINIO_SECURE,
+            http_client=urllib3.PoolManager(
+                maxsize=settings.MINIO_TIERING_WORKERS,
+                timeout=urllib3.Timeout(connect=10, read=600),
+                retries=urllib3.Retry(
+                    total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504]
+                ),
+            ),
+        )
+    return _client
+
+
+_threads: ThreadPoolExecutor | None = None
+
+
+def get_tiering_threads() -> ThreadPoolExecutor:
+    """
+    Получить пул потоков для блокирующих вызовов MinIO при переносе: свой,
+    на MINIO_TIERING_WORKERS потоков, чтобы копирования не занимали общий
+    executor asyncio.to_thread и не упирались в его размер.
+
+    :return: ThreadPoolExecutor
+    """
+    global _threads
+    if _threads is None:
+        _threads = ThreadPoolExecutor(
+            max_workers=settings.MINIO_TIERING_WORKERS,
+            thread_name_prefix="minio-tiering",
+        )
+    return _threads
+
+
+def reset_minio_client() -> None:
+    """Забыть клиент, сокеты и потоки родительского процесса после fork."""
+    global _client, _threads
+    _client = None
+    _threads = None
+
+
+class RateLimiter:
+    """Ограничение частоты операций: не чаще rate в секунду."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self._next_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            delay = self._next_at - now
+            self._next_at = max(now, self._next_at) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class BucketTieringExecutor:
+    """
+    Перенос файлов между бакетами BucketList серверным копированием MinIO.
+
+    Копирования идут параллельно, не более workers одновременно, и не чаще
+    rate операций в секунду на каждый бакет. После копирования все успешные
+    переносы фиксируются в FileList одним UPDATE, и только затем удаляются
+    исходные объекты: сбой на любом шаге оставляет лишнюю копию, но не
+    ссылку на несуществующий объект.
+    """
+
+    def __init__(
+        self,
+        client: Minio,
+        workers: int = settings.MINIO_TIERING_WORKERS,
+        rate: float = settings.MINIO_BUCKET_RATE_LIMIT,
+        part_size: int = settings.MINIO_MULTIPART_COPY_PART_SIZE,
+        threads: ThreadPoolExecutor | None = None,
+    ):
+        self.client = client
+        self.workers = workers
+        self.threads = threads or get_tiering_threads()
+        self.part_size = part_size
+        self.limiters: dict[str, RateLimiter] = defaultdict(lambda: RateLimiter(rate))
+
+    async def _call(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.threads, func, *args
+        )
+
+    @staticmethod
+    def object_name(file: dict) -> str:
+        return file["full_path"] or str(file["fid"])
+
+    async def copy(self, file: dict, target_bucket: str) -> None:
+        """
+        Скопировать объект в другой бакет. Объекты больше part_size копируются
+        multipart-ом из диапазонов исходного объекта (upload part copy).
+
+        :param file: файл из BucketTieringQuery.get_files
+        :param target_bucket: имя целевого бакета
+        :return: None
+        """
+        name = self.object_name(file)
+        source_bucket = file["bucket_name"]
+        size = file["file_size"] or 0
+        await self.limiters[target_bucket].wait()
+        if size > self.part_size:
+            sources = [
+                ComposeSource(
+                    source_bucket,
+                    name,
+                    offset=offset,
+                    length=min(self.part_size, size - offset),
+                )
+                for offset in range(0, size, self.part_size)
+            ]
+            await self._call(self.client.compose_object, target_bucket, name, sources)
+        else:
+            await self._call(
+                self.client.copy_object,
+                target_bucket,
+                name,
+                CopySource(source_bucket, name),
+            )
+
+    async def delete(self, file: dict) -> None:
+        await self.limiters[file["bucket_name"]].wait()
+        await self._call(
+            self.client.remove_object, file["bucket_name"], self.object_name(file)
+        )
+
+    async def _run_pool(self, jobs: list) -> list:
+        semaphore = asyncio.Semaphore(self.workers)
+
+        async def run(job):
+            async with semaphore:
+                return await job
+
+        return await asyncio.gather(*(run(job) for job in jobs), return_exceptions=True)
+
+    async def execute(
+        self, query: BucketTieringQuery, plan: BucketMovePlan
+    ) -> BucketMoveReport:
+        """
+        Выполнить план переноса файлов.
+
+        :param query: BucketTieringQuery текущей сессии
+        :param plan: план переноса
+        :return: BucketMoveReport
+        """
+        report = BucketMoveReport()
+        files = await query.get_files([move.file_id for move in plan.moves])
+        buckets = await query.get_bucket_names(
+            {move.target_bucket_id for move in plan.moves}
+        )
+
+        moves = []
+        planned = set()
+        for move in plan.moves:
+            file = files.get(move.file_id)
+            if file is None or file["bucket_name"] is None:
+                report.errors.append(
+                    FileMoveError(
+                        file_id=move.file_id, error="file or its bucket not found"
+                    )
+                )
+            elif move.target_bucket_id not in buckets:
+                report.errors.append(
+                    FileMoveError(
+                        file_id=move.file_id,
+                        error=f"bucket {move.target_bucket_id} not found",
+                    )
+                )
+            elif file["bucket_id"] == move.target_bucket_id or move.file_id in planned:
+                report.skipped += 1
+            else:
+                planned.add(move.file_id)
+                moves.append(move)
+
+        results = await self._run_pool(
+            [
+                self.copy(files[move.file_id], buckets[move.target_bucket_id])
+                for move in moves
+            ]
+        )
+        copied = []
+        for move, result in zip(moves, results):
+            if isinstance(result, Exception):
+                report.errors.append(
+                    FileMoveError(file_id=move.file_id, error=str(result))
+                )
+            else:
+                copied.append(move)
+
+        await query.apply_moves(
+            {
+                move.file_id: (move.target_bucket_id, move.target_status_id)
+                for move in copied
+            }
+        )
+        report.moved = len(copied)
+
+        results = await self._run_pool(
+            [self.delete(files[move.file_id]) for move in copied]
+        )
+        for move, result in zip(copied, results):
+            if isinstance(result, Exception):
+                report.errors.append(
+                    FileMoveError(
+                        file_id=move.file_id,
+                        error=f"moved, but source object was not deleted: {result}",
+                    )
+                )
+        return report
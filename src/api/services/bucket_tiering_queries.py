@@ -0,0 +1,106 @@
+from datetime import datetime
+
+from sqlalchemy import (
+    select,
+    update,
+    func,
+    any_,
+    bindparam,
+    column,
+    BigInteger,
+    Integer,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.models import FileList, BucketList
+from src.api.services.base_qurey import BaseQuery
+
+
+class BucketTieringQuery(BaseQuery):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, FileList)
+
+    async def get_files(self, file_ids: list[int]) -> dict[int, dict]:
+        """
+        Получить файлы плана переноса вместе с именем текущего бакета.
+
+        :param file_ids: id файлов
+        :return: dict[int, dict]
+        """
+        result = await self.session.execute(
+            select(
+                FileList.id,
+                FileList.fid,
+                FileList.full_path,
+                FileList.file_size,
+                FileList.bucket_id,
+                BucketList.name.label("bucket_name"),
+            )
+            .outerjoin(BucketList, BucketList.id == FileList.bucket_id)
+            .where(
+                FileList.id
+                == any_(bindparam("file_ids", file_ids, type_=ARRAY(BigInteger)))
+            )
+        )
+        return {row["id"]: dict(row) for row in result.mappings().all()}
+
+    async def get_bucket_names(self, bucket_ids: set[int]) -> dict[int, str]:
+        """
+        Получить имена бакетов по id.
+
+        :param bucket_ids: id бакетов
+        :return: dict[int, str]
+        """
+        result = await self.session.execute(
+            select(BucketList.id, BucketList.name).where(
+                BucketList.id
+                == any_(bindparam("bucket_ids", list(bucket_ids), type_=ARRAY(Integer)))
+            )
+        )
+        return dict(result.all())
+
+    async def apply_moves(self, moves: dict[int, tuple[int, int | None]]) -> None:
+        """
+        Одним UPDATE ... FROM unnest перевести файлы в новые бакеты (и статусы,
+        если указаны). План передается тремя массивами, поэтому размер запроса
+        не упирается в лимит параметров asyncpg (32767).
+
+        :param moves: {file_id: (bucket_id, status_id | None)}
+        :return: None
+        """
+        if not moves:
+            return
+        self.use_primary()
+        table = (
+            func.unnest(
+                bindparam("file_ids", list(moves), type_=ARRAY(BigInteger)),
+                bindparam(
+                    "bucket_ids",
+                    [bucket_id for bucket_id, _ in moves.values()],
+                    type_=ARRAY(Integer),
+                ),
+                bindparam(
+                    "status_ids",
+                    [status_id for _, status_id in moves.values()],
+                    type_=ARRAY(Integer),
+                ),
+            )
+            .table_valued(
+                column("file_id", BigInteger),
+                column("bucket_id", Integer),
+                column("status_id", Integer),
+            )
+            .render_derived(name="moves")
+        )
+        await self.session.execute(
+            update(FileList)
+            .where(FileList.id == table.c.file_id)
+            .values(
+                bucket_id=table.c.bucket_id,
+                status_id=func.coalesce(table.c.status_id, FileList.status_id),
+                update_date=datetime.now(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.commit()
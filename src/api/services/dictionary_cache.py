@@ -0,0 +1,253 @@
+import asyncio
+import time
+from bisect import bisect_right
+from collections import defaultdict
+from typing import TYPE_CHECKING
+
+from config import settings
+
+if TYPE_CHECKING:
+    from src.api.services.dictionary_queries import DictionaryQuery
+
+
+class DictionaryIndex:
+    """
+    Иерархия одного справочника в виде обхода Эйлера.
+
+    Каждому значению сопоставлен номер входа tin в прямом обходе дерева и
+    размер поддерева, поэтому потомки значения - это непрерывный срез
+    order[tin + 1 : tin + size], а проверка "a предок b" - два сравнения.
+    """
+
+    def __init__(self, rows: list[tuple[int, str, int | None]]):
+        """
+        :param rows: значения справочника (id, code, parent_id)
+        """
+        code_by_id = {row_id: code for row_id, code, _ in rows}
+        self.parent: dict[str, str | None] = {
+            code: code_by_id.get(parent_id) for _, code, parent_id in rows
+        }
+
+        children: dict[str | None, list[str]] = defaultdict(list)
+        for code, parent in self.parent.items():
+            children[parent].append(code)
+
+        self.order: list[str] = []
+        self.tin: dict[str, int] = {}
+        self.size: dict[str, int] = {}
+
+        for root in children[None]:
+            self._visit(root, children)
+
+        # Значения, зацикленные через parentid, недостижимы из корней - разрываем цикл
+        for code in list(self.parent):
+            if code not in self.tin:
+                self.parent[code] = None
+                self._visit(code, children)
+
+    def _visit(self, root: str, children: dict[str | None, list[str]]) -> None:
+        # Итеративный обход, чтобы глубокие справочники не упирались в recursion limit
+        stack = [(root, False)]
+        while stack:
+            code, leaving = stack.pop()
+            if leaving:
+                self.size[code] = len(self.order) - self.tin[code]
+                continue
+            if code in self.tin:
+                continue
+            self.tin[code] = len(self.order)
+            self.order.append(code)
+            stack.append((code, True))
+            stack.extend((child, False) for child in reversed(children[code]))
+
+    def __contains__(self, code: str) -> bool:
+        return code in self.tin
+
+    def descendants(self, code: str) -> list[str]:
+        start = self.tin[code]
+        return self.order[start + 1 : start + self.size[code]]
+
+    def ancestors(self, code: str) -> list[str]:
+        result = []
+        parent = self.parent[code]
+        while parent is not None:
+            result.append(parent)
+            parent = self.parent[parent]
+        return result
+
+    def is_ancestor(self, ancestor: str, code: str) -> bool:
+        start = self.tin[ancestor]
+        return start <= self.tin[code] < start + self.size[ancestor]
+
+    def intervals(self, codes: set[str]) -> tuple[list[int], list[int]]:
+        """
+        Объединить поддеревья значений в отсортированный набор непересекающихся
+        интервалов [start, end) по номерам обхода.
+
+        :param codes: коды значений
+        :return: tuple[starts, ends]
+        """
+        spans = sorted(
+            (self.tin[code], self.tin[code] + self.size[code])
+            for code in codes
+            if code in self.tin
+        )
+        starts: list[int] = []
+        ends: list[int] = []
+        for start, end in spans:
+            if ends and start < ends[-1]:
+                ends[-1] = max(ends[-1], end)
+                continue
+            starts.append(start)
+            ends.append(end)
+        return starts, ends
+
+
+class DictionaryCache:
+    """
+    Кэш иерархий справочников DictionaryValueList и прав ролей на их значения.
+
+    Справочник перечитывается только если изменилось количество его значений
+    или вырос максимальный updateDate; остальные остаются в памяти как есть.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.indexes: dict[str, DictionaryIndex] = {}
+        self.versions: dict[str, tuple] = {}
+        self.dictionaries_by_value: dict[str, set[str]] = defaultdict(set)
+        self.dvl_by_file_type: dict[str, set[str]] = defaultdict(set)
+        self._grants: dict[int, dict[str, set[str]]] = {}
+        self._grants_version: tuple | None = None
+        self._role_intervals: dict[tuple[int, str], tuple[list[int], list[int]]] = {}
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def refresh_if_stale(self, query: "DictionaryQuery") -> None:
+        """
+        Синхронизировать кэш с БД, если с прошлой проверки прошло больше ttl секунд.
+
+        :param query: DictionaryQuery текущей сессии
+        :return: None
+        """
+        if time.monotonic() - self._checked_at < self.ttl:
+            return
+        async with self._lock:
+            if time.monotonic() - self._checked_at < self.ttl:
+                return
+            await self.refresh(query)
+            self._checked_at = time.monotonic()
+
+    async def refresh(self, query: "DictionaryQuery") -> None:
+        """
+        Перечитать изменившиеся справочники, права ролей и связи FileType2DVL.
+
+        :param query: DictionaryQuery текущей сессии
+        :return: None
+        """
+        versions = await query.get_dictionary_versions()
+        changed = [
+            code
+            for code, version in versions.items()
+            if self.versions.get(code) != version
+        ]
+        removed = [code for code in self.versions if code not in versions]
+
+        if changed:
+            rows_by_dictionary = defaultdict(list)
+            for (
+                row_id,
+                dictionary_code,
+                code,
+                parent_id,
+            ) in await query.get_dictionary_values(changed):
+                rows_by_dictionary[dictionary_code].append((row_id, code, parent_id))
+            for dictionary_code in changed:
+                self.indexes[dictionary_code] = DictionaryIndex(
+                    rows_by_dictionary[dictionary_code]
+                )
+        for dictionary_code in removed:
+            self.indexes.pop(dictionary_code, None)
+
+        if changed or removed:
+            self.versions = versions
+            self.dictionaries_by_value = defaultdict(set)
+            for dictionary_code, index in self.indexes.items():
+                for code in index.order:
+                    self.dictionaries_by_value[code].add(dictionary_code)
+            self._role_intervals = {
+                key: value
+                for key, value in self._role_intervals.items()
+                if key[1] not in changed and key[1] not in removed
+            }
+
+        grants_version = await query.get_role_grants_version()
+        if grants_version != self._grants_version:
+            grants: dict[int, dict[str, set[str]]] = defaultdict(
+                lambda: defaultdict(set)
+            )
+            for (
+                role_group_id,
+                dictionary_code,
+                value_code,
+            ) in await query.get_role_grants():
+                grants[role_group_id][dictionary_code].add(value_code)
+            self._grants = grants
+            self._grants_version = grants_version
+            self._role_intervals = {}
+
+        dvl_by_file_type = defaultdict(set)
+        for file_type_code, dvl_code in await query.get_file_type_dvl():
+            dvl_by_file_type[file_type_code].add(dvl_code)
+        self.dvl_by_file_type = dvl_by_file_type
+
+    def reset_after_fork(self) -> None:
+        # Данные наследуются от родителя как есть, блокировка - новая
+        self._lock = asyncio.Lock()
+
+    def get_index(self, dictionary_code: str) -> DictionaryIndex | None:
+        return self.indexes.get(dictionary_code)
+
+    def role_can_access(
+        self, role_group_id: int, dictionary_code: str, value_code: str
+    ) -> bool:
+        """
+        Есть ли у роли доступ к значению: право на само значение или на любого
+        его предка. O(log n) по числу выданных роли поддеревьев.
+
+        :param role_group_id: id группы ролей
+        :param dictionary_code: код справочника
+        :param value_code: код значения
+        :return: bool
+        """
+        index = self.indexes.get(dictionary_code)
+        if index is None or value_code not in index:
+            return False
+        key = (role_group_id, dictionary_code)
+        if key not in self._role_intervals:
+            granted = self._grants.get(role_group_id, {}).get(dictionary_code, set())
+            self._role_intervals[key] = index.intervals(granted)
+        starts, ends = self._role_intervals[key]
+        position = index.tin[value_code]
+        i = bisect_right(starts, position) - 1
+        return i >= 0 and position < ends[i]
+
+    def role_can_access_file_type(
+        self, role_group_id: int, file_type_code: str
+    ) -> bool:
+        """
+        Есть ли у роли доступ хотя бы к одному значению справочника,
+        с которым связан тип файла через FileType2DVL.
+
+        :param role_group_id: id группы ролей
+        :param file_type_code: код типа файла
+        :return: bool
+        """
+        return any(
+            self.role_can_access(role_group_id, dictionary_code, dvl_code)
+            for dvl_code in self.dvl_by_file_type.get(file_type_code, ())
+            for dictionary_code in self.dictionaries_by_value.get(dvl_code, ())
+        )
+
+
+dictionary_cache = DictionaryCache(ttl=settings.DICTIONARY_CACHE_TTL)
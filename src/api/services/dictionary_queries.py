@@ -0,0 +1,175 @@
+from datetime import datetime
+
+from sqlalchemy import select, func, literal, Text
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.models import DictionaryValueList, Role2DictionaryValue, FileType2DVL
+from src.api.services.base_qurey import BaseQuery
+from src.api.services.dictionary_cache import dictionary_cache, DictionaryIndex
+from src.api.utils import raise_http_exception
+
+
+class DictionaryQuery(BaseQuery):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, DictionaryValueList)
+
+    async def get_dictionary_versions(self) -> dict[str, tuple[int, datetime | None]]:
+        """
+        Получить "версию" каждого справочника: количество значений и
+        максимальный updateDate. Изменение любого из них означает, что
+        справочник нужно перечитать (в том числе после удаления значений).
+
+        :return: dict[str, tuple[int, datetime | None]]
+        """
+        result = await self.session.execute(
+            select(
+                DictionaryValueList.dictionary_code,
+                func.count(DictionaryValueList.id),
+                func.max(DictionaryValueList.update_date),
+            ).group_by(DictionaryValueList.dictionary_code)
+        )
+        return {code: (count, updated) for code, count, updated in result.all()}
+
+    async def get_dictionary_values(
+        self, dictionary_codes: list[str]
+    ) -> list[tuple[int, str, str, int | None]]:
+        """
+        Получить значения указанных справочников.
+
+        :param dictionary_codes: коды справочников
+        :return: list[tuple[id, dictionary_code, code, parent_id]]
+        """
+        result = await self.session.execute(
+            select(
+                DictionaryValueList.id,
+                DictionaryValueList.dictionary_code,
+                DictionaryValueList.code,
+                DictionaryValueList.parent_id,
+            ).where(DictionaryValueList.dictionary_code.in_(dictionary_codes))
+        )
+        return [tuple(row) for row in result.all()]
+
+    async def get_role_grants_version(self) -> tuple[int, str | None]:
+        """
+        Получить "версию" таблицы Role2DictionaryValue: количество строк и md5
+        содержимого по порядку id. По count и max(id) не было бы видно UPDATE,
+        который перенацеливает существующее право на другую роль или значение.
+
+        :return: tuple[int, str | None]
+        """
+        row = func.json_build_array(
+            Role2DictionaryValue.id,
+            Role2DictionaryValue.role_group_id,
+            Role2DictionaryValue.dictionary_code,
+            Role2DictionaryValue.dictionary_value_code,
+        ).cast(Text)
+        result = await self.session.execute(
+            select(
+                func.count(Role2DictionaryValue.id),
+                func.md5(
+                    func.string_agg(
+                        row, aggregate_order_by(literal("\n"), Role2DictionaryValue.id)
+                    )
+                ),
+            )
+        )
+        return tuple(result.one())
+
+    async def get_role_grants(self) -> list[tuple[int, str, str]]:
+        """
+        Получить все права ролей на значения справочников.
+
+        :return: list[tuple[role_group_id, dictionary_code, dictionary_value_code]]
+        """
+        result = await self.session.execute(
+            select(
+                Role2DictionaryValue.role_group_id,
+                Role2DictionaryValue.dictionary_code,
+                Role2DictionaryValue.dictionary_value_code,
+            )
+        )
+        return [tuple(row) for row in result.all()]
+
+    async def get_file_type_dvl(self) -> list[tuple[str, str]]:
+        """
+        Получить связи типов файлов со значениями справочников.
+
+        :return: list[tuple[file_type_code, dvl_code]]
+        """
+        result = await self.session.execute(
+            select(FileType2DVL.file_type_code, FileType2DVL.dvl_code)
+        )
+        return [tuple(row) for row in result.all()]
+
+    async def get_dictionary_index(
+        self, dictionary_code: str, value_code: str
+    ) -> DictionaryIndex:
+        """
+        Получить закэшированную иерархию справочника, проверив наличие значения.
+
+        :param dictionary_code: код справочника
+        :param value_code: код значения
+        :return: DictionaryIndex
+        """
+        await dictionary_cache.refresh_if_stale(self)
+        index = dictionary_cache.get_index(dictionary_code)
+        if index is None or value_code not in index:
+            await raise_http_exception(
+                status_code=404,
+                detail=f"Value {value_code} of dictionary {dictionary_code} does not exist",
+            )
+        return index
+
+    async def get_value_descendants(
+        self, dictionary_code: str, value_code: str
+    ) -> list:
+        """
+        Получить всех потомков значения справочника.
+
+        :param dictionary_code: код справочника
+        :param value_code: код значения
+        :return: list
+        """
+        index = await self.get_dictionary_index(dictionary_code, value_code)
+        return index.descendants(value_code)
+
+    async def get_value_ancestors(self, dictionary_code: str, value_code: str) -> list:
+        """
+        Получить цепочку предков значения справочника, от родителя к корню.
+
+        :param dictionary_code: код справочника
+        :param value_code: код значения
+        :return: list
+        """
+        index = await self.get_dictionary_index(dictionary_code, value_code)
+        return index.ancestors(value_code)
+
+    async def check_role_dictionary_value_access(
+        self, role_group_id: int, dictionary_code: str, value_code: str
+    ) -> bool:
+        """
+        Проверить доступ роли к значению справочника с учетом иерархии.
+
+        :param role_group_id: id группы ролей
+        :param dictionary_code: код справочника
+        :param value_code: код значения
+        :return: bool
+        """
+        await dictionary_cache.refresh_if_stale(self)
+        return dictionary_cache.role_can_access(
+            role_group_id, dictionary_code, value_code
+        )
+
+    async def check_role_file_type_access(
+        self, role_group_id: int, file_type_code: str
+    ) -> bool:
+        """
+        Проверить доступ роли к типу файла через FileType2DVL и Role2DictionaryValue.
+
+        :param role_group_id: id группы ролей
+        :param file_type_code: код типа файла
+        :return: bool
+        """
+        await dictionary_cache.refresh_if_stale(self)
+        return dictionary_cache.role_can_access_file_type(role_group_id, file_type_code)
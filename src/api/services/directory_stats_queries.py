@@ -0,0 +1,69 @@
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.models import DirectoryList, DirectoryStats
+from src.api.schemas.directory_stats_schemas import (
+    DirectoryStatsBase,
+    DirectoryStatsReconcileReport,
+)
+from src.api.services.base_qurey import BaseQuery
+
+
+class DirectoryStatsQuery(BaseQuery):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, DirectoryStats)
+
+    async def get_directory_stats(self, id: int) -> DirectoryStatsBase:
+        """
+        Получить число файлов и их суммарный размер в каталоге и его поддереве.
+        Каталог без файлов в агрегатах не хранится - для него возвращаются нули.
+
+        :param id: id DirectoryList
+        :return: DirectoryStatsBase
+        """
+        await self.check_exists_or_raise(model=DirectoryList, status_code=404, id=id)
+        result = await self.get_object_by_kwargs(self.model, directory_id=id)
+        stats = result.scalars().first()
+        if stats is None:
+            return DirectoryStatsBase(directory_id=id)
+        return DirectoryStatsBase.model_validate(stats, from_attributes=True)
+
+    async def get_children_stats(self, parent_id: int) -> list[DirectoryStatsBase]:
+        """
+        Получить агрегаты всех непосредственных подкаталогов одним запросом.
+
+        :param parent_id: id родительского DirectoryList
+        :return: list[DirectoryStatsBase]
+        """
+        await self.check_exists_or_raise(
+            model=DirectoryList, status_code=404, id=parent_id
+        )
+        query = (
+            select(DirectoryList.id, DirectoryStats)
+            .outerjoin(DirectoryStats, DirectoryStats.directory_id == DirectoryList.id)
+            .where(DirectoryList.parent_id == parent_id)
+            .order_by(DirectoryList.id)
+        )
+        result = await self.session.execute(query)
+        return [
+            (
+                DirectoryStatsBase.model_validate(stats, from_attributes=True)
+                if stats is not None
+                else DirectoryStatsBase(directory_id=directory_id)
+            )
+            for directory_id, stats in result.all()
+        ]
+
+    async def reconcile(self) -> DirectoryStatsReconcileReport:
+        """
+        Пересчитать агрегаты по FileList и исправить разошедшиеся строки.
+
+        :return: DirectoryStatsReconcileReport
+        """
+        self.use_primary()
+        result = await self.session.execute(
+            text("SELECT repaired, removed FROM stg.directory_stats_reconcile()")
+        )
+        row = result.one()
+        await self.session.commit()
+        return DirectoryStatsReconcileReport(repaired=row.repaired, removed=row.removed)
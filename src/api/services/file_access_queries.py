@@ -0,0 +1,85 @@
+import base64
+
+from sqlalchemy import select, any_, bindparam, BigInteger
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.models import FileList, Role2FileType, Role2Directory, RoleGroupList
+from src.api.schemas.file_access_schemas import (
+    FileAccessCheckRequest,
+    FileAccessCheckResult,
+)
+from src.api.services.base_qurey import BaseQuery
+
+
+def build_bitmap(file_ids: list[int], allowed_ids: set[int]) -> tuple[bytes, int]:
+    """
+    Упаковать результат проверки в битовую карту по порядку file_ids.
+
+    :param file_ids: id файлов в порядке запроса
+    :param allowed_ids: id файлов, к которым есть доступ
+    :return: tuple[bitmap, число разрешенных позиций]
+    """
+    bits = 0
+    allowed = 0
+    for position, file_id in enumerate(file_ids):
+        if file_id in allowed_ids:
+            bits |= 1 << position
+            allowed += 1
+    return bits.to_bytes((len(file_ids) + 7) // 8, "little"), allowed
+
+
+class FileAccessQuery(BaseQuery):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, FileList)
+
+    async def get_allowed_file_ids(
+        self, role_group_id: int, file_ids: list[int]
+    ) -> set[int]:
+        """
+        Отобрать файлы, доступные группе ролей: тип файла разрешен через
+        Role2FileType и каталог файла разрешен через Role2Directory.
+        Список id передается одним параметром-массивом, поэтому текст запроса
+        не зависит от их числа и план переиспользуется.
+
+        :param role_group_id: id RoleGroupList
+        :param file_ids: id FileList
+        :return: set[int]
+        """
+        query = select(FileList.id).where(
+            FileList.id == any_(bindparam("file_ids", type_=ARRAY(BigInteger))),
+            FileList.file_type_id.in_(
+                select(Role2FileType.file_type_id).where(
+                    Role2FileType.role_group_id == role_group_id
+                )
+            ),
+            FileList.directory_id.in_(
+                select(Role2Directory.directory_id).where(
+                    Role2Directory.role_id == role_group_id
+                )
+            ),
+        )
+        result = await self.session.execute(query, {"file_ids": list(set(file_ids))})
+        return set(result.scalars().all())
+
+    async def check_file_access(
+        self, data: FileAccessCheckRequest
+    ) -> FileAccessCheckResult:
+        """
+        Проверить доступ группы ролей к пачке файлов. Несуществующие файлы
+        считаются недоступными.
+
+        :param data: группа ролей и id файлов
+        :return: FileAccessCheckResult
+        """
+        await self.check_exists_or_raise(
+            model=RoleGroupList, status_code=404, id=data.role_group_id
+        )
+        allowed_ids = await self.get_allowed_file_ids(data.role_group_id, data.file_ids)
+        bitmap, allowed = build_bitmap(data.file_ids, allowed_ids)
+        return FileAccessCheckResult(
+            role_group_id=data.role_group_id,
+            count=len(data.file_ids),
+            allowed=allowed,
+            bitmap=base64.b64encode(bitmap).decode(),
+        )
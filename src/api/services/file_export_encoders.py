@@ -0,0 +1,108 @@
+import csv
+import io
+from typing import AsyncIterator
+
+import orjson
+
+from src.api.services.file_export_queries import EXPORT_COLUMNS
+
+
+def flatten_row(row: dict, attribute_codes: list[str]) -> list:
+    attributes = row.get("attributes") or {}
+    return [row[column] for column in EXPORT_COLUMNS] + [
+        attributes.get(code) for code in attribute_codes
+    ]
+
+
+async def encode_ndjson(
+    chunks: AsyncIterator[list[dict]], attribute_codes: list[str]
+) -> AsyncIterator[bytes]:
+    async for rows in chunks:
+        yield b"".join(orjson.dumps(row) + b"\n" for row in rows)
+
+
+async def encode_csv(
+    chunks: AsyncIterator[list[dict]], attribute_codes: list[str]
+) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([*EXPORT_COLUMNS, *attribute_codes])
+    yield buffer.getvalue().encode("utf-8")
+    async for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(flatten_row(row, attribute_codes) for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Файлоподобный приемник, из которого ParquetWriter забирают по частям."""
+
+    def __init__(self):
+        self.parts: list[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+async def encode_parquet(
+    chunks: AsyncIterator[list[dict]], attribute_codes: list[str]
+) -> AsyncIterator[bytes]:
+    # pyarrow тяжелый и нужен только для этой выгрузки - импортируем по требованию
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [
+            ("id", pa.int64()),
+            ("fid", pa.string()),
+            ("file_name", pa.string()),
+            ("file_size", pa.int64()),
+            ("file_type", pa.string()),
+            ("status", pa.string()),
+            ("bucket", pa.string()),
+            ("directory_id", pa.int32()),
+            ("full_path", pa.string()),
+            ("create_date", pa.timestamp("us")),
+            ("update_date", pa.timestamp("us")),
+            ("actual_date", pa.timestamp("us")),
+            *((code, pa.string()) for code in attribute_codes),
+        ]
+    )
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        async for rows in chunks:
+            if not rows:
+                continue
+            columns = zip(*(flatten_row(row, attribute_codes) for row in rows))
+            arrays = [
+                pa.array(column, type=field.type)
+                for column, field in zip(columns, schema)
+            ]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {
+    "ndjson": (encode_ndjson, "application/x-ndjson"),
+    "csv": (encode_csv, "text/csv; charset=utf-8"),
+    "parquet": (encode_parquet, "application/vnd.apache.parquet"),
+}
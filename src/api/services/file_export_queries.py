@@ -0,0 +1,133 @@
+from typing import AsyncIterator
+
+from sqlalchemy import select, func, cast, String
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.models import (
+    FileList,
+    FileType,
+    StatusFileList,
+    BucketList,
+    FileAttributeValue,
+    AttributeList,
+    FileType2Attribute,
+)
+from src.api.schemas.file_export_schemas import FileExportFilter
+from src.api.services.base_qurey import BaseQuery
+
+
+EXPORT_COLUMNS = (
+    "id",
+    "fid",
+    "file_name",
+    "file_size",
+    "file_type",
+    "status",
+    "bucket",
+    "directory_id",
+    "full_path",
+    "create_date",
+    "update_date",
+    "actual_date",
+)
+
+
+class FileExportQuery(BaseQuery):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, FileList)
+
+    async def get_attribute_codes(self, file_type_id: int | None = None) -> list[str]:
+        """
+        Получить коды атрибутов, которые станут колонками выгрузки.
+
+        :param file_type_id: id типа файла; если не указан - все атрибуты
+        :return: list[str]
+        """
+        query = select(AttributeList.code).distinct().order_by(AttributeList.code)
+        if file_type_id is not None:
+            query = query.join(
+                FileType2Attribute, FileType2Attribute.attribute_id == AttributeList.id
+            ).where(FileType2Attribute.file_type_id == file_type_id)
+        result = await self.session.scalars(query)
+        return [code for code in result.all() if code]
+
+    @staticmethod
+    def build_export_query(data: FileExportFilter):
+        """
+        Собрать запрос выгрузки: FileList со справочными полями и атрибутами,
+        свернутыми в один jsonb {code: value} на файл.
+
+        :param data: фильтры выгрузки
+        :return: Select
+        """
+        attributes = (
+            select(
+                func.jsonb_object_agg(
+                    AttributeList.code,
+                    func.coalesce(
+                        FileAttributeValue.value_str,
+                        FileAttributeValue.value_code,
+                        cast(FileAttributeValue.value_date, String),
+                        cast(FileAttributeValue.value_number, String),
+                    ),
+                    type_=JSONB,
+                )
+            )
+            .select_from(FileAttributeValue)
+            .join(AttributeList, AttributeList.id == FileAttributeValue.attribute_id)
+            .where(
+                FileAttributeValue.file_id == FileList.id,
+                AttributeList.code.is_not(None),
+            )
+            .scalar_subquery()
+        )
+        query = (
+            select(
+                FileList.id.label("id"),
+                cast(FileList.fid, String).label("fid"),
+                FileList.file_name.label("file_name"),
+                FileList.file_size.label("file_size"),
+                FileType.name.label("file_type"),
+                StatusFileList.code.label("status"),
+                BucketList.name.label("bucket"),
+                FileList.directory_id.label("directory_id"),
+                FileList.full_path.label("full_path"),
+                FileList.create_date.label("create_date"),
+                FileList.update_date.label("update_date"),
+                FileList.actual_date.label("actual_date"),
+                attributes.label("attributes"),
+            )
+            .outerjoin(FileType, FileType.id == FileList.file_type_id)
+            .outerjoin(StatusFileList, StatusFileList.id == FileList.status_id)
+            .outerjoin(BucketList, BucketList.id == FileList.bucket_id)
+            .order_by(FileList.id)
+        )
+        filters = {
+            FileList.file_type_id: data.file_type_id,
+            FileList.directory_id: data.directory_id,
+            FileList.status_id: data.status_id,
+            FileList.bucket_id: data.bucket_id,
+        }
+        for column, value in filters.items():
+            if value is not None:
+                query = query.where(column == value)
+        if data.updated_since is not None:
+            query = query.where(FileList.update_date >= data.updated_since)
+        return query
+
+    async def stream_rows(
+        self, data: FileExportFilter, chunk_size: int
+    ) -> AsyncIterator[list[dict]]:
+        """
+        Читать выгрузку серверным курсором пачками по chunk_size строк.
+
+        :param data: фильтры выгрузки
+        :param chunk_size: размер пачки
+        :return: AsyncIterator[list[dict]]
+        """
+        result = await self.session.stream(
+            self.build_export_query(data).execution_options(yield_per=chunk_size)
+        )
+        async for partition in result.mappings().partitions():
+            yield [dict(row) for row in partition]
@@ -0,0 +1,281 @@
+import uuid
+from datetime import datetime
+from typing import AsyncIterator
+
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from src.api.models import FileList, FileAttributeValue, FileMeta
+from src.api.schemas.file_ingest_schemas import (
+    FileIngestRecord,
+    FileIngestError,
+    FileIngestBatchReport,
+)
+from src.api.services.base_qurey import BaseQuery
+from src.api.services.negative_cache import negative_cache
+from src.api.utils import iter_ndjson_batches
+
+
+STAGE_FILES_COLUMNS = (
+    "seq",
+    "fid",
+    "fileTypeId",
+    "fileName",
+    "fileSize",
+    "directoryId",
+    "fullPath",
+    "statusId",
+    "bucketId",
+    "flag",
+    "createUser",
+    "actualDate",
+)
+STAGE_ATTRIBUTES_COLUMNS = (
+    "seq",
+    "attributeId",
+    "valueStr",
+    "valueCode",
+    "valueDate",
+    "valueNumber",
+)
+STAGE_META_COLUMNS = ("seq", "meta")
+
+# Временные таблицы создаются через сессию по одной: так SQLAlchemy открывает
+# транзакцию до COPY через соединение драйвера, и ON COMMIT DROP удаляет их
+# только при commit пачки
+CREATE_STAGE_SQL = (
+    """CREATE TEMP TABLE file_ingest_files (
+    seq integer, fid uuid, "fileTypeId" integer, "fileName" varchar,
+    "fileSize" bigint, "directoryId" integer, "fullPath" varchar,
+    "statusId" integer, "bucketId" integer, flag integer,
+    "createUser" varchar, "actualDate" timestamp
+) ON COMMIT DROP""",
+    """CREATE TEMP TABLE file_ingest_attributes (
+    seq integer, "attributeId" integer, "valueStr" varchar, "valueCode" varchar,
+    "valueDate" timestamp, "valueNumber" double precision
+) ON COMMIT DROP""",
+    "CREATE TEMP TABLE file_ingest_meta (seq integer, meta jsonb) ON COMMIT DROP",
+)
+
+# Вставка всех трёх таблиц одним запросом: id новых FileList сопоставляются
+# со строками staging по fid, который генерируется для каждой записи заранее
+INSERT_FROM_STAGE_SQL = """
+WITH files AS (
+    INSERT INTO stg."FileList" (
+        fid, "fileTypeId", "fileName", "fileSize", "directoryId", "fullPath",
+        "statusId", "bucketId", flag, "createUser", "updateUser", "actualDate",
+        "createDate", "updateDate"
+    )
+    SELECT fid, "fileTypeId", "fileName", "fileSize", "directoryId", "fullPath",
+        "statusId", "bucketId", flag, "createUser", "createUser", "actualDate",
+        $1, $1
+    FROM file_ingest_files
+    ORDER BY seq
+    RETURNING id, fid, "fileTypeId"
+), attributes AS (
+    INSERT INTO stg."FileAttributeValue" (
+        "fileId", "attributeId", "valueStr", "valueCode", "valueDate",
+        "valueNumber", "fileTypeId", "createDate"
+    )
+    SELECT files.id, a."attributeId", a."valueStr", a."valueCode", a."valueDate",
+        a."valueNumber", files."fileTypeId", $1
+    FROM file_ingest_attributes a
+    JOIN file_ingest_files f ON f.seq = a.seq
+    JOIN files ON files.fid = f.fid
+    RETURNING 1
+), meta AS (
+    INSERT INTO stg."FileMeta" ("fileId", meta)
+    SELECT files.id, m.meta
+    FROM file_ingest_meta m
+    JOIN file_ingest_files f ON f.seq = m.seq
+    JOIN files ON files.fid = f.fid
+    RETURNING 1
+)
+SELECT
+    (SELECT count(*) FROM files) AS files,
+    (SELECT count(*) FROM attributes) AS attributes,
+    (SELECT count(*) FROM meta) AS meta
+"""
+
+
+class FileIngestQuery(BaseQuery):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, FileList)
+
+    @staticmethod
+    def parse_batch(
+        lines: list[tuple[int, bytes]], report: FileIngestBatchReport
+    ) -> list[FileIngestRecord]:
+        """
+        Разобрать строки NDJSON. Невалидные строки попадают в report.errors
+        и пропускаются, остальная пачка загружается.
+
+        :param lines: строки пачки (номер строки, строка)
+        :param report: отчет по пачке
+        :return: list[FileIngestRecord]
+        """
+        records = []
+        for line_no, line in lines:
+            try:
+                records.append(FileIngestRecord.model_validate_json(line))
+            except ValidationError as e:
+                report.errors.append(FileIngestError(line=line_no, error=str(e)))
+        return records
+
+    @staticmethod
+    def reject_duplicate_fids(
+        records: list[FileIngestRecord], report: FileIngestBatchReport
+    ) -> list[FileIngestRecord]:
+        """
+        Оставить первую запись с каждым fid, остальные записать в report.errors:
+        вложенные строки сопоставляются с файлом по fid, и повтор в пачке
+        размножил бы атрибуты и meta.
+
+        :param records: записи файлов
+        :param report: отчет по пачке
+        :return: list[FileIngestRecord]
+        """
+        seen = set()
+        unique = []
+        for record in records:
+            if record.fid is not None:
+                if record.fid in seen:
+                    report.errors.append(
+                        FileIngestError(error=f"Повторный fid {record.fid} в пачке")
+                    )
+                    continue
+                seen.add(record.fid)
+            unique.append(record)
+        return unique
+
+    @staticmethod
+    def build_stage_rows(records: list[FileIngestRecord]) -> tuple[list, list, list]:
+        """
+        Преобразовать записи в строки для COPY во временные таблицы.
+
+        :param records: записи файлов
+        :return: tuple[files, attributes, meta]
+        """
+        files, attributes, meta = [], [], []
+        for seq, record in enumerate(records):
+            files.append(
+                (
+                    seq,
+                    record.fid or uuid.uuid4(),
+                    record.file_type_id,
+                    record.file_name,
+                    record.file_size,
+                    record.directory_id,
+                    record.full_path,
+                    record.status_id,
+                    record.bucket_id,
+                    record.flag,
+                    record.create_user,
+                    record.actual_date,
+                )
+            )
+            attributes.extend(
+                (
+                    seq,
+                    attr.attribute_id,
+                    attr.value_str,
+                    attr.value_code,
+                    attr.value_date,
+                    attr.value_number,
+                )
+                for attr in record.attributes
+            )
+            if record.meta is not None:
+                meta.append((seq, orjson.dumps(record.meta).decode()))
+        return files, attributes, meta
+
+    async def ingest_batch(
+        self, batch_no: int, lines: list[tuple[int, bytes]]
+    ) -> FileIngestBatchReport:
+        """
+        Разобрать и загрузить пачку строк NDJSON.
+
+        :param batch_no: номер пачки
+        :param lines: строки пачки
+        :return: FileIngestBatchReport
+        """
+        report = FileIngestBatchReport(batch=batch_no)
+        records = self.parse_batch(lines, report)
+        return await self.ingest_records(records, report)
+
+    async def ingest_records(
+        self,
+        records: list[FileIngestRecord],
+        report: FileIngestBatchReport | None = None,
+    ) -> FileIngestBatchReport:
+        """
+        Загрузить пачку через COPY во временные таблицы и одним запросом
+        перенести её в FileList, FileAttributeValue и FileMeta.
+        Каждая пачка - отдельная транзакция: ошибка откатывает только её.
+
+        :param records: записи файлов
+        :param report: отчет по пачке, в который дописывается результат
+        :return: FileIngestBatchReport
+        """
+        report = report or FileIngestBatchReport(batch=1)
+        records = self.reject_duplicate_fids(records, report)
+        files, attributes, meta = self.build_stage_rows(records)
+        if not files:
+            return report
+
+        self.use_primary()
+        try:
+            for statement in CREATE_STAGE_SQL:
+                await self.session.execute(text(statement))
+            connection = await self.session.connection()
+            driver = (await connection.get_raw_connection()).driver_connection
+            await driver.copy_records_to_table(
+                "file_ingest_files", records=files, columns=STAGE_FILES_COLUMNS
+            )
+            if attributes:
+                await driver.copy_records_to_table(
+                    "file_ingest_attributes",
+                    records=attributes,
+                    columns=STAGE_ATTRIBUTES_COLUMNS,
+                )
+            if meta:
+                await driver.copy_records_to_table(
+                    "file_ingest_meta", records=meta, columns=STAGE_META_COLUMNS
+                )
+            counts = await driver.fetchrow(INSERT_FROM_STAGE_SQL, datetime.now())
+            await self.session.commit()
+            # Запросы через asyncpg не видны событиям SQLAlchemy
+            for model in (FileList, FileAttributeValue, FileMeta):
+                negative_cache.invalidate(model.__tablename__)
+        except Exception as e:
+            await self.session.rollback()
+            report.errors.append(FileIngestError(error=str(e)))
+            return report
+
+        report.files = counts["files"]
+        report.attributes = counts["attributes"]
+        report.meta = counts["meta"]
+        return report
+
+    async def ingest_ndjson(
+        self, chunks: AsyncIterator[bytes], batch_size: int | None = None
+    ) -> list[FileIngestBatchReport]:
+        """
+        Загрузить поток NDJSON с описаниями файлов пачками по batch_size строк.
+
+        :param chunks: поток байтов тела запроса
+        :param batch_size: размер пачки
+        :return: list[FileIngestBatchReport]
+        """
+        reports = []
+        batches = iter_ndjson_batches(
+            chunks, batch_size or settings.FILE_INGEST_BATCH_SIZE
+        )
+        batch_no = 0
+        async for lines in batches:
+            batch_no += 1
+            reports.append(await self.ingest_batch(batch_no, lines))
+        return reports
@@ -0,0 +1,84 @@
+from sqlalchemy import select, cast, literal, tuple_
+from sqlalchemy.dialects.postgresql import JSONPATH
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.models import FileMeta
+from src.api.schemas.file_meta_schemas import (
+    FileMetaSearch,
+    FileMetaItem,
+    FileMetaPage,
+)
+from src.api.services.base_qurey import BaseQuery
+from src.api.utils import raise_http_exception
+
+
+class FileMetaQuery(BaseQuery):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, FileMeta)
+
+    @staticmethod
+    def build_conditions(data: FileMetaSearch) -> list:
+        """
+        Собрать условия поиска по meta в виде операторов, которые обслуживает
+        GIN-индекс jsonb_path_ops: @>, @@ и @?.
+
+        :param data: параметры поиска
+        :return: list
+        """
+        conditions = []
+        if data.contains:
+            conditions.append(FileMeta.meta.contains(data.contains))
+        for predicate in data.match:
+            conditions.append(
+                FileMeta.meta.op("@@")(cast(literal(predicate), JSONPATH))
+            )
+        for path in data.exists:
+            conditions.append(FileMeta.meta.op("@?")(cast(literal(path), JSONPATH)))
+        if data.after_file_id is not None:
+            conditions.append(
+                tuple_(FileMeta.file_id, FileMeta.id)
+                > tuple_(data.after_file_id, data.after_meta_id or 0)
+            )
+        return conditions
+
+    async def search_file_meta(self, data: FileMetaSearch) -> FileMetaPage:
+        """
+        Найти FileMeta по условиям на meta и вернуть только запрошенные ключи.
+        Пагинация - keyset по (fileId, id).
+
+        :param data: параметры поиска
+        :return: FileMetaPage
+        """
+        projections = [
+            FileMeta.meta[tuple(field.split("."))].label(f"f{i}")
+            for i, field in enumerate(data.fields)
+        ]
+        query = (
+            select(FileMeta.file_id, FileMeta.id, *projections)
+            .where(*self.build_conditions(data))
+            .order_by(FileMeta.file_id, FileMeta.id)
+            .limit(data.limit)
+        )
+        try:
+            rows = (await self.session.execute(query)).all()
+        except DBAPIError as e:
+            await raise_http_exception(status_code=400, detail=str(e.orig))
+
+        items = [
+            FileMetaItem(
+                file_id=row[0],
+                meta_id=row[1],
+                meta={
+                    field: value
+                    for field, value in zip(data.fields, row[2:])
+                    if value is not None
+                },
+            )
+            for row in rows
+        ]
+        page = FileMetaPage(items=items)
+        if len(items) == data.limit:
+            page.next_after_file_id = items[-1].file_id
+            page.next_after_meta_id = items[-1].meta_id
+        return page
@@ -0,0 +1,390 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from elasticsearch import AsyncElasticsearch, NotFoundError
+from elasticsearch import ConnectionError as ESConnectionError, ConnectionTimeout
+from elasticsearch.helpers import async_bulk
+
+from config import settings
+from src.api.schemas.file_search_schemas import (
+    FileSearchRequest,
+    FileSearchResult,
+    FileSearchSyncReport,
+)
+from src.api.services.file_search_queries import FileSearchQuery
+
+
+FILE_INDEX_MAPPING = {
+    "properties": {
+        "id": {"type": "long"},
+        "file_name": {
+            "type": "text",
+            "fields": {"keyword": {"type": "keyword", "ignore_above": 512}},
+        },
+        "full_path": {
+            "type": "text",
+            "fields": {"keyword": {"type": "keyword", "ignore_above": 2048}},
+        },
+        "file_size": {"type": "long"},
+        "file_type_id": {"type": "integer"},
+        "status_id": {"type": "integer"},
+        "bucket_id": {"type": "integer"},
+        "directory_id": {"type": "integer"},
+        "create_date": {"type": "date"},
+        "update_date": {"type": "date"},
+        "attributes": {
+            "type": "nested",
+            "properties": {
+                "code": {"type": "keyword"},
+                "value": {
+                    "type": "text",
+                    "fields": {"keyword": {"type": "keyword", "ignore_above": 256}},
+                },
+            },
+        },
+    }
+}
+
+FACET_FIELDS = ("file_type_id", "status_id", "bucket_id")
+
+_client: AsyncElasticsearch | None = None
+
+
+def get_es_client() -> AsyncElasticsearch:
+    """
+    Получить общий на процесс клиент ES (создается при первом обращении).
+
+    :return: AsyncElasticsearch
+    """
+    global _client
+    if _client is None:
+        _client = AsyncElasticsearch(
+            hosts=[f"http://{settings.ES_HOST}:{settings.ES_PORT}"]
+        )
+    return _client
+
+
+async def close_es_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def reset_es_client() -> None:
+    """Забыть клиент родительского процесса после fork."""
+    global _client
+    _client = None
+
+
+class FileSearchIndexer:
+    """
+    Инкрементальная синхронизация FileList в индекс ES.
+
+    self.index - алиас: поиск и синхронизация идут через него, а полная
+    переиндексация (full=True) строит новый индекс <алиас>-<время>, атомарно
+    переключает на него алиас и удаляет старый. Так из индекса уходят и
+    удаленные из FileList строки, которые по updateDate не видны.
+
+    Водяной знак (updateDate, id) последнего проиндексированного файла хранится
+    в _meta маппинга самого индекса. updateDate ставится до commit, поэтому
+    транзакция, закоммиченная позже более короткой, может оказаться ниже уже
+    сдвинутого водяного знака: каждая синхронизация заново индексирует файлы
+    за safety_window секунд до него (повторная индексация идемпотентна).
+    """
+
+    def __init__(
+        self,
+        client: AsyncElasticsearch,
+        index: str = settings.ES_FILE_INDEX,
+        batch_size: int = settings.ES_SYNC_BATCH_SIZE,
+        concurrency: int = settings.ES_SYNC_CONCURRENCY,
+        max_retries: int = settings.ES_SYNC_MAX_RETRIES,
+        safety_window: float = settings.ES_SYNC_SAFETY_WINDOW,
+    ):
+        self.client = client
+        self.index = index
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.safety_window = safety_window
+
+    def new_index_name(self) -> str:
+        return f"{self.index}-{datetime.now():%Y%m%d%H%M%S%f}"
+
+    async def create_index(self, name: str, alias: bool) -> None:
+        await self.client.indices.create(
+            index=name,
+            mappings=FILE_INDEX_MAPPING,
+            aliases={self.index: {}} if alias else None,
+        )
+
+    async def ensure_index(self) -> None:
+        # exists верно и для алиаса, и для индекса с этим именем из прошлых
+        # версий: такой индекс заменяется алиасом при полной переиндексации
+        if not await self.client.indices.exists(index=self.index):
+            await self.create_index(self.new_index_name(), alias=True)
+
+    async def get_watermark(self, index: str) -> tuple[datetime | None, int]:
+        try:
+            mapping = await self.client.indices.get_mapping(index=index)
+        except NotFoundError:
+            return None, 0
+        # Ответ по алиасу приходит под именем индекса
+        meta = next(iter(mapping.body.values()))["mappings"].get("_meta", {})
+        if not meta.get("watermark_date"):
+            return None, 0
+        return datetime.fromisoformat(meta["watermark_date"]), meta["watermark_id"]
+
+    async def set_watermark(
+        self, index: str, date: datetime | None, file_id: int
+    ) -> None:
+        await self.client.indices.put_mapping(
+            index=index,
+            meta={
+                "watermark_date": date.isoformat() if date else None,
+                "watermark_id": file_id,
+            },
+        )
+
+    @staticmethod
+    def build_actions(
+        index: str, files: list[dict], attributes: dict[int, list[dict]]
+    ) -> list[dict]:
+        return [
+            {
+                "_op_type": "index",
+                "_index": index,
+                "_id": file["id"],
+                "_source": {**file, "attributes": attributes.get(file["id"], [])},
+            }
+            for file in files
+        ]
+
+    async def _bulk_with_retry(self, actions: list[dict]) -> tuple[int, list]:
+        # 429 от ES повторяет сам async_bulk, сетевые ошибки - этот цикл
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await async_bulk(
+                    self.client,
+                    actions,
+                    raise_on_error=False,
+                    max_retries=self.max_retries,
+                )
+            except (ESConnectionError, ConnectionTimeout):
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(2**attempt)
+
+    async def _index_files(
+        self,
+        query: FileSearchQuery,
+        index: str,
+        after_date: datetime | None,
+        after_id: int,
+    ) -> FileSearchSyncReport:
+        """
+        Проиндексировать в index файлы после (after_date, after_id) и сдвинуть
+        водяной знак index.
+
+        Пачки читаются из БД последовательно, а в ES отправляются параллельно,
+        не более concurrency одновременно. Водяной знак сдвигается только до
+        последней пачки, перед которой все пачки проиндексированы без ошибок.
+
+        :param query: FileSearchQuery текущей сессии
+        :param index: индекс или алиас
+        :param after_date: updateDate, с которого начать; None - с начала
+        :param after_id: id, с которого начать
+        :return: FileSearchSyncReport
+        """
+        report = FileSearchSyncReport()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        pages: list[tuple[tuple[datetime, int], asyncio.Task]] = []
+
+        async def send(actions: list[dict]) -> tuple[int, list]:
+            try:
+                return await self._bulk_with_retry(actions)
+            finally:
+                semaphore.release()
+
+        while True:
+            files = await query.get_changed_files(after_date, after_id, self.batch_size)
+            if not files:
+                break
+            attributes = await query.get_attributes([file["id"] for file in files])
+            actions = self.build_actions(index, files, attributes)
+            await semaphore.acquire()
+            after_date, after_id = files[-1]["update_date"], files[-1]["id"]
+            pages.append(((after_date, after_id), asyncio.create_task(send(actions))))
+            if len(files) < self.batch_size:
+                break
+
+        results = await asyncio.gather(
+            *(task for _, task in pages), return_exceptions=True
+        )
+        watermark = None
+        for (stamp, _), result in zip(pages, results):
+            if isinstance(result, Exception):
+                report.errors.append(str(result))
+                break
+            indexed, errors = result
+            report.indexed += indexed
+            if errors:
+                report.errors.extend(str(error) for error in errors[:10])
+                break
+            watermark = stamp
+        if watermark is not None:
+            await self.set_watermark(index, *watermark)
+            report.watermark_date, report.watermark_id = watermark
+        return report
+
+    async def rebuild(self, query: FileSearchQuery) -> FileSearchSyncReport:
+        """
+        Построить новый индекс из всего FileList и переключить на него алиас.
+        При ошибках новый индекс удаляется, алиас остается на старом.
+
+        :param query: FileSearchQuery текущей сессии
+        :return: FileSearchSyncReport
+        """
+        target = self.new_index_name()
+        await self.create_index(target, alias=False)
+        try:
+            report = await self._index_files(query, target, None, 0)
+        except BaseException:
+            await self.client.indices.delete(index=target)
+            raise
+        if report.errors:
+            await self.client.indices.delete(index=target)
+            return report
+
+        actions = [{"add": {"index": target, "alias": self.index}}]
+        old_indices = []
+        if await self.client.indices.exists_alias(name=self.index):
+            old_indices = list(
+                (await self.client.indices.get_alias(name=self.index)).body
+            )
+            actions += [
+                {"remove": {"index": old, "alias": self.index}} for old in old_indices
+            ]
+        elif await self.client.indices.exists(index=self.index):
+            # Индекс с именем алиаса из прошлых версий удаляется тем же запросом
+            actions.append({"remove_index": {"index": self.index}})
+        await self.client.indices.update_aliases(actions=actions)
+        if old_indices:
+            await self.client.indices.delete(index=",".join(old_indices))
+        return report
+
+    async def sync(
+        self, query: FileSearchQuery, full: bool = False
+    ) -> FileSearchSyncReport:
+        """
+        Проиндексировать файлы, измененные после водяного знака за вычетом
+        safety_window, или (full=True) переиндексировать все в новый индекс.
+
+        :param query: FileSearchQuery текущей сессии
+        :param full: полная переиндексация с удалением пропавших из FileList файлов
+        :return: FileSearchSyncReport
+        """
+        if full:
+            return await self.rebuild(query)
+        await self.ensure_index()
+        after_date, after_id = await self.get_watermark(self.index)
+        if after_date is not None:
+            after_date -= timedelta(seconds=self.safety_window)
+            after_id = 0
+        return await self._index_files(query, self.index, after_date, after_id)
+
+
+async def search_files(
+    client: AsyncElasticsearch, data: FileSearchRequest
+) -> FileSearchResult:
+    """
+    Полнотекстовый поиск по имени, пути и значениям атрибутов с фасетами.
+
+    :param client: клиент ES
+    :param data: параметры поиска
+    :return: FileSearchResult
+    """
+    must = []
+    if data.text:
+        must.append(
+            {
+                "bool": {
+                    "should": [
+                        {
+                            "multi_match": {
+                                "query": data.text,
+                                "fields": ["file_name^3", "full_path"],
+                            }
+                        },
+                        {
+                            "nested": {
+                                "path": "attributes",
+                                "query": {"match": {"attributes.value": data.text}},
+                            }
+                        },
+                    ]
+                }
+            }
+        )
+    filters = [
+        {"term": {field: getattr(data, field)}}
+        for field in FACET_FIELDS
+        if getattr(data, field) is not None
+    ]
+    for code, value in data.attributes.items():
+        filters.append(
+            {
+                "nested": {
+                    "path": "attributes",
+                    "query": {
+                        "bool": {
+                            "filter": [
+                                {"term": {"attributes.code": code}},
+                                {"term": {"attributes.value.keyword": value}},
+                            ]
+                        }
+                    },
+                }
+            }
+        )
+
+    aggregations = {
+        field: {"terms": {"field": field, "size": 50}} for field in FACET_FIELDS
+    }
+    aggregations["attributes"] = {
+        "nested": {"path": "attributes"},
+        "aggs": {
+            "code": {
+                "terms": {"field": "attributes.code", "size": 50},
+                "aggs": {
+                    "value": {
+                        "terms": {"field": "attributes.value.keyword", "size": 20}
+                    }
+                },
+            }
+        },
+    }
+    response = await client.search(
+        index=settings.ES_FILE_INDEX,
+        query={"bool": {"must": must or [{"match_all": {}}], "filter": filters}},
+        aggregations=aggregations,
+        from_=data.offset,
+        size=data.limit,
+        source_excludes=["attributes"],
+    )
+
+    aggs = response["aggregations"]
+    facets = {
+        field: {str(b["key"]): b["doc_count"] for b in aggs[field]["buckets"]}
+        for field in FACET_FIELDS
+    }
+    for bucket in aggs["attributes"]["code"]["buckets"]:
+        facets[f"attributes.{bucket['key']}"] = {
+            b["key"]: b["doc_count"] for b in bucket["value"]["buckets"]
+        }
+    return FileSearchResult(
+        total=response["hits"]["total"]["value"],
+        items=[hit["_source"] for hit in response["hits"]["hits"]],
+        facets=facets,
+    )
@@ -0,0 +1,73 @@
+from datetime import datetime
+
+from sqlalchemy import select, func, cast, String, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.models import FileList, FileAttributeValue, AttributeList
+from src.api.services.base_qurey import BaseQuery
+
+
+class FileSearchQuery(BaseQuery):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, FileList)
+
+    async def get_changed_files(
+        self, after_date: datetime | None, after_id: int, limit: int
+    ) -> list[dict]:
+        """
+        Получить пачку файлов, измененных после водяного знака (updateDate, id).
+        Сортировка по той же паре, чтобы файлы с одинаковым updateDate
+        не терялись на границе пачек.
+
+        :param after_date: updateDate водяного знака; None - с начала
+        :param after_id: id водяного знака
+        :param limit: размер пачки
+        :return: list[dict]
+        """
+        query = select(
+            FileList.id,
+            FileList.file_name,
+            FileList.full_path,
+            FileList.file_size,
+            FileList.file_type_id,
+            FileList.status_id,
+            FileList.bucket_id,
+            FileList.directory_id,
+            FileList.create_date,
+            FileList.update_date,
+        ).where(FileList.update_date.is_not(None))
+        if after_date is not None:
+            query = query.where(
+                tuple_(FileList.update_date, FileList.id) > tuple_(after_date, after_id)
+            )
+        query = query.order_by(FileList.update_date, FileList.id).limit(limit)
+        result = await self.session.execute(query)
+        return [dict(row) for row in result.mappings().all()]
+
+    async def get_attributes(self, file_ids: list[int]) -> dict[int, list[dict]]:
+        """
+        Получить атрибуты файлов в виде {file_id: [{"code": ..., "value": ...}]}.
+
+        :param file_ids: id файлов
+        :return: dict[int, list[dict]]
+        """
+        result = await self.session.execute(
+            select(
+                FileAttributeValue.file_id,
+                AttributeList.code,
+                func.coalesce(
+                    FileAttributeValue.value_str,
+                    FileAttributeValue.value_code,
+                    cast(FileAttributeValue.value_date, String),
+                    cast(FileAttributeValue.value_number, String),
+                ),
+            )
+            .join(AttributeList, AttributeList.id == FileAttributeValue.attribute_id)
+            .where(FileAttributeValue.file_id.in_(file_ids))
+        )
+        attributes: dict[int, list[dict]] = {}
+        for file_id, code, value in result.all():
+            if code is None or value is None:
+                continue
+            attributes.setdefault(file_id, []).append({"code": code, "value": value})
+        return attributes
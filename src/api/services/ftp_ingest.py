@@ -0,0 +1,381 @@
+import asyncio
+import io
+import posixpath
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator
+
+import aioftp
+from minio import Minio
+
+from config import settings
+from src.api.services.bucket_tiering import get_minio_client
+from src.api.schemas.file_ingest_schemas import FileIngestRecord
+from src.api.schemas.ftp_ingest_schemas import (
+    FtpPollRequest,
+    FtpPollReport,
+    FtpPollError,
+)
+from src.api.services.file_ingest_queries import FileIngestQuery
+from src.api.services.ftp_ingest_queries import FtpIngestQuery
+
+
+def parse_modify(modify: str) -> datetime | None:
+    try:
+        return datetime.strptime(modify[:14], "%Y%m%d%H%M%S")
+    except ValueError:
+        return None
+
+
+class FtpConnectionPool:
+    """
+    Небольшой пул авторизованных FTP-соединений одного FtpSetting.
+
+    У пула свой пул потоков на два потока на соединение: put_object в MinIO
+    и передача ему блоков. Потоки загрузки ждут блоков, поэтому в общем
+    executor они заняли бы потоки, нужные для передачи, и забор бы встал.
+    """
+
+    def __init__(self, setting, size: int):
+        self.setting = setting
+        self.size = size
+        self._idle: list[aioftp.Client] = []
+        self._slots = asyncio.Semaphore(size)
+        # Сколько заборов сейчас пользуются пулом (FtpPoolRegistry.use)
+        self.users = 0
+        self.executor = ThreadPoolExecutor(
+            max_workers=2 * size, thread_name_prefix=f"ftp-{setting.id}"
+        )
+
+    async def _connect(self) -> aioftp.Client:
+        host, _, port = self.setting.host.partition(":")
+        client = aioftp.Client(
+            socket_timeout=self.setting.timeout,
+            connection_timeout=self.setting.timeout,
+            encoding=self.setting.encoding or "utf-8",
+        )
+        await client.connect(host, int(port or 21))
+        await client.login(
+            self.setting.user or "anonymous",
+            self.setting.passwd or "anon@",
+            self.setting.acct or "",
+        )
+        return client
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[aioftp.Client]:
+        """
+        Взять соединение из пула; сломанное соединение в пул не возвращается.
+
+        :return: AsyncIterator[aioftp.Client]
+        """
+        async with self._slots:
+            client = self._idle.pop() if self._idle else await self._connect()
+            try:
+                yield client
+            except BaseException:
+                client.close()
+                raise
+            self._idle.append(client)
+
+    async def close(self) -> None:
+        self.executor.shutdown(wait=False)
+        while self._idle:
+            client = self._idle.pop()
+            try:
+                await client.quit()
+            except Exception:
+                client.close()
+
+
+class FtpPoolRegistry:
+    """
+    Пулы соединений по FtpSetting.id; пул пересоздается при изменении настроек.
+    Старый пул закрывается, когда его отпустят все забирающие через него
+    запросы: иначе их потоки загрузки остались бы без executor.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._pools: dict[int, tuple[tuple, FtpConnectionPool]] = {}
+        self._retired: list[FtpConnectionPool] = []
+
+    @staticmethod
+    def signature(setting) -> tuple:
+        return (
+            setting.host,
+            setting.user,
+            setting.passwd,
+            setting.acct,
+            setting.timeout,
+            setting.encoding,
+        )
+
+    def _get(self, setting) -> FtpConnectionPool:
+        signature = self.signature(setting)
+        current = self._pools.get(setting.id)
+        if current is not None and current[0] == signature:
+            return current[1]
+        if current is not None:
+            self._retired.append(current[1])
+        pool = FtpConnectionPool(setting, self.size)
+        self._pools[setting.id] = (signature, pool)
+        return pool
+
+    async def _close_retired(self) -> None:
+        retired, self._retired = self._retired, []
+        for pool in retired:
+            if pool.users == 0:
+                await pool.close()
+            else:
+                self._retired.append(pool)
+
+    @asynccontextmanager
+    async def use(self, setting) -> AsyncIterator[FtpConnectionPool]:
+        """
+        Взять пул для FtpSetting на время забора.
+
+        :param setting: FtpSetting
+        :return: AsyncIterator[FtpConnectionPool]
+        """
+        pool = self._get(setting)
+        pool.users += 1
+        try:
+            yield pool
+        finally:
+            pool.users -= 1
+            await self._close_retired()
+
+
+class _QueueReader(io.RawIOBase):
+    """
+    Файлоподобный объект для put_object: блоки, скачанные в event loop,
+    передаются потоку загрузки через ограниченную очередь, без временных файлов.
+    """
+
+    def __init__(self, maxsize: int = 8):
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._buffer = b""
+        self._eof = False
+        # aborted - загрузка завершилась, failed - скачивание с FTP оборвалось
+        self.aborted = False
+        self.failed = False
+
+    def readable(self) -> bool:
+        return True
+
+    def feed(self, block: bytes | None) -> None:
+        # Вызывается из пула потоков; если загрузка упала, не ждем вечно
+        while not self.aborted:
+            try:
+                self._queue.put(block, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            try:
+                block = self._queue.get(timeout=1)
+            except queue.Empty:
+                if self.failed:
+                    raise IOError("FTP download failed")
+                continue
+            if block is None:
+                self._eof = True
+            else:
+                self._buffer += block
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+class FtpIngestPoller:
+    """
+    Забор новых файлов с FTP: инкрементальный листинг, параллельная потоковая
+    перекачка в MinIO и массовая регистрация в FileList через COPY.
+
+    Водяной знак - максимальный MDTM уже забранных файлов для пары
+    (FtpSetting.id, путь); хранится в памяти процесса, поэтому дополнительно
+    отбрасываются файлы, путь которых уже есть в FileList.
+    """
+
+    def __init__(
+        self,
+        registry: FtpPoolRegistry,
+        minio_client: Minio,
+        bucket: str = settings.BUCKET_FOR_UPLOAD,
+        block_size: int = settings.FTP_DOWNLOAD_BLOCK_SIZE,
+    ):
+        self.registry = registry
+        self.minio_client = minio_client
+        self.bucket = bucket
+        self.block_size = block_size
+        self.watermarks: dict[tuple[int, str], str] = {}
+
+    @staticmethod
+    def object_name(setting_id: int, remote_path: str) -> str:
+        return f"ftp/{setting_id}/{remote_path.lstrip('/')}"
+
+    async def list_new_files(
+        self, pool: FtpConnectionPool, root: str, since: str
+    ) -> list[tuple[str, int, str]]:
+        """
+        Рекурсивно получить файлы, измененные не раньше водяного знака
+        (MDTM с точностью до секунды, повторы отсекаются по FileList).
+
+        :param pool: пул соединений
+        :param root: каталог на FTP
+        :param since: водяной знак в формате MDTM (YYYYMMDDHHMMSS)
+        :return: list[tuple[путь, размер, modify]]
+        """
+        files = []
+        async with pool.connection() as client:
+            async for path, info in client.list(root, recursive=True):
+                if info.get("type") != "file":
+                    continue
+                modify = info.get("modify", "")
+                if modify and modify < since:
+                    continue
+                files.append((str(path), int(info.get("size", 0)), modify))
+        return files
+
+    async def upload(
+        self, pool: FtpConnectionPool, remote_path: str, object_name: str
+    ) -> None:
+        """
+        Перекачать файл с FTP в MinIO потоком, не сохраняя на диск.
+
+        :param pool: пул соединений
+        :param remote_path: путь на FTP
+        :param object_name: имя объекта в бакете
+        :return: None
+        """
+        reader = _QueueReader()
+
+        def put() -> None:
+            try:
+                self.minio_client.put_object(
+                    self.bucket,
+                    object_name,
+                    reader,
+                    length=-1,
+                    part_size=10 * 1024 * 1024,
+                )
+            finally:
+                reader.aborted = True
+
+        loop = asyncio.get_running_loop()
+        # Поток загрузки стартует только с соединением в руках: без него он
+        # ждал бы блоков, занимая поток
+        async with pool.connection() as client:
+            put_future = loop.run_in_executor(pool.executor, put)
+            try:
+                async with client.download_stream(remote_path) as stream:
+                    async for block in stream.iter_by_block(self.block_size):
+                        if put_future.done():
+                            break
+                        await loop.run_in_executor(pool.executor, reader.feed, block)
+                await loop.run_in_executor(pool.executor, reader.feed, None)
+            except BaseException:
+                reader.failed = True
+                put_future.cancel()
+                raise
+            await put_future
+
+    async def poll(
+        self,
+        ftp_query: FtpIngestQuery,
+        ingest_query: FileIngestQuery,
+        data: FtpPollRequest,
+    ) -> FtpPollReport:
+        """
+        Забрать новые файлы одного FtpSetting и зарегистрировать их в FileList.
+
+        :param ftp_query: FtpIngestQuery текущей сессии
+        :param ingest_query: FileIngestQuery текущей сессии
+        :param data: параметры забора
+        :return: FtpPollReport
+        """
+        setting = await ftp_query.get_ftp_setting(id=data.ftp_setting_id)
+        key = (setting.id, data.path)
+        report = FtpPollReport()
+
+        async with self.registry.use(setting) as pool:
+            listed = await self.list_new_files(
+                pool, data.path, self.watermarks.get(key, "")
+            )
+            report.listed = len(listed)
+            names = {path: self.object_name(setting.id, path) for path, _, _ in listed}
+            registered = await ftp_query.get_registered_paths(list(names.values()))
+            pending = [item for item in listed if names[item[0]] not in registered]
+
+            # Параллельность ограничена размером пула соединений
+            slots = asyncio.Semaphore(pool.size)
+
+            async def upload(path: str) -> None:
+                async with slots:
+                    await self.upload(pool, path, names[path])
+
+            results = await asyncio.gather(
+                *(upload(path) for path, _, _ in pending), return_exceptions=True
+            )
+        records = []
+        for (path, size, modify), result in zip(pending, results):
+            if isinstance(result, Exception):
+                report.errors.append(FtpPollError(path=path, error=str(result)))
+                continue
+            records.append(
+                FileIngestRecord(
+                    file_type_id=data.file_type_id,
+                    file_name=posixpath.basename(path),
+                    file_size=size,
+                    directory_id=data.directory_id,
+                    full_path=names[path],
+                    status_id=data.status_id,
+                    bucket_id=data.bucket_id,
+                    create_user=f"ftp:{setting.id}",
+                    actual_date=parse_modify(modify),
+                )
+            )
+        report.uploaded = len(records)
+
+        ingest_report = await ingest_query.ingest_records(records)
+        report.registered = ingest_report.files
+        report.errors.extend(
+            FtpPollError(path=data.path, error=error.error)
+            for error in ingest_report.errors
+        )
+
+        # Водяной знак сдвигается, только если весь листинг забран без ошибок
+        if not report.errors and listed:
+            self.watermarks[key] = max(modify for _, _, modify in listed)
+        return report
+
+
+_poller: FtpIngestPoller | None = None
+
+
+def get_ftp_ingest_poller() -> FtpIngestPoller:
+    """
+    Получить общий на процесс поллер: пулы соединений и водяные знаки
+    должны переживать отдельные запросы.
+
+    :return: FtpIngestPoller
+    """
+    global _poller
+    if _poller is None:
+        _poller = FtpIngestPoller(
+            registry=FtpPoolRegistry(size=settings.FTP_POOL_SIZE),
+            minio_client=get_minio_client(),
+        )
+    return _poller
+
+
+def reset_ftp_ingest_poller() -> None:
+    """Забыть поллер и FTP-соединения родительского процесса после fork."""
+    global _poller
+    _poller = None
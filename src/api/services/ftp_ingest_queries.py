@@ -0,0 +1,40 @@
+from sqlalchemy import select, any_, bindparam, String
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.models import FtpSetting, FileList
+from src.api.services.base_qurey import BaseQuery
+
+
+class FtpIngestQuery(BaseQuery):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, FtpSetting)
+
+    async def get_ftp_setting(self, id: int) -> FtpSetting:
+        """
+        Получить настройки FTP по id.
+
+        :param id: id FtpSetting
+        :return: FtpSetting
+        """
+        await self.check_exists_or_raise(model=self.model, status_code=404, id=id)
+        result = await self.get_object_by_kwargs(self.model, id=id)
+        return result.scalars().first()
+
+    async def get_registered_paths(self, full_paths: list[str]) -> set[str]:
+        """
+        Получить пути, которые уже зарегистрированы в FileList. Пути
+        передаются одним массивом (= ANY), поиск идет по ix_file_list_full_path.
+
+        :param full_paths: пути объектов
+        :return: set[str]
+        """
+        if not full_paths:
+            return set()
+        result = await self.session.scalars(
+            select(FileList.full_path).where(
+                FileList.full_path
+                == any_(bindparam("full_paths", full_paths, type_=ARRAY(String)))
+            )
+        )
+        return set(result.all())
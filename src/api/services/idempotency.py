@@ -0,0 +1,130 @@
+import asyncio
+import time
+from dataclasses import dataclass
+
+import orjson
+
+from config import settings
+from src.api.services.redis_client import get_redis
+
+KEY_PREFIX = "idempotency"
+
+# Снять блокировку, только если ее держит этот же запрос
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class IdempotencyInProgress(Exception):
+    """Запрос с тем же ключом все еще выполняется."""
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    fingerprint: str
+    status: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+
+
+class IdempotencyStore:
+    """
+    Ответы на запросы с Idempotency-Key в Redis.
+
+    Ключ idempotency:<метод>:<путь>:<Idempotency-Key> - hash с отпечатком
+    запроса и ответом, живет ttl секунд. Пока первый запрос выполняется,
+    рядом лежит ключ <...>:lock; повторы с тем же ключом ждут появления
+    ответа, а если блокировка пропала без ответа (ответ не сохраняется для
+    5xx), один из них выполняет запрос заново.
+    """
+
+    def __init__(
+        self,
+        ttl: int = settings.IDEMPOTENCY_TTL,
+        lock_ttl: int = settings.IDEMPOTENCY_LOCK_TTL,
+        wait_timeout: float = settings.IDEMPOTENCY_WAIT_TIMEOUT,
+        poll_interval: float = 0.1,
+    ):
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+
+    @staticmethod
+    def key(method: str, path: str, idempotency_key: str) -> str:
+        return f"{KEY_PREFIX}:{method}:{path}:{idempotency_key}"
+
+    async def get(self, key: str) -> StoredResponse | None:
+        stored = await get_redis().hgetall(key)
+        if not stored:
+            return None
+        return StoredResponse(
+            fingerprint=stored[b"fingerprint"].decode(),
+            status=int(stored[b"status"]),
+            headers=[
+                (name.encode("latin-1"), value.encode("latin-1"))
+                for name, value in orjson.loads(stored[b"headers"])
+            ],
+            body=stored[b"body"],
+        )
+
+    async def begin(self, key: str, token: str) -> StoredResponse | None:
+        """
+        Получить сохраненный ответ или право выполнить запрос.
+
+        :param key: ключ запроса
+        :param token: уникальный токен этого запроса для блокировки
+        :return: StoredResponse - ответ уже есть, None - выполнять запрос
+        :raises IdempotencyInProgress: ответ не появился за wait_timeout
+        """
+        redis = get_redis()
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            stored = await self.get(key)
+            if stored is not None:
+                return stored
+            if await redis.set(f"{key}:lock", token, nx=True, ex=self.lock_ttl):
+                # Ответ мог быть сохранен между get и set
+                stored = await self.get(key)
+                if stored is not None:
+                    await self.release(key, token)
+                return stored
+            if time.monotonic() >= deadline:
+                raise IdempotencyInProgress(key)
+            await asyncio.sleep(self.poll_interval)
+
+    async def save(self, key: str, token: str, response: StoredResponse) -> None:
+        """
+        Сохранить ответ и снять блокировку.
+
+        :param key: ключ запроса
+        :param token: токен, с которым взята блокировка
+        :param response: ответ
+        :return: None
+        """
+        headers = [
+            (name.decode("latin-1"), value.decode("latin-1"))
+            for name, value in response.headers
+        ]
+        async with get_redis().pipeline(transaction=True) as pipe:
+            pipe.hset(
+                key,
+                mapping={
+                    "fingerprint": response.fingerprint,
+                    "status": response.status,
+                    "headers": orjson.dumps(headers),
+                    "body": response.body,
+                },
+            )
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
+        await self.release(key, token)
+
+    async def release(self, key: str, token: str) -> None:
+        await get_redis().eval(RELEASE_LOCK_SCRIPT, 1, f"{key}:lock", token)
+
+
+idempotency_store = IdempotencyStore()
@@ -0,0 +1,147 @@
+import time
+from collections import OrderedDict
+
+from sqlalchemy import Insert, Update, event
+
+from config import settings
+from src.database import RoutingSession, engine
+
+WRITTEN_TABLES_KEY = "written_tables"
+
+
+class NegativeLookupCache:
+    """
+    Кэш отрицательных результатов BaseQuery.check_exists по таблицам: ключ -
+    условия поиска, значение - момент истечения. Отвечает "не существует"
+    без запроса к БД в течение ttl секунд. Промах, прочитанный с реплики,
+    кэшируется не дольше replica_max_lag: реплика может еще не видеть
+    строку, уже записанную на primary и сбросившую кэш, а дольше допустимого
+    отставания ее ответ устаревшим не считается.
+
+    INSERT или UPDATE таблицы на primary сбрасывает кэш этой таблицы сразу
+    и еще раз после commit. Кэш свой у каждого процесса, поэтому запись из
+    другого воркера он увидит не позже чем через ttl.
+
+    Сброс видит только запросы, выполненные через SQLAlchemy. Мимо него идут:
+    - COPY и запросы через соединение asyncpg в FileIngestQuery.ingest_records
+      (сбрасывает FileList, FileAttributeValue и FileMeta сам после commit);
+    - записи триггеров и функций postgres, например DirectoryStats
+      (migrations/002_directory_stats.sql);
+    - записи других процессов и сервисов.
+    Такие записи становятся видны не позже чем через ttl.
+    """
+
+    def __init__(
+        self,
+        ttl: float = settings.NEGATIVE_CACHE_TTL,
+        max_size: int = settings.NEGATIVE_CACHE_MAX_SIZE,
+        replica_max_lag: float = settings.POSTGRES_REPLICA_MAX_LAG,
+    ):
+        self.ttl = ttl
+        self.replica_ttl = min(ttl, replica_max_lag)
+        self.max_size = max_size
+        self._entries: dict[str, OrderedDict[tuple, float]] = {}
+        self._counters: dict[str, dict[str, int]] = {}
+
+    @staticmethod
+    def make_key(kwargs: dict) -> tuple | None:
+        key = tuple(sorted(kwargs.items()))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def _count(self, table: str, counter: str) -> None:
+        counters = self._counters.setdefault(
+            table, {"hits": 0, "misses": 0, "invalidations": 0}
+        )
+        counters[counter] += 1
+
+    def is_missing(self, table: str, key: tuple) -> bool:
+        """
+        Известно ли, что строки с такими условиями нет.
+
+        :param table: имя таблицы
+        :param key: условия поиска из make_key
+        :return: bool
+        """
+        if self.ttl <= 0:
+            return False
+        entries = self._entries.get(table)
+        expires = entries.get(key) if entries else None
+        if expires is not None and expires > time.monotonic():
+            self._count(table, "hits")
+            return True
+        if expires is not None:
+            del entries[key]
+        self._count(table, "misses")
+        return False
+
+    def add(self, table: str, key: tuple, from_replica: bool = False) -> None:
+        ttl = self.replica_ttl if from_replica else self.ttl
+        if ttl <= 0:
+            return
+        entries = self._entries.setdefault(table, OrderedDict())
+        entries[key] = time.monotonic() + ttl
+        entries.move_to_end(key)
+        while len(entries) > self.max_size:
+            entries.popitem(last=False)
+
+    def invalidate(self, table: str) -> None:
+        if self._entries.pop(table, None):
+            self._count(table, "invalidations")
+
+    def stats(self) -> list[dict]:
+        return [
+            {
+                "table": table,
+                "size": len(self._entries.get(table, ())),
+                **counters,
+            }
+            for table, counters in sorted(self._counters.items())
+        ]
+
+
+negative_cache = NegativeLookupCache()
+
+
+def _written_tables(context) -> list[str]:
+    compiled = context.compiled
+    if compiled is None:
+        return []
+    tables = []
+    if context.isinsert or context.isupdate:
+        tables.append(compiled.statement.table.name)
+    # INSERT/UPDATE внутри WITH, например в sync_role2_file_types
+    for cte in getattr(compiled, "ctes", None) or ():
+        if isinstance(cte.element, (Insert, Update)):
+            tables.append(cte.element.table.name)
+    return tables
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def invalidate_on_write(conn, cursor, statement, parameters, context, executemany):
+    for table in _written_tables(context):
+        negative_cache.invalidate(table)
+        conn.info.get(WRITTEN_TABLES_KEY, set()).add(table)
+
+
+@event.listens_for(RoutingSession, "after_begin")
+def track_written_tables(session, transaction, connection) -> None:
+    connection.info[WRITTEN_TABLES_KEY] = session.info.setdefault(
+        WRITTEN_TABLES_KEY, set()
+    )
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def invalidate_on_commit(session) -> None:
+    # Между записью и commit чужой запрос мог не увидеть строку и снова
+    # закэшировать промах
+    for table in session.info.pop(WRITTEN_TABLES_KEY, ()):
+        negative_cache.invalidate(table)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def forget_written_tables(session) -> None:
+    session.info.pop(WRITTEN_TABLES_KEY, None)
@@ -0,0 +1,119 @@
+import asyncio
+import difflib
+import gzip
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+
+import orjson
+
+from config import settings
+
+
+@dataclass(frozen=True)
+class NsiCacheEntry:
+    version: int
+    update_date: datetime | None
+    payload: bytes  # gzip(content)
+
+    @property
+    def etag(self) -> str:
+        stamp = self.update_date.timestamp() if self.update_date else 0
+        return f'"{self.version}-{stamp:.6f}"'
+
+    @property
+    def content(self) -> str:
+        return gzip.decompress(self.payload).decode("utf-8")
+
+
+def build_delta(old: str, new: str) -> list:
+    """
+    Построить построчную дельту между двумя версиями.
+
+    Дельта - список операций [i1, i2, lines]: строки old[i1:i2] заменить на lines.
+    Операции отсортированы по i1, поэтому клиент применяет их с конца.
+
+    :param old: исходное содержимое
+    :param new: новое содержимое
+    :return: list
+    """
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(a=old_lines, b=new_lines, autojunk=False)
+    return [
+        [i1, i2, new_lines[j1:j2]]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def apply_delta(old: str, delta: list) -> str:
+    """
+    Применить дельту из build_delta к исходному содержимому.
+
+    :param old: исходное содержимое
+    :param delta: дельта
+    :return: str
+    """
+    lines = old.splitlines(keepends=True)
+    for i1, i2, replacement in reversed(delta):
+        lines[i1:i2] = replacement
+    return "".join(lines)
+
+
+class NsiValueCache:
+    """
+    Кэш последних версий NsiValue по dictionaryCode.
+
+    Содержимое хранится сжатым gzip и отдаётся клиентам как есть, с
+    Content-Encoding: gzip. Запись считается актуальной, пока в БД не
+    появилась другая пара (version, updateDate). Сжатие идет в потоке, чтобы
+    большой справочник не останавливал event loop.
+    """
+
+    def __init__(self, max_deltas: int):
+        self.max_deltas = max_deltas
+        self.latest: dict[str, NsiCacheEntry] = {}
+        self.deltas: OrderedDict[tuple, bytes] = OrderedDict()
+
+    def get_latest(
+        self, dictionary_code: str, version: int, update_date: datetime | None
+    ) -> NsiCacheEntry | None:
+        entry = self.latest.get(dictionary_code)
+        if entry is None or (entry.version, entry.update_date) != (
+            version,
+            update_date,
+        ):
+            return None
+        return entry
+
+    async def put_latest(
+        self,
+        dictionary_code: str,
+        version: int,
+        update_date: datetime | None,
+        content: str,
+    ) -> NsiCacheEntry:
+        entry = NsiCacheEntry(
+            version=version,
+            update_date=update_date,
+            payload=await asyncio.to_thread(gzip.compress, content.encode("utf-8")),
+        )
+        self.latest[dictionary_code] = entry
+        return entry
+
+    def get_delta(self, key: tuple) -> bytes | None:
+        payload = self.deltas.get(key)
+        if payload is not None:
+            self.deltas.move_to_end(key)
+        return payload
+
+    async def put_delta(self, key: tuple, delta: dict) -> bytes:
+        payload = await asyncio.to_thread(gzip.compress, orjson.dumps(delta))
+        self.deltas[key] = payload
+        if len(self.deltas) > self.max_deltas:
+            self.deltas.popitem(last=False)
+        return payload
+
+
+nsi_value_cache = NsiValueCache(max_deltas=settings.NSI_CACHE_MAX_DELTAS)
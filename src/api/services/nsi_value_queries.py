@@ -0,0 +1,112 @@
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.models import NsiValue
+from src.api.services.base_qurey import BaseQuery
+from src.api.services.nsi_value_cache import (
+    nsi_value_cache,
+    NsiCacheEntry,
+    build_delta,
+)
+from src.api.utils import raise_http_exception
+
+
+class NsiValueQuery(BaseQuery):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, NsiValue)
+
+    async def get_version_stamp(
+        self, dictionary_code: str, version: int | None = None
+    ) -> tuple[int, datetime | None]:
+        """
+        Получить (version, updateDate) версии справочника без чтения content.
+        Если версия не указана - последней версии.
+
+        :param dictionary_code: код справочника
+        :param version: номер версии
+        :return: tuple[int, datetime | None]
+        """
+        query = select(NsiValue.version, NsiValue.updateDate).where(
+            NsiValue.dictionaryCode == dictionary_code
+        )
+        if version is None:
+            query = query.order_by(NsiValue.version.desc()).limit(1)
+        else:
+            query = query.where(NsiValue.version == version)
+        stamp = (await self.session.execute(query)).first()
+        if stamp is None:
+            await raise_http_exception(
+                status_code=404,
+                detail=f"NsiValue {dictionary_code} version {version} does not exist",
+            )
+        return tuple(stamp)
+
+    async def get_content(self, dictionary_code: str, version: int) -> str:
+        """
+        Получить содержимое версии справочника.
+
+        :param dictionary_code: код справочника
+        :param version: номер версии
+        :return: str
+        """
+        result = await self.session.scalar(
+            select(NsiValue.content).where(
+                NsiValue.dictionaryCode == dictionary_code,
+                NsiValue.version == version,
+            )
+        )
+        return result
+
+    async def get_latest_nsi_value(self, dictionary_code: str) -> NsiCacheEntry:
+        """
+        Получить последнюю версию справочника. Содержимое читается из БД,
+        только если в кэше нет записи с той же парой (version, updateDate).
+
+        :param dictionary_code: код справочника
+        :return: NsiCacheEntry
+        """
+        version, update_date = await self.get_version_stamp(dictionary_code)
+        entry = nsi_value_cache.get_latest(dictionary_code, version, update_date)
+        if entry is None:
+            content = await self.get_content(dictionary_code, version)
+            entry = await nsi_value_cache.put_latest(
+                dictionary_code, version, update_date, content
+            )
+        return entry
+
+    async def get_nsi_value_delta(
+        self, dictionary_code: str, from_version: int, to_version: int | None = None
+    ) -> bytes:
+        """
+        Получить сжатую gzip JSON-дельту между двумя версиями справочника.
+        Если to_version не указана - до последней версии.
+
+        :param dictionary_code: код справочника
+        :param from_version: версия, которая уже есть у клиента
+        :param to_version: целевая версия
+        :return: bytes
+        """
+        from_stamp = await self.get_version_stamp(dictionary_code, from_version)
+        to_stamp = await self.get_version_stamp(dictionary_code, to_version)
+        key = (dictionary_code, *from_stamp, *to_stamp)
+
+        payload = nsi_value_cache.get_delta(key)
+        if payload is None:
+            old = await self.get_content(dictionary_code, from_stamp[0])
+            new = await self.get_content(dictionary_code, to_stamp[0])
+            # Сравнение целых справочников в худшем случае квадратично: в потоке
+            # оно не останавливает event loop
+            ops = await asyncio.to_thread(build_delta, old, new)
+            payload = await nsi_value_cache.put_delta(
+                key,
+                {
+                    "dictionary_code": dictionary_code,
+                    "from_version": from_stamp[0],
+                    "to_version": to_stamp[0],
+                    "ops": ops,
+                },
+            )
+        return payload
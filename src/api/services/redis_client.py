@@ -0,0 +1,36 @@
+from redis.asyncio import Redis
+
+from config import settings
+
+_client: Redis | None = None
+
+
+def get_redis() -> Redis:
+    """
+    Получить общий на процесс клиент Redis (создается при первом обращении).
+
+    :return: Redis
+    """
+    global _client
+    if _client is None:
+        _client = Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            password=settings.REDIS_PASSWORD or None,
+            socket_timeout=5,
+            socket_connect_timeout=1,
+        )
+    return _client
+
+
+async def close_redis_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def reset_redis_client() -> None:
+    """Забыть клиент родительского процесса после fork."""
+    global _client
+    _client = None
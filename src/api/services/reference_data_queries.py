@@ -0,0 +1,129 @@
+import asyncio
+
+from sqlalchemy import select, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.models import (
+    StatusFileList,
+    BucketList,
+    AttributeTypeList,
+    RoleTypeList,
+    FormatFiles,
+    ARM2InfoProd,
+    FileType,
+)
+from src.api.schemas.reference_data_schemas import ReferenceDataVersion
+from src.api.services.base_qurey import BaseQuery
+from src.api.services.reference_snapshot import (
+    ALL_TABLES,
+    ReferenceSnapshot,
+    reference_snapshot_store,
+)
+from src.api.utils import raise_http_exception
+
+
+SNAPSHOT_MODELS = (
+    StatusFileList,
+    BucketList,
+    AttributeTypeList,
+    RoleTypeList,
+    FormatFiles,
+    ARM2InfoProd,
+    FileType,
+)
+
+
+class ReferenceDataQuery(BaseQuery):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, FileType)
+
+    async def get_table(self, model) -> dict:
+        """
+        Прочитать справочную таблицу целиком в компактном виде: имена колонок
+        один раз и строки списками в порядке первичного ключа.
+
+        :param model: модель
+        :return: dict
+        """
+        mapper = inspect(model)
+        attrs = list(mapper.column_attrs)
+        query = select(*(attr.columns[0].label(attr.key) for attr in attrs)).order_by(
+            *mapper.primary_key
+        )
+        result = await self.session.execute(query)
+        return {
+            "columns": [attr.key for attr in attrs],
+            "rows": [list(row) for row in result.all()],
+        }
+
+    async def get_tables(self) -> dict[str, dict]:
+        return {
+            model.__name__: await self.get_table(model) for model in SNAPSHOT_MODELS
+        }
+
+    async def rebuild_reference_snapshot(self, force: bool) -> ReferenceSnapshot:
+        """
+        Перечитать таблицы и опубликовать новое поколение снимка, если данные
+        изменились. Пока снимок перестраивает другой процесс, ждет его.
+
+        :param force: перестроить, даже если снимок еще не устарел
+        :return: ReferenceSnapshot
+        """
+        while True:
+            with reference_snapshot_store.build_lock() as locked:
+                if locked:
+                    snapshot = reference_snapshot_store.get()
+                    if force or snapshot is None or reference_snapshot_store.is_stale():
+                        snapshot = reference_snapshot_store.publish(
+                            await self.get_tables()
+                        )
+                    return snapshot
+            snapshot = reference_snapshot_store.get()
+            if snapshot is not None and not force:
+                return snapshot
+            await asyncio.sleep(0.05)
+
+    async def get_reference_snapshot(self) -> ReferenceSnapshot:
+        """
+        Получить текущий снимок справочных таблиц. Устаревший снимок
+        перестраивает один процесс, остальные тем временем отдают текущий.
+
+        :return: ReferenceSnapshot
+        """
+        snapshot = reference_snapshot_store.get()
+        if snapshot is None:
+            return await self.rebuild_reference_snapshot(force=False)
+        if reference_snapshot_store.is_stale():
+            with reference_snapshot_store.build_lock() as locked:
+                if locked and reference_snapshot_store.is_stale():
+                    snapshot = reference_snapshot_store.publish(await self.get_tables())
+        return snapshot
+
+    async def get_reference_section(
+        self, table: str | None
+    ) -> tuple[ReferenceSnapshot, bytes]:
+        """
+        Получить сжатую gzip секцию снимка: одну таблицу или все сразу.
+
+        :param table: имя таблицы (имя модели), None - все таблицы
+        :return: tuple[ReferenceSnapshot, bytes]
+        """
+        snapshot = await self.get_reference_snapshot()
+        if table is not None and table not in snapshot.tables:
+            await raise_http_exception(
+                status_code=404, detail=f"Reference table {table} does not exist"
+            )
+        return snapshot, snapshot.section(table or ALL_TABLES)
+
+    async def refresh_reference_data(self) -> ReferenceDataVersion:
+        """
+        Принудительно сверить снимок с БД.
+
+        :return: ReferenceDataVersion
+        """
+        snapshot = await self.rebuild_reference_snapshot(force=True)
+        return ReferenceDataVersion(
+            version=snapshot.version,
+            generation=snapshot.generation,
+            tables=snapshot.tables,
+        )
@@ -0,0 +1,231 @@
+import fcntl
+import gzip
+import hashlib
+import mmap
+import os
+import struct
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+import orjson
+
+from config import settings
+
+
+MAGIC = b"UISREF01"
+HEADER_SIZE = struct.Struct("<I")
+ALL_TABLES = "*"
+KEEP_GENERATIONS = 2
+
+
+def encode_snapshot(tables: dict[str, dict]) -> tuple[bytes, str]:
+    """
+    Упаковать таблицы в файл снимка: MAGIC, длина заголовка, заголовок JSON
+    (версия и смещения секций) и сжатые gzip секции - по одной на таблицу
+    и одна со всеми таблицами сразу.
+
+    :param tables: {имя таблицы: {"columns": [...], "rows": [[...]]}}
+    :return: tuple[содержимое файла, версия]
+    """
+    payloads = {name: orjson.dumps(table) for name, table in tables.items()}
+    payloads[ALL_TABLES] = orjson.dumps(tables)
+    version = hashlib.sha256(payloads[ALL_TABLES]).hexdigest()[:16]
+
+    body = bytearray()
+    sections = {}
+    for name, payload in payloads.items():
+        # mtime=0: одинаковые данные дают побайтно одинаковый снимок
+        compressed = gzip.compress(payload, mtime=0)
+        sections[name] = [len(body), len(compressed)]
+        body += compressed
+    header = orjson.dumps({"version": version, "sections": sections})
+    return MAGIC + HEADER_SIZE.pack(len(header)) + header + body, version
+
+
+class ReferenceSnapshot:
+    """Одно поколение снимка, отображенное в память только для чтения."""
+
+    def __init__(self, path: str, generation: int):
+        self.generation = generation
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a reference snapshot")
+        start = len(MAGIC) + HEADER_SIZE.size
+        (header_size,) = HEADER_SIZE.unpack_from(self._mmap, len(MAGIC))
+        header = orjson.loads(self._mmap[start : start + header_size])
+        self.version: str = header["version"]
+        self._sections: dict[str, list[int]] = header["sections"]
+        self._body_start = start + header_size
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.version}"'
+
+    @property
+    def tables(self) -> list[str]:
+        return [name for name in self._sections if name != ALL_TABLES]
+
+    def section(self, name: str = ALL_TABLES) -> bytes:
+        """
+        Получить сжатую gzip секцию снимка.
+
+        :param name: имя таблицы или ALL_TABLES
+        :return: bytes
+        """
+        offset, size = self._sections[name]
+        start = self._body_start + offset
+        return self._mmap[start : start + size]
+
+    def rows(self, name: str) -> list[dict]:
+        """
+        Получить строки таблицы. Разбирается при каждом вызове, в памяти
+        процесса ничего не остается.
+
+        :param name: имя таблицы
+        :return: list[dict]
+        """
+        table = orjson.loads(gzip.decompress(self.section(name)))
+        return [dict(zip(table["columns"], row)) for row in table["rows"]]
+
+
+class ReferenceSnapshotStore:
+    """
+    Снимки справочных таблиц в общем для всех воркеров каталоге (по умолчанию
+    в /dev/shm). Каждое поколение - отдельный неизменяемый файл
+    reference.<generation>.snap, текущее поколение записано в файле CURRENT,
+    который заменяется атомарно через os.replace. Воркеры держат mmap своего
+    поколения и раз в check_interval сверяются с CURRENT.
+
+    Перестраивает снимок один процесс за раз (flock); время последней сверки
+    с БД - mtime файла CURRENT.
+    """
+
+    def __init__(
+        self,
+        directory: str = settings.REFERENCE_SNAPSHOT_DIR,
+        ttl: float = settings.REFERENCE_SNAPSHOT_TTL,
+        check_interval: float = 1.0,
+    ):
+        self.directory = directory
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self._current: ReferenceSnapshot | None = None
+        self._checked_at = 0.0
+
+    @property
+    def pointer_path(self) -> str:
+        return os.path.join(self.directory, "CURRENT")
+
+    def snapshot_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"reference.{generation}.snap")
+
+    def _read_pointer(self) -> int | None:
+        try:
+            with open(self.pointer_path) as f:
+                return int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def get(self) -> ReferenceSnapshot | None:
+        """
+        Получить текущее поколение снимка, переключившись на новое, если
+        его опубликовал другой процесс.
+
+        :return: ReferenceSnapshot | None
+        """
+        now = time.monotonic()
+        if self._current is None or now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            generation = self._read_pointer()
+            if generation is not None and (
+                self._current is None or self._current.generation != generation
+            ):
+                try:
+                    # Старый mmap закроется, когда его отпустят текущие запросы
+                    self._current = ReferenceSnapshot(
+                        self.snapshot_path(generation), generation
+                    )
+                except FileNotFoundError:
+                    pass
+        return self._current
+
+    def is_stale(self) -> bool:
+        try:
+            checked_at = os.stat(self.pointer_path).st_mtime
+        except FileNotFoundError:
+            return True
+        return time.time() - checked_at > self.ttl
+
+    @contextmanager
+    def build_lock(self) -> Iterator[bool]:
+        """
+        Неблокирующая блокировка перестроения снимка между процессами.
+        Ждать flock нельзя: это остановило бы event loop, в том числе
+        корутину этого же процесса, которая держит блокировку.
+
+        :return: Iterator[bool] - получена ли блокировка
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, ".lock"), "w") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def publish(self, tables: dict[str, dict]) -> ReferenceSnapshot:
+        """
+        Записать новое поколение, если данные изменились, и переключить на
+        него CURRENT. Вызывается под build_lock.
+
+        :param tables: таблицы снимка
+        :return: ReferenceSnapshot
+        """
+        content, version = encode_snapshot(tables)
+        generation = self._read_pointer()
+        current = None
+        if generation is not None:
+            current = self._current
+            if current is None or current.generation != generation:
+                current = ReferenceSnapshot(self.snapshot_path(generation), generation)
+
+        if current is not None and current.version == version:
+            # Данные не изменились: только отмечаем время сверки
+            os.utime(self.pointer_path)
+            self._current = current
+            return current
+
+        generation = (generation or 0) + 1
+        path = self.snapshot_path(generation)
+        with open(path + ".tmp", "wb") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        with open(self.pointer_path + ".tmp", "w") as f:
+            f.write(str(generation))
+        os.replace(self.pointer_path + ".tmp", self.pointer_path)
+
+        # Удаленный файл остается доступен процессам, которые держат его mmap
+        for name in os.listdir(self.directory):
+            parts = name.split(".")
+            if (
+                len(parts) == 3
+                and parts[0] == "reference"
+                and parts[1].isdigit()
+                and int(parts[1]) <= generation - KEEP_GENERATIONS
+            ):
+                os.remove(os.path.join(self.directory, name))
+
+        self._current = ReferenceSnapshot(path, generation)
+        self._checked_at = time.monotonic()
+        return self._current
+
+
+reference_snapshot_store = ReferenceSnapshotStore()
@@ -0,0 +1,175 @@
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator
+
+from sqlalchemy import URL
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncConnection
+
+from config import settings
+
+
+@dataclass
+class _EngineEntry:
+    signature: tuple
+    engine: AsyncEngine
+    last_used: float = field(default_factory=time.monotonic)
+    active: int = 0
+
+
+class RelDBEngineRegistry:
+    """
+    Пулы соединений к внешним БД из RelDBSetting, по одному движку на RelDBSetting.id.
+
+    Движок создается при первом обращении и пересоздается, если изменились
+    параметры подключения. Простаивающие дольше ttl движки и самые давно
+    использованные сверх max_engines закрываются. Все соединения ко всем
+    внешним БД вместе ограничены max_connections: выданные - семафором, а
+    открытые, включая простаивающие в пулах, - размером пула движка, не
+    больше max_connections // max_engines.
+    """
+
+    def __init__(
+        self,
+        max_engines: int = settings.REL_DB_MAX_ENGINES,
+        ttl: float = settings.REL_DB_ENGINE_TTL,
+        pool_size: int = settings.REL_DB_POOL_SIZE,
+        max_connections: int = settings.REL_DB_MAX_CONNECTIONS,
+    ):
+        self.max_engines = max_engines
+        self.ttl = ttl
+        self.max_connections = max_connections
+        self.pool_size = max(1, min(pool_size, max_connections // max_engines))
+        self._entries: OrderedDict[int, _EngineEntry] = OrderedDict()
+        self._retired: list[_EngineEntry] = []
+        self._connections = asyncio.Semaphore(max_connections)
+        # _get_entry и _evict ждут dispose(): без блокировки два connect
+        # могли бы закрыть один движок дважды или выдать уже закрытый
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def signature(setting) -> tuple:
+        return (
+            setting.host,
+            setting.port,
+            setting.db_name,
+            setting.user,
+            setting.passwd,
+        )
+
+    def _create_engine(self, setting) -> AsyncEngine:
+        url = URL.create(
+            "postgresql+asyncpg",
+            username=setting.user,
+            password=setting.passwd,
+            host=setting.host,
+            port=setting.port,
+            database=setting.db_name,
+        )
+        return create_async_engine(
+            url,
+            pool_size=self.pool_size,
+            max_overflow=0,
+            pool_recycle=self.ttl,
+            pool_pre_ping=True,
+        )
+
+    async def _evict(self, keep: int) -> None:
+        now = time.monotonic()
+        idle = [
+            key
+            for key, entry in self._entries.items()
+            if key != keep and entry.active == 0 and now - entry.last_used > self.ttl
+        ]
+        # OrderedDict упорядочен от давно использованных к недавним
+        for key, entry in self._entries.items():
+            if len(self._entries) - len(idle) <= self.max_engines:
+                break
+            if key != keep and entry.active == 0 and key not in idle:
+                idle.append(key)
+        for key in idle:
+            await self._entries.pop(key).engine.dispose()
+
+        retired, self._retired = self._retired, []
+        for entry in retired:
+            if entry.active == 0:
+                await entry.engine.dispose()
+            else:
+                self._retired.append(entry)
+
+    async def _get_entry(self, setting) -> _EngineEntry:
+        signature = self.signature(setting)
+        entry = self._entries.get(setting.id)
+        if entry is not None and entry.signature != signature:
+            # Настройки изменились: старый движок закроется, когда освободится
+            self._retired.append(self._entries.pop(setting.id))
+            entry = None
+        if entry is None:
+            entry = _EngineEntry(
+                signature=signature, engine=self._create_engine(setting)
+            )
+            self._entries[setting.id] = entry
+        self._entries.move_to_end(setting.id)
+        entry.last_used = time.monotonic()
+        await self._evict(keep=setting.id)
+        return entry
+
+    @asynccontextmanager
+    async def connect(self, setting) -> AsyncIterator[AsyncConnection]:
+        """
+        Взять соединение к внешней БД с учетом общего лимита соединений.
+
+        :param setting: RelDBSetting
+        :return: AsyncIterator[AsyncConnection]
+        """
+        async with self._connections:
+            async with self._lock:
+                entry = await self._get_entry(setting)
+                entry.active += 1
+            try:
+                async with entry.engine.connect() as connection:
+                    yield connection
+            finally:
+                entry.active -= 1
+                entry.last_used = time.monotonic()
+                # Движки сверх max_engines, занятые при выдаче, закрываются
+                # по освобождении, иначе их пулы превысили бы общий лимит
+                async with self._lock:
+                    await self._evict(keep=setting.id)
+
+    def stats(self) -> list[dict]:
+        return [
+            {
+                "rel_db_setting_id": key,
+                "active": entry.active,
+                "idle_seconds": round(time.monotonic() - entry.last_used, 1),
+                "pool": entry.engine.pool.status(),
+            }
+            for key, entry in self._entries.items()
+        ]
+
+    def reset_after_fork(self) -> None:
+        """
+        Отказаться от движков, унаследованных от родительского процесса:
+        их соединения закрывать нельзя, они принадлежат родителю.
+
+        :return: None
+        """
+        for entry in [*self._entries.values(), *self._retired]:
+            entry.engine.sync_engine.dispose(close=False)
+        self._entries.clear()
+        self._retired = []
+        self._connections = asyncio.Semaphore(self.max_connections)
+        self._lock = asyncio.Lock()
+
+    async def dispose_all(self) -> None:
+        entries = [*self._entries.values(), *self._retired]
+        self._entries.clear()
+        self._retired = []
+        for entry in entries:
+            await entry.engine.dispose()
+
+
+rel_db_engines = RelDBEngineRegistry()
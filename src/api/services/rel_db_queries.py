@@ -0,0 +1,34 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.models import RelDBSetting
+from src.api.services.base_qurey import BaseQuery
+from src.api.services.rel_db_engines import rel_db_engines
+
+
+class RelDBQuery(BaseQuery):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, RelDBSetting)
+
+    async def get_rel_db_setting(self, id: int) -> RelDBSetting:
+        """
+        Получить параметры подключения к внешней БД по id.
+
+        :param id: id RelDBSetting
+        :return: RelDBSetting
+        """
+        await self.check_exists_or_raise(model=self.model, status_code=404, id=id)
+        result = await self.get_object_by_kwargs(self.model, id=id)
+        return result.scalars().first()
+
+    async def check_rel_db_connection(self, id: int) -> dict:
+        """
+        Проверить подключение к внешней БД через общий пул движков.
+
+        :param id: id RelDBSetting
+        :return: dict
+        """
+        setting = await self.get_rel_db_setting(id=id)
+        async with rel_db_engines.connect(setting) as connection:
+            version = await connection.scalar(text("SHOW server_version"))
+        return {"id": id, "server_version": version}
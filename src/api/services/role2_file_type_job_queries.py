@@ -0,0 +1,152 @@
+import uuid
+from datetime import datetime
+
+import orjson
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.models import Notification
+from src.api.schemas.role2_file_type_schemas import (
+    Role2FileTypeJob,
+    Role2FileTypeJobProgress,
+)
+from src.api.services.base_qurey import BaseQuery
+from src.api.utils import raise_http_exception
+
+JOB_INFO_CODE = "ROLE2_FILE_TYPE_JOB"
+JOB_SUBJECT = "Пакетное изменение прав ролей на типы файлов"
+JOB_PENDING = "PENDING"
+JOB_STARTED = "STARTED"
+JOB_SUCCESS = "SUCCESS"
+JOB_FAILURE = "FAILURE"
+JOB_FINISHED = (JOB_SUCCESS, JOB_FAILURE)
+
+
+class Role2FileTypeJobQuery(BaseQuery):
+    """
+    Состояние фоновых заданий над Role2FileType. Каждое задание - строка
+    Notification: taskId - id задания, statusCode - статус, additionalInfo -
+    прогресс в JSON. Завершенное задание получает sendDate и становится
+    уведомлением для userName.
+    """
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, Notification)
+
+    @staticmethod
+    def to_job(notification: Notification) -> Role2FileTypeJob:
+        return Role2FileTypeJob(
+            job_id=notification.task_id,
+            status=notification.status_code,
+            message=notification.message,
+            finished_at=notification.send_date,
+            **orjson.loads(notification.additional_info),
+        )
+
+    async def create_job(
+        self, action: str, total: int, user_name: str | None
+    ) -> Role2FileTypeJob:
+        """
+        Зарегистрировать задание до постановки в очередь.
+
+        :param action: create или delete
+        :param total: количество пар в задании
+        :param user_name: кому отправить уведомление о завершении
+        :return: Role2FileTypeJob
+        """
+        self.use_primary()
+        progress = Role2FileTypeJobProgress(action=action, total=total)
+        notification = Notification(
+            subject=JOB_SUBJECT,
+            additional_info=progress.model_dump_json(),
+            info_code=JOB_INFO_CODE,
+            status_code=JOB_PENDING,
+            user_name=user_name,
+            task_id=uuid.uuid4(),
+            task_id_code=f"role2FileType.{action}",
+        )
+        self.session.add(notification)
+        job = self.to_job(notification)
+        await self.session.commit()
+        return job
+
+    async def get_job(self, job_id: uuid.UUID) -> Role2FileTypeJob:
+        """
+        Получить состояние задания.
+
+        :param job_id: id задания
+        :return: Role2FileTypeJob
+        """
+        # Состояние опрашивают сразу после постановки задания: реплика может
+        # еще не видеть ни строку, ни последний прогресс
+        self.use_primary()
+        notification = await self.session.scalar(
+            select(Notification).where(
+                Notification.task_id == job_id, Notification.info_code == JOB_INFO_CODE
+            )
+        )
+        if notification is None:
+            await raise_http_exception(
+                status_code=404, detail=f"Job with job_id={job_id} does not exist"
+            )
+        return self.to_job(notification)
+
+    async def start_job(self, job_id: uuid.UUID) -> Role2FileTypeJob | None:
+        """
+        Отметить задание как выполняющееся. Для завершенного или удаленного
+        задания возвращает None: повторная доставка сообщения ничего не делает.
+
+        :param job_id: id задания
+        :return: Role2FileTypeJob | None
+        """
+        self.use_primary()
+        notification = await self.session.scalar(
+            update(Notification)
+            .where(
+                Notification.task_id == job_id,
+                Notification.info_code == JOB_INFO_CODE,
+                Notification.status_code.not_in(JOB_FINISHED),
+            )
+            .values(status_code=JOB_STARTED)
+            .returning(Notification)
+        )
+        job = None if notification is None else self.to_job(notification)
+        await self.session.commit()
+        return job
+
+    async def save_progress(
+        self, job_id: uuid.UUID, progress: Role2FileTypeJobProgress
+    ) -> None:
+        """
+        Записать прогресс без коммита - в одной транзакции с обработанной пачкой,
+        чтобы после перезапуска задание продолжилось с нее.
+
+        :param job_id: id задания
+        :param progress: прогресс
+        :return: None
+        """
+        self.use_primary()
+        await self.session.execute(
+            update(Notification)
+            .where(Notification.task_id == job_id)
+            .values(additional_info=progress.model_dump_json())
+        )
+
+    async def finish_job(
+        self, job_id: uuid.UUID, status: str, message: str | None = None
+    ) -> None:
+        """
+        Завершить задание и отправить уведомление.
+
+        :param job_id: id задания
+        :param status: SUCCESS или FAILURE
+        :param message: текст уведомления
+        :return: None
+        """
+        self.use_primary()
+        await self.session.execute(
+            update(Notification)
+            .where(Notification.task_id == job_id)
+            .values(status_code=status, message=message, send_date=datetime.now())
+        )
+        await self.session.commit()
@@ -0,0 +1,121 @@
+import asyncio
+import uuid
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import DBAPIError
+
+from config import settings
+from src.api.schemas.role2_file_type_schemas import (
+    Role2FileTypeJob,
+    Role2FileTypeJobData,
+    Role2FileTypeJobProgress,
+)
+from src.api.services.role2_file_type_job_queries import (
+    JOB_FAILURE,
+    JOB_SUCCESS,
+)
+from src.api.services.uow import UnitOfWork
+from src.api.utils import raise_http_exception
+from src.celery_app import celery_app
+from src.database import SessionLocal
+
+
+async def submit_role2_file_type_job(
+    uow: UnitOfWork, data: Role2FileTypeJobData
+) -> Role2FileTypeJob:
+    """
+    Зарегистрировать задание и поставить его в очередь Celery.
+
+    Пары дедуплицируются и сортируются: воркер блокирует строки в одном
+    порядке, а номер последней обработанной пары однозначен при перезапуске.
+
+    :param uow: UnitOfWork
+    :param data: действие, пары и получатель уведомления
+    :return: Role2FileTypeJob
+    """
+    pairs = sorted(
+        {(record.role_group_id, record.file_type_id) for record in data.records}
+    )
+    job = await uow.role2_file_type_job.create_job(
+        action=data.action, total=len(pairs), user_name=data.user_name
+    )
+    try:
+        await run_in_threadpool(
+            process_role2_file_type_job.apply_async,
+            args=(str(job.job_id), data.action, pairs),
+        )
+    except Exception as e:
+        await uow.role2_file_type_job.finish_job(
+            job.job_id, JOB_FAILURE, f"Очередь заданий недоступна: {e}"
+        )
+        await raise_http_exception(503, "Job queue is unavailable")
+    return job
+
+
+async def run_role2_file_type_job(
+    job_id: uuid.UUID, action: str, pairs: list[list[int]], chunk_size: int
+) -> None:
+    """
+    Выполнить задание пачками по chunk_size пар, каждая в своей транзакции
+    вместе с записью прогресса. Уже обработанные пачки пропускаются.
+
+    :param job_id: id задания
+    :param action: create или delete
+    :param pairs: отсортированные пары [role_group_id, file_type_id]
+    :param chunk_size: размер пачки
+    :return: None
+    """
+    async with UnitOfWork(SessionLocal) as uow:
+        job = await uow.role2_file_type_job.start_job(job_id)
+        if job is None:
+            return
+        progress = Role2FileTypeJobProgress(**job.model_dump())
+        for start in range(progress.processed, len(pairs), chunk_size):
+            chunk = pairs[start : start + chunk_size]
+            if action == "create":
+                progress.inserted += (
+                    await uow.role2_file_type.insert_role2_file_type_pairs(chunk)
+                )
+            else:
+                progress.deleted += (
+                    await uow.role2_file_type.delete_role2_file_type_pairs(chunk)
+                )
+            progress.processed = start + len(chunk)
+            await uow.role2_file_type_job.save_progress(job_id, progress)
+            await uow.commit()
+        await uow.role2_file_type_job.finish_job(
+            job_id,
+            JOB_SUCCESS,
+            f"Обработано пар: {progress.processed}, создано связей: "
+            f"{progress.inserted}, удалено связей: {progress.deleted}",
+        )
+
+
+async def fail_role2_file_type_job(job_id: uuid.UUID, error: Exception) -> None:
+    async with UnitOfWork(SessionLocal) as uow:
+        await uow.role2_file_type_job.finish_job(
+            job_id, JOB_FAILURE, f"Ошибка выполнения задания: {error}"
+        )
+
+
+@celery_app.task(bind=True, name="role2_file_type.process_job", max_retries=3)
+def process_role2_file_type_job(
+    self, job_id: str, action: str, pairs: list[list[int]]
+) -> None:
+    job_id = uuid.UUID(job_id)
+    try:
+        asyncio.run(
+            run_role2_file_type_job(
+                job_id, action, pairs, settings.ROLE2_FILE_TYPE_JOB_CHUNK_SIZE
+            )
+        )
+    except (DBAPIError, OSError) as e:
+        # Сбой соединения или взаимоблокировка: повтор продолжит с той пачки,
+        # на которой задание остановилось
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e, countdown=10 * 2**self.request.retries)
+        asyncio.run(fail_role2_file_type_job(job_id, e))
+        raise
+    except Exception as e:
+        asyncio.run(fail_role2_file_type_job(job_id, e))
+        raise
@@ -1,12 +1,35 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import update, delete, select, Row, RowMapping
-from src.api.models import Role2FileType
+from sqlalchemy import (
+    update,
+    delete,
+    select,
+    exists,
+    func,
+    literal,
+    or_,
+    any_,
+    bindparam,
+    Integer,
+    Row,
+    RowMapping,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.exc import IntegrityError
+from src.api.models import Role2FileType, RoleGroupList, FileType
 from src.api.schemas.role2_file_type_schemas import (
     PutRole2FileTypeData,
     Role2FileTypeBaseWithoutID,
     RoleFileTypeList,
+    SyncRole2FileTypeData,
+    SyncRole2FileTypeReport,
 )
 from src.api.services.base_qurey import BaseQuery
+from src.api.utils import raise_http_exception
+
+# Уникальный индекс пары (migrations/003_link_table_indexes.sql): вставки
+# пропускают уже существующие пары через ON CONFLICT DO NOTHING, поэтому
+# параллельные запросы и задачи с одной парой не падают на IntegrityError
+PAIR_INDEX_ELEMENTS = ["roleGroupId", "fileTypeId"]
 
 
 class Role2FileTypeQuery(BaseQuery):
@@ -47,25 +70,24 @@ class Role2FileTypeQuery(BaseQuery):
 
     async def post_role2_file_type_by_list(self, data: RoleFileTypeList) -> None:
         """
-        Изменить связь между ролью и типами файлов по id.
+        Создать связи между ролью и типами файлов одним INSERT, уже
+        существующие пропускаются.
 
         :param data: параметры для создания
         :return: None
         """
-        for record in data.root:
-            existing_record = await self.session.execute(
-                select(Role2FileType).where(
-                    Role2FileType.role_group_id == record.role_group_id,
-                    Role2FileType.file_type_id == record.file_type_id,
-                )
-            )
-            existing_record = existing_record.scalars().first()
-            if existing_record:
-                continue
-            record = Role2FileType(
-                role_group_id=record.role_group_id, file_type_id=record.file_type_id
+        self.use_primary()
+        table = self._pairs_table(
+            [[record.role_group_id, record.file_type_id] for record in data.root]
+        )
+        await self.session.execute(
+            insert(Role2FileType)
+            .from_select(
+                [Role2FileType.role_group_id, Role2FileType.file_type_id],
+                select(table.c.role_group_id, table.c.file_type_id),
             )
-            self.session.add(record)
+            .on_conflict_do_nothing(index_elements=PAIR_INDEX_ELEMENTS)
+        )
         await self.session.commit()
         return
 
@@ -77,6 +99,7 @@ class Role2FileTypeQuery(BaseQuery):
         :param data: параметры для обновления
         :return: Role2FileType
         """
+        self.use_primary()
         await self.check_exists_or_raise(
             model=self.model, status_code=404, id=data["id"]
         )
@@ -86,9 +109,15 @@ class Role2FileTypeQuery(BaseQuery):
         ).scalar_one()
 
         record_id = data.pop("id")
-        await self.session.execute(
-            update(Role2FileType).where(Role2FileType.id == record_id).values(**data)
-        )
+        try:
+            await self.session.execute(
+                update(Role2FileType)
+                .where(Role2FileType.id == record_id)
+                .values(**data)
+            )
+        except IntegrityError as e:
+            await self.session.rollback()
+            await raise_http_exception(status_code=409, detail=str(e.orig))
         await self.session.commit()
         await self.session.refresh(record)
         return record
@@ -101,6 +130,7 @@ class Role2FileTypeQuery(BaseQuery):
         :param data: параметры для удаления
         :return: None
         """
+        self.use_primary()
         for record in data.root:
             await self.session.execute(
                 delete(Role2FileType).where(
@@ -110,3 +140,152 @@ class Role2FileTypeQuery(BaseQuery):
             )
         await self.session.commit()
         return
+
+
+    async def sync_role2_file_types(
+        self, data: SyncRole2FileTypeData
+    ) -> SyncRole2FileTypeReport:
+        """
+        Привести типы файлов роли к желаемому набору: лишние связи удаляются
+        одним DELETE, недостающие добавляются одним INSERT ... SELECT.
+        Число запросов не зависит от размера набора. Строка роли блокируется
+        до конца транзакции, чтобы параллельные синхронизации одной роли
+        не создали дубли.
+
+        :param data: группа ролей и полный желаемый набор file_type_id
+        :return: SyncRole2FileTypeReport
+        """
+        self.use_primary()
+        role_group_id = data.role_group_id
+        file_type_ids = bindparam("file_type_ids", type_=ARRAY(Integer))
+        params = {"file_type_ids": sorted(set(data.file_type_ids))}
+
+        locked = await self.session.scalar(
+            select(RoleGroupList.id)
+            .where(RoleGroupList.id == role_group_id)
+            .with_for_update()
+        )
+        if locked is None:
+            await self.check_exists_or_raise(
+                model=RoleGroupList, status_code=404, id=role_group_id
+            )
+
+        deleted = await self.session.execute(
+            delete(Role2FileType).where(
+                Role2FileType.role_group_id == role_group_id,
+                or_(
+                    Role2FileType.file_type_id.is_(None),
+                    ~(Role2FileType.file_type_id == any_(file_type_ids)),
+                ),
+            ),
+            params,
+        )
+
+        desired = select(func.unnest(file_type_ids).label("file_type_id")).cte(
+            "desired"
+        )
+        known = (
+            select(desired.c.file_type_id)
+            .join(FileType, FileType.id == desired.c.file_type_id)
+            .cte("known")
+        )
+        inserted = (
+            insert(Role2FileType)
+            .from_select(
+                [Role2FileType.role_group_id, Role2FileType.file_type_id],
+                select(literal(role_group_id), known.c.file_type_id).where(
+                    ~exists().where(
+                        Role2FileType.role_group_id == role_group_id,
+                        Role2FileType.file_type_id == known.c.file_type_id,
+                    )
+                ),
+            )
+            .on_conflict_do_nothing(index_elements=PAIR_INDEX_ELEMENTS)
+            .returning(Role2FileType.id)
+            .cte("inserted")
+        )
+        result = await self.session.execute(
+            select(
+                select(func.count()).select_from(inserted).scalar_subquery(),
+                select(func.array_agg(desired.c.file_type_id))
+                .where(desired.c.file_type_id.not_in(select(known.c.file_type_id)))
+                .scalar_subquery(),
+            ),
+            params,
+        )
+        inserted_count, unknown = result.one()
+        await self.session.commit()
+        return SyncRole2FileTypeReport(
+            role_group_id=role_group_id,
+            inserted=inserted_count,
+            deleted=deleted.rowcount,
+            unknown_file_type_ids=unknown or [],
+        )
+
+
+    @staticmethod
+    def _pairs_table(pairs: list[list[int]]):
+        """
+        Пары (role_group_id, file_type_id) как таблица unnest из двух массивов.
+        Значения привязаны к запросу: отдельный словарь параметров перевел бы
+        ORM insert() в режим массовой вставки.
+
+        :param pairs: список пар
+        :return: табличное выражение pairs(role_group_id, file_type_id)
+        """
+        role_group_ids = [pair[0] for pair in pairs]
+        file_type_ids = [pair[1] for pair in pairs]
+        return (
+            func.unnest(
+                bindparam("role_group_ids", role_group_ids, type_=ARRAY(Integer)),
+                bindparam("file_type_ids", file_type_ids, type_=ARRAY(Integer)),
+            )
+            .table_valued("role_group_id", "file_type_id")
+            .render_derived(name="pairs")
+        )
+
+
+    async def insert_role2_file_type_pairs(self, pairs: list[list[int]]) -> int:
+        """
+        Создать недостающие связи одним INSERT ... SELECT без коммита. Пары
+        с несуществующей ролью или типом файла пропускаются.
+
+        :param pairs: список пар [role_group_id, file_type_id]
+        :return: int - количество созданных связей
+        """
+        self.use_primary()
+        table = self._pairs_table(pairs)
+        result = await self.session.execute(
+            insert(Role2FileType).from_select(
+                [Role2FileType.role_group_id, Role2FileType.file_type_id],
+                select(table.c.role_group_id, table.c.file_type_id)
+                .join(RoleGroupList, RoleGroupList.id == table.c.role_group_id)
+                .join(FileType, FileType.id == table.c.file_type_id)
+                .where(
+                    ~exists().where(
+                        Role2FileType.role_group_id == table.c.role_group_id,
+                        Role2FileType.file_type_id == table.c.file_type_id,
+                    )
+                ),
+            )
+            .on_conflict_do_nothing(index_elements=PAIR_INDEX_ELEMENTS)
+        )
+        return result.rowcount
+
+
+    async def delete_role2_file_type_pairs(self, pairs: list[list[int]]) -> int:
+        """
+        Удалить связи одним DELETE ... USING без коммита.
+
+        :param pairs: список пар [role_group_id, file_type_id]
+        :return: int - количество удаленных связей
+        """
+        self.use_primary()
+        table = self._pairs_table(pairs)
+        result = await self.session.execute(
+            delete(Role2FileType).where(
+                Role2FileType.role_group_id == table.c.role_group_id,
+                Role2FileType.file_type_id == table.c.file_type_id,
+            )
+        )
+        return result.rowcount
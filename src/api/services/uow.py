@@ -1,8 +1,21 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import sessionmaker
 from typing import AsyncGenerator
+from src.api.services.bucket_tiering_queries import BucketTieringQuery
+from src.api.services.dictionary_queries import DictionaryQuery
+from src.api.services.directory_stats_queries import DirectoryStatsQuery
+from src.api.services.file_access_queries import FileAccessQuery
+from src.api.services.file_export_queries import FileExportQuery
+from src.api.services.file_ingest_queries import FileIngestQuery
+from src.api.services.file_search_queries import FileSearchQuery
+from src.api.services.file_meta_queries import FileMetaQuery
+from src.api.services.ftp_ingest_queries import FtpIngestQuery
+from src.api.services.nsi_value_queries import NsiValueQuery
+from src.api.services.reference_data_queries import ReferenceDataQuery
+from src.api.services.rel_db_queries import RelDBQuery
+from src.api.services.role2_file_type_job_queries import Role2FileTypeJobQuery
 from src.api.services.role2_file_type_queries import Role2FileTypeQuery
-from src.database import SessionLocal
+from src.database import SessionLocal, replica_set
 
 
 
@@ -11,10 +24,37 @@ class UnitOfWork:
         self.session_factory = session_factory
         self.session: AsyncSession | None = None
         self.role2_file_type = Role2FileTypeQuery
+        self.dictionary = DictionaryQuery
+        self.nsi_value = NsiValueQuery
+        self.file_meta = FileMetaQuery
+        self.file_ingest = FileIngestQuery
+        self.file_export = FileExportQuery
+        self.file_search = FileSearchQuery
+        self.bucket_tiering = BucketTieringQuery
+        self.ftp_ingest = FtpIngestQuery
+        self.rel_db = RelDBQuery
+        self.directory_stats = DirectoryStatsQuery
+        self.file_access = FileAccessQuery
+        self.reference_data = ReferenceDataQuery
+        self.role2_file_type_job = Role2FileTypeJobQuery
 
     async def __aenter__(self):
+        await replica_set.refresh_if_stale()
         self.session = self.session_factory()
         self.role2_file_type = Role2FileTypeQuery(self.session)
+        self.dictionary = DictionaryQuery(self.session)
+        self.nsi_value = NsiValueQuery(self.session)
+        self.file_meta = FileMetaQuery(self.session)
+        self.file_ingest = FileIngestQuery(self.session)
+        self.file_export = FileExportQuery(self.session)
+        self.file_search = FileSearchQuery(self.session)
+        self.bucket_tiering = BucketTieringQuery(self.session)
+        self.ftp_ingest = FtpIngestQuery(self.session)
+        self.rel_db = RelDBQuery(self.session)
+        self.directory_stats = DirectoryStatsQuery(self.session)
+        self.file_access = FileAccessQuery(self.session)
+        self.reference_data = ReferenceDataQuery(self.session)
+        self.role2_file_type_job = Role2FileTypeJobQuery(self.session)
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
@@ -1,5 +1,8 @@
-from fastapi import HTTPException
-from typing import NoReturn
+import gzip
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+from typing import NoReturn, AsyncIterator
 
 
 
@@ -12,4 +15,72 @@ async def raise_http_exception(status_code: int, detail: str | dict) -> NoReturn
     :return: NoReturn
     :raises HTTPException: всегда
     """
-    raise HTTPException(status_code=status_code, detail=detail)
\ No newline at end of file
+    raise HTTPException(status_code=status_code, detail=detail)
+
+
+async def iter_ndjson_batches(
+    chunks: AsyncIterator[bytes], batch_size: int
+) -> AsyncIterator[list[tuple[int, bytes]]]:
+    """
+    Разбить поток NDJSON на пачки непустых строк, не читая тело запроса целиком.
+
+    :param chunks: поток байтов, например request.stream()
+    :param batch_size: количество строк в пачке
+    :return: AsyncIterator[list[tuple[номер строки, строка]]]
+    """
+    batch = []
+    tail = b""
+    line_no = 0
+    async for chunk in chunks:
+        lines = (tail + chunk).split(b"\n")
+        tail = lines.pop()
+        for line in lines:
+            line_no += 1
+            if line.strip():
+                batch.append((line_no, line))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if tail.strip():
+        batch.append((line_no + 1, tail))
+    if batch:
+        yield batch
+
+
+def accepts_gzip(request: Request) -> bool:
+    return "gzip" in request.headers.get("accept-encoding", "")
+
+
+def representation_etag(request: Request, etag: str) -> str:
+    """
+    ETag представления, которое получит клиент: у сжатого и несжатого ответа
+    одного содержимого ETag разный, иначе кэш может отдать одно вместо другого.
+
+    :param request: запрос
+    :param etag: ETag содержимого в кавычках
+    :return: str
+    """
+    if accepts_gzip(request):
+        return f'{etag[:-1]}-gzip"'
+    return etag
+
+
+def gzip_response(
+    request: Request, payload: bytes, media_type: str, headers: dict
+) -> Response:
+    """
+    Отдать сжатый payload как есть, если клиент принимает gzip, иначе распаковать.
+
+    :param request: запрос
+    :param payload: содержимое, сжатое gzip
+    :param media_type: тип содержимого
+    :param headers: дополнительные заголовки
+    :return: Response
+    """
+    headers = {**headers, "Vary": "Accept-Encoding"}
+    if accepts_gzip(request):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=payload, media_type=media_type, headers=headers)
+    return Response(
+        content=gzip.decompress(payload), media_type=media_type, headers=headers
+    )
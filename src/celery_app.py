@@ -0,0 +1,53 @@
+# Фоновые задания. Воркер запускается из корня репозитория:
+#     celery -A src.celery_app worker --loglevel=info
+from urllib.parse import quote
+
+from celery import Celery
+from celery.signals import worker_process_init
+
+from config import settings
+from src.database import reset_engines_after_fork
+
+
+def build_broker_url() -> str:
+    """
+    Собрать адрес брокера из настроек Redis, если CELERY_BROKER_URL не задан.
+
+    :return: str
+    """
+    if settings.CELERY_BROKER_URL:
+        return settings.CELERY_BROKER_URL
+    auth = (
+        f":{quote(settings.REDIS_PASSWORD, safe='')}@"
+        if settings.REDIS_PASSWORD
+        else ""
+    )
+    return f"redis://{auth}{settings.REDIS_HOST}:{settings.REDIS_PORT}/0"
+
+
+celery_app = Celery(
+    "uis",
+    broker=build_broker_url(),
+    include=["src.api.services.role2_file_type_jobs"],
+)
+celery_app.conf.update(
+    task_serializer="json",
+    accept_content=["json"],
+    # Состояние и результат задания хранятся в Notification, backend не нужен
+    task_ignore_result=True,
+    # Задание подтверждается после выполнения: при падении воркера оно
+    # вернется в очередь и продолжится с последней закоммиченной пачки
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    broker_connection_retry_on_startup=True,
+    # Redis вернет в очередь неподтвержденное задание по истечении этого
+    # времени, поэтому оно должно быть больше времени самого долгого задания
+    broker_transport_options={"visibility_timeout": 12 * 60 * 60},
+)
+
+
+@worker_process_init.connect
+def reset_worker_process(**kwargs) -> None:
+    # Дочерние процессы prefork не должны использовать соединения родителя
+    reset_engines_after_fork()
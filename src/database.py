@@ -1,16 +1,205 @@
-from sqlalchemy import NullPool
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
+import asyncio
+import random
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import NullPool, Insert, Update, Delete, text, event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
+from sqlalchemy.orm import sessionmaker, Session
 
 from config import settings as s
 
 
-sql_link = (
-    f"postgresql+asyncpg://{s.POSTGRES_USER}:{s.POSTGRES_PASSWORD}@{s.POSTGRES_SERVER}"
-    f":{s.POSTGRES_PORT}/{s.POSTGRES_DB}"
+PIN_PRIMARY_KEY = "pin_primary"
+REPLICA_KEY = "replica"
+
+# Момент (time.monotonic), к которому запрос должен завершиться; ставит
+# AdmissionControlMiddleware. Вне запросов - None, таймаут не ограничивается
+request_deadline: ContextVar[float | None] = ContextVar(
+    "request_deadline", default=None
 )
+
+# Отставание реплики в секундах; для primary (не в recovery) считаем отставание нулевым
+REPLICA_LAG_QUERY = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+END
+"""
+
+
+def build_sql_link(server: str, port: int | str | None) -> str:
+    """
+    Собрать DSN для подключения к postgres.
+
+    :param server: хост
+    :param port: порт
+    :return: str
+    """
+    return (
+        f"postgresql+asyncpg://{s.POSTGRES_USER}:{s.POSTGRES_PASSWORD}@{server}"
+        f":{port}/{s.POSTGRES_DB}"
+    )
+
+
+sql_link = build_sql_link(s.POSTGRES_SERVER, s.POSTGRES_PORT)
 engine = create_async_engine(sql_link, echo=False, poolclass=NullPool)
 
+
+class ReplicaSet:
+    """
+    Набор реплик только для чтения с отсевом отстающих.
+
+    Отставание проверяется в фоновой задаче: запросы не ждут проверки и до
+    ее окончания читают по результатам предыдущей. До первой проверки все
+    чтение идет на primary.
+    """
+
+    def __init__(
+        self,
+        engines: list[AsyncEngine],
+        max_lag: float,
+        check_interval: float,
+        check_timeout: float,
+    ):
+        self.engines = engines
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self._healthy: list[AsyncEngine] = []
+        self._checked_at = 0.0
+        self._task: asyncio.Task | None = None
+
+    async def refresh_if_stale(self) -> None:
+        """
+        Запустить фоновую перепроверку отставания реплик, если с прошлой
+        проверки прошло больше check_interval секунд и проверка еще не идет.
+
+        :return: None
+        """
+        if not self.engines or not self._is_stale():
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh())
+
+    @staticmethod
+    async def _lag(replica: AsyncEngine) -> float | None:
+        async with replica.connect() as conn:
+            return await conn.scalar(text(REPLICA_LAG_QUERY))
+
+    async def _probe(self, replica: AsyncEngine) -> bool:
+        """Реплика доступна и отстает не больше max_lag."""
+        try:
+            lag = await asyncio.wait_for(self._lag(replica), self.check_timeout)
+        except Exception:
+            return False
+        return lag is not None and float(lag) <= self.max_lag
+
+    async def _refresh(self) -> None:
+        # Все реплики проверяются одновременно, каждая не дольше check_timeout:
+        # зависшая реплика не задерживает проверку остальных
+        results = await asyncio.gather(
+            *(self._probe(replica) for replica in self.engines)
+        )
+        self._healthy = [
+            replica for replica, healthy in zip(self.engines, results) if healthy
+        ]
+        self._checked_at = time.monotonic()
+
+    def choose(self) -> AsyncEngine | None:
+        """
+        Выбрать реплику среди неотстающих; None - читать с primary.
+
+        :return: AsyncEngine | None
+        """
+        if not self._healthy:
+            return None
+        return random.choice(self._healthy)
+
+    def reset_after_fork(self) -> None:
+        for replica in self.engines:
+            replica.sync_engine.dispose(close=False)
+        self._task = None
+
+    def _is_stale(self) -> bool:
+        return time.monotonic() - self._checked_at >= self.check_interval
+
+
+def _parse_replicas(servers: str) -> list[AsyncEngine]:
+    engines = []
+    for item in filter(None, (part.strip() for part in servers.split(","))):
+        host, _, port = item.partition(":")
+        engines.append(
+            create_async_engine(
+                build_sql_link(host, port or s.POSTGRES_PORT),
+                echo=False,
+                poolclass=NullPool,
+            )
+        )
+    return engines
+
+
+replica_set = ReplicaSet(
+    engines=_parse_replicas(s.POSTGRES_REPLICA_SERVERS),
+    max_lag=s.POSTGRES_REPLICA_MAX_LAG,
+    check_interval=s.POSTGRES_REPLICA_CHECK_INTERVAL,
+    check_timeout=s.POSTGRES_REPLICA_CHECK_TIMEOUT,
+)
+
+
+def reset_engines_after_fork() -> None:
+    """
+    Отказаться от соединений движков, унаследованных от родительского процесса
+    (gunicorn --preload): каждый воркер открывает свои.
+
+    :return: None
+    """
+    engine.sync_engine.dispose(close=False)
+    replica_set.reset_after_fork()
+
+
+class RoutingSession(Session):
+    """
+    Сессия, которая отправляет чтение на реплику, а запись - на primary.
+    После первой записи сессия закрепляется за primary, чтобы чтение
+    после записи в рамках одного запроса видело свои же изменения.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            self.info.get(PIN_PRIMARY_KEY)
+            or self._flushing
+            or isinstance(clause, (Insert, Update, Delete))
+        ):
+            self.info[PIN_PRIMARY_KEY] = True
+            return engine.sync_engine
+
+        # Одна реплика на всю сессию, чтобы не читать с разных точек репликации
+        if REPLICA_KEY not in self.info:
+            self.info[REPLICA_KEY] = replica_set.choose()
+        replica = self.info[REPLICA_KEY]
+        if replica is None:
+            return engine.sync_engine
+        return replica.sync_engine
+
+
+@event.listens_for(RoutingSession, "after_begin")
+def set_statement_timeout(session, transaction, connection) -> None:
+    """
+    Ограничить запросы транзакции временем, оставшимся до дедлайна запроса:
+    при перегрузке postgres сам прервет запрос, который уже никому не нужен.
+    """
+    deadline = request_deadline.get()
+    if deadline is None:
+        return
+    remaining_ms = max(int((deadline - time.monotonic()) * 1000), 1)
+    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {remaining_ms}")
+
+
 SessionLocal = sessionmaker(
-    autocommit=False, autoflush=False, class_=AsyncSession, bind=engine
+    autocommit=False,
+    autoflush=False,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
 )
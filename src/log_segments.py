@@ -0,0 +1,286 @@
+"""
+Сжатые сегменты лога с индексом и поиск по ним.
+
+При ротации RotatingAsyncFileHandler переименовывает лог в сегмент
+<лог>.<время ротации>, а фоновый поток, когда в сегмент перестают писать
+(LOG_SEGMENT_GRACE), сжимает его в <сегмент>.gz и пишет
+рядом индекс <сегмент>.idx. Сегмент сжимается блоками примерно по
+LOG_SEGMENT_BLOCK_SIZE байт исходного текста, каждый блок - отдельный член
+gzip (файл целиком читается zcat). Индекс хранит для каждого блока смещение,
+длину и интервал времени записей, а для каждого id запроса - номера блоков,
+поэтому поиск распаковывает только нужные блоки.
+
+Поиск:
+    python -m src.log_segments --request-id 4bfe33a6...
+    python -m src.log_segments --since "2026-10-19 13:00" --until "2026-10-19 13:05"
+"""
+
+import argparse
+import fcntl
+import glob
+import gzip
+import os
+import re
+import time
+from datetime import datetime
+from typing import Iterator
+
+import orjson
+
+from config import settings
+
+SEGMENT_TIME_FORMAT = "%Y%m%d-%H%M%S-%f"
+
+# "2026-10-19 13:15:35 - UIS - INFO - <id запроса> - сообщение"
+TEXT_RECORD = re.compile(
+    rb"^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d) - .+? - [A-Z]+ - (\S+) - "
+)
+
+def segment_name(filename: str) -> str:
+    return f"{filename}.{datetime.now():{SEGMENT_TIME_FORMAT}}"
+
+
+def parse_record(line: bytes) -> tuple[datetime, str | None] | None:
+    """
+    Время и id запроса из первой строки записи.
+
+    :param line: строка лога
+    :return: (время, id запроса) или None для строки-продолжения (трассировка)
+    """
+    if line.startswith(b"{"):
+        try:
+            entry = orjson.loads(line)
+            return datetime.fromisoformat(entry["ts"]), entry.get("request_id")
+        except (orjson.JSONDecodeError, KeyError, TypeError, ValueError):
+            return None
+    match = TEXT_RECORD.match(line)
+    if match is None:
+        return None
+    request_id = match.group(2).decode()
+    return (
+        datetime.fromisoformat(match.group(1).decode()),
+        None if request_id == "-" else request_id,
+    )
+
+
+def iter_records(lines) -> Iterator[tuple[datetime | None, str | None, bytes]]:
+    """Записи лога: (время, id запроса, текст записи со строками-продолжениями)."""
+    current = None
+    for line in lines:
+        parsed = parse_record(line)
+        if parsed is not None or current is None:
+            if current is not None:
+                yield current[0], current[1], b"".join(current[2])
+            ts, request_id = parsed or (None, None)
+            current = (ts, request_id, [line])
+        else:
+            current[2].append(line)
+    if current is not None:
+        yield current[0], current[1], b"".join(current[2])
+
+
+def compress_segment(path: str, block_size: int = settings.LOG_SEGMENT_BLOCK_SIZE):
+    """
+    Сжать сегмент в <path>.gz с индексом <path>.idx и удалить исходный файл.
+
+    :param path: несжатый сегмент
+    :param block_size: размер блока исходного текста
+    :return: None
+    """
+    blocks = []
+    request_ids: dict[str, list[int]] = {}
+    with open(path, "rb") as source, open(f"{path}.gz.tmp", "wb") as target:
+        offset = 0
+        buffer, first_ts, last_ts = [], None, None
+        size = 0
+
+        def flush() -> None:
+            nonlocal offset, buffer, first_ts, last_ts, size
+            data = gzip.compress(b"".join(buffer), mtime=0)
+            target.write(data)
+            blocks.append(
+                {
+                    "offset": offset,
+                    "length": len(data),
+                    "first_ts": first_ts and first_ts.isoformat(),
+                    "last_ts": last_ts and last_ts.isoformat(),
+                }
+            )
+            offset += len(data)
+            buffer, first_ts, last_ts, size = [], None, None, 0
+
+        for ts, request_id, record in iter_records(source):
+            # Блок заканчивается только на границе записи
+            if size >= block_size:
+                flush()
+            buffer.append(record)
+            size += len(record)
+            if ts is not None:
+                first_ts = first_ts or ts
+                last_ts = ts
+            if request_id is not None:
+                block_ids = request_ids.setdefault(request_id, [])
+                if not block_ids or block_ids[-1] != len(blocks):
+                    block_ids.append(len(blocks))
+        if buffer:
+            flush()
+
+    with open(f"{path}.idx.tmp", "wb") as f:
+        f.write(orjson.dumps({"blocks": blocks, "request_ids": request_ids}))
+    os.replace(f"{path}.idx.tmp", f"{path}.idx")
+    os.replace(f"{path}.gz.tmp", f"{path}.gz")
+    os.remove(path)
+
+
+def list_segments(filename: str) -> tuple[list[str], list[str]]:
+    """
+    Сегменты лога от старых к новым.
+
+    :param filename: путь к текущему логу
+    :return: (сжатые сегменты без .gz, еще не сжатые сегменты)
+    """
+    compressed, plain = [], []
+    for path in sorted(glob.glob(f"{glob.escape(filename)}.[0-9]*-*")):
+        if path.endswith(".gz"):
+            compressed.append(path[: -len(".gz")])
+        elif not path.endswith((".idx", ".tmp")):
+            plain.append(path)
+    return compressed, plain
+
+
+def compress_segments(
+    filename: str, keep: int, grace: float = settings.LOG_SEGMENT_GRACE
+) -> None:
+    """
+    Сжать несжатые сегменты (в том числе оставшиеся после перезапуска)
+    и удалить самые старые, чтобы осталось не больше keep.
+
+    Сегмент, в который писали меньше grace секунд назад, пропускается до
+    следующей ротации: после переименования лога воркеры, еще не заметившие
+    ротацию, дописывают в него через открытые дескрипторы.
+
+    Сжимают сегменты все воркеры gunicorn, поэтому они по очереди берут
+    flock на <лог>.lock: иначе два процесса писали бы в один <сегмент>.gz.tmp.
+
+    :param filename: путь к текущему логу
+    :param keep: сколько сегментов хранить
+    :param grace: сколько секунд сегмент не должен меняться перед сжатием
+    :return: None
+    """
+    with open(f"{filename}.lock", "wb") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        _, plain = list_segments(filename)
+        for path in plain:
+            try:
+                if time.time() - os.path.getmtime(path) < grace:
+                    continue
+                compress_segment(path)
+            except FileNotFoundError:
+                # Сегмент сжал другой воркер
+                continue
+        compressed, _ = list_segments(filename)
+        for path in compressed[: max(len(compressed) - keep, 0)]:
+            for name in (f"{path}.gz", f"{path}.idx"):
+                if os.path.exists(name):
+                    os.remove(name)
+
+
+def matches(
+    ts: datetime | None,
+    record_request_id: str | None,
+    since: datetime | None,
+    until: datetime | None,
+    request_id: str | None,
+) -> bool:
+    if request_id is not None and record_request_id != request_id:
+        return False
+    if ts is None:
+        return since is None and until is None
+    return (since is None or ts >= since) and (until is None or ts <= until)
+
+
+def block_overlaps(block: dict, since: datetime | None, until: datetime | None):
+    if block["first_ts"] is None:
+        return since is None and until is None
+    return (since is None or datetime.fromisoformat(block["last_ts"]) >= since) and (
+        until is None or datetime.fromisoformat(block["first_ts"]) <= until
+    )
+
+
+def query_segment(
+    path: str,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    request_id: str | None = None,
+) -> Iterator[bytes]:
+    """
+    Записи сжатого сегмента: читаются и распаковываются только блоки,
+    подходящие по индексу.
+
+    :param path: сегмент без .gz
+    :return: Iterator[bytes] - текст записей
+    """
+    with open(f"{path}.idx", "rb") as f:
+        index = orjson.loads(f.read())
+    blocks = index["blocks"]
+    if request_id is not None:
+        candidates = [blocks[i] for i in index["request_ids"].get(request_id, ())]
+    else:
+        candidates = blocks
+    with open(f"{path}.gz", "rb") as f:
+        for block in candidates:
+            if not block_overlaps(block, since, until):
+                continue
+            f.seek(block["offset"])
+            data = gzip.decompress(f.read(block["length"]))
+            for ts, record_request_id, record in iter_records(
+                data.splitlines(keepends=True)
+            ):
+                if matches(ts, record_request_id, since, until, request_id):
+                    yield record
+
+
+def query_logs(
+    filename: str,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    request_id: str | None = None,
+) -> Iterator[bytes]:
+    """
+    Записи лога за интервал времени и/или по id запроса: сначала сжатые
+    сегменты по индексу, затем несжатые и текущий лог целиком.
+
+    :param filename: путь к текущему логу
+    :param since: начало интервала
+    :param until: конец интервала
+    :param request_id: id запроса (X-Request-ID)
+    :return: Iterator[bytes] - текст записей по порядку
+    """
+    compressed, plain = list_segments(filename)
+    for path in compressed:
+        if os.path.exists(f"{path}.idx"):
+            yield from query_segment(path, since, until, request_id)
+    for path in plain + [filename]:
+        if not os.path.exists(path):
+            continue
+        with open(path, "rb") as f:
+            for ts, record_request_id, record in iter_records(f):
+                if matches(ts, record_request_id, since, until, request_id):
+                    yield record
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Поиск по логу и его сегментам")
+    parser.add_argument("--file", default="logs/app_logger.log", help="текущий лог")
+    parser.add_argument("--request-id", help="id запроса")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="начало")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="конец")
+    args = parser.parse_args()
+    if args.request_id is None and args.since is None and args.until is None:
+        parser.error("нужен --request-id или интервал --since/--until")
+    for record in query_logs(args.file, args.since, args.until, args.request_id):
+        os.write(1, record)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,68 @@
+import asyncio
+import hashlib
+import math
+import random
 import time
 import traceback
+import uuid
 from typing import Any
+from urllib.parse import parse_qsl, urlencode
+import orjson
 from fastapi.exceptions import HTTPException
 from fastapi.responses import JSONResponse
+from redis.exceptions import RedisError
+from sqlalchemy.exc import DBAPIError
 from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import StreamingResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
+from config import settings
+from src.api.services.idempotency import (
+    IdempotencyInProgress,
+    StoredResponse,
+    idempotency_store,
+)
+from src.database import request_deadline
+from src.profiling import current_profile, profiler, verify_profile_token
+from src.setup_logger import request_id
+
+# Тела ответов этих путей не попадают в лог даже при ошибке: они потоковые
+UNBUFFERED_PATHS = {"/api/v3/ftpNotifications", "/api/v3/exportFileList"}
+
+# Частые дешевые маршруты: доля успешных запросов, которые пишутся в лог
+LOG_SAMPLE_RATES = {
+    "/api/v3/checkRelDBConnection": 0.01,
+    "/api/v3/getRelDBEngineStats": 0.01,
+    "/api/v3/getNegativeCacheStats": 0.01,
+    "/api/v3/getReferenceDataVersion": 0.01,
+    "/api/v3/checkFileAccess": 0.1,
+    "/api/v3/checkRoleFileTypeAccess": 0.1,
+    "/api/v3/checkRoleDictionaryValueAccess": 0.1,
+}
+
+# Значение скрытого заголовка или поля в логе
+REDACTED = "***"
+
+# Тяжелые маршруты: (параллельность, очередь, таймаут запроса или None)
+ROUTE_LIMITS = {
+    "/api/v3/createRole2FileTypeByList": (2, 4, None),
+    "/api/v3/syncRole2FileType": (2, 4, None),
+    "/api/v3/ingestFileList": (2, 2, 600),
+    "/api/v3/exportFileList": (4, 8, 600),
+    "/api/v3/moveFilesBetweenBuckets": (1, 2, 600),
+    "/api/v3/pollFtpSetting": (2, 4, 600),
+    "/api/v3/syncFileSearchIndex": (1, 1, 600),
+    "/api/v3/reconcileDirectoryStats": (1, 1, 600),
+}
+
+# Маршруты, которые принимают заголовок Idempotency-Key
+IDEMPOTENT_ROUTES = {
+    ("POST", "/api/v3/createRole2FileTypeByList"),
+    ("DELETE", "/api/v3/deleteRole2FileType"),
+    ("POST", "/api/v3/createRole2FileTypeJob"),
+}
+
+# SQLSTATE query_canceled: в том числе сработавший statement_timeout
+QUERY_CANCELED = "57014"
 
 
 class CatchExceptionsMiddleware(BaseHTTPMiddleware):
@@ -19,6 +76,14 @@ class CatchExceptionsMiddleware(BaseHTTPMiddleware):
             return response
         except HTTPException as e:
             return JSONResponse({"error": str(e)}, status_code=e.status_code)
+        except DBAPIError as e:
+            if getattr(e.orig, "sqlstate", None) == QUERY_CANCELED:
+                return JSONResponse(
+                    {"code": "TIMEOUT", "errorText": "Request deadline exceeded"},
+                    status_code=503,
+                    headers={"Retry-After": "1"},
+                )
+            return JSONResponse({"code": "ERROR", "errorText": str(e)}, status_code=500)
         except Exception as e:
             return JSONResponse({"code": "ERROR", "errorText": str(e)}, status_code=500)
 
@@ -45,7 +110,117 @@ async def log_to_file(logger, logs) -> None:
             await logger.error(log[1])
 
 
+def parse_names(value: str) -> frozenset[str]:
+    return frozenset(name.strip().lower() for name in value.split(",") if name.strip())
+
+
+REDACT_HEADERS = parse_names(settings.LOG_REDACT_HEADERS)
+REDACT_FIELDS = parse_names(settings.LOG_REDACT_FIELDS)
+
+
+def redact_headers(headers) -> dict[str, str]:
+    return {
+        name: REDACTED if name.lower() in REDACT_HEADERS else value
+        for name, value in headers.items()
+    }
+
+
+def redact_query(query: str) -> str:
+    """
+    Заменить значения параметров строки запроса из LOG_REDACT_FIELDS.
+
+    :param query: строка запроса без "?"
+    :return: str
+    """
+    if not query:
+        return query
+    return urlencode(
+        [
+            (name, REDACTED if name.lower() in REDACT_FIELDS else value)
+            for name, value in parse_qsl(query, keep_blank_values=True)
+        ],
+        safe="*",
+    )
+
+
+def redact_fields(value: Any) -> Any:
+    """
+    Заменить значения полей из LOG_REDACT_FIELDS на любой глубине.
+
+    :param value: разобранное тело JSON
+    :return: копия без секретов
+    """
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if str(key).lower() in REDACT_FIELDS else redact_fields(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [redact_fields(item) for item in value]
+    return value
+
+
+def log_body(body: bytes | None, size: int) -> Any:
+    """
+    Тело для лога: разобранный JSON без секретов, если тело не больше
+    LOG_BODY_MAX_BYTES, иначе только размер.
+
+    :param body: тело или None, если оно не читалось
+    :param size: размер тела в байтах
+    :return: Any
+    """
+    if body is None or size > settings.LOG_BODY_MAX_BYTES:
+        return {"size": size, "truncated": True}
+    try:
+        return redact_fields(orjson.loads(body))
+    except orjson.JSONDecodeError:
+        # Не JSON: поля не найти, поэтому содержимое не пишется
+        return {"size": size}
+
+
+def parse_sample_rates(value: str) -> dict[str, float]:
+    """
+    Разобрать LOG_ROUTE_SAMPLE_RATES: "путь=доля;...".
+
+    :param value: строка настроек
+    :return: dict[str, float]
+    """
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(";"))):
+        path, _, rate = item.partition("=")
+        rates[path.strip()] = float(rate)
+    return rates
+
+
 class LoggingMiddleware(BaseHTTPMiddleware):
+    """
+    Лог запросов. Ошибки (статус от LOG_ERROR_STATUS или исключение) и запросы
+    дольше LOG_SLOW_REQUEST секунд пишутся всегда, остальные - с долей
+    LOG_SAMPLE_RATE или долей маршрута из LOG_SAMPLE_RATES.
+
+    Заголовки из LOG_REDACT_HEADERS, поля JSON и параметры строки запроса из
+    LOG_REDACT_FIELDS заменяются на ***. Тело длиннее LOG_BODY_MAX_BYTES не
+    читается и не разбирается ради лога - пишется только его размер; тело
+    ответа пишется только у ошибок. При LOG_FORMAT=json запрос - одна запись JSON.
+
+    call_next в BaseHTTPMiddleware всегда возвращает потоковый ответ, даже
+    если эндпоинт вернул обычный Response, поэтому запрос пишется в лог после
+    отправки всего тела (см. stream), а исключение эндпоинта - сразу.
+    """
+
+    def __init__(self, app: ASGIApp):
+        super().__init__(app)
+        self.sample_rates = {
+            **LOG_SAMPLE_RATES,
+            **parse_sample_rates(settings.LOG_ROUTE_SAMPLE_RATES),
+        }
+
+    def sampled(self, path: str, failed: bool, duration: float) -> bool:
+        if failed or duration >= settings.LOG_SLOW_REQUEST:
+            return True
+        rate = self.sample_rates.get(path, settings.LOG_SAMPLE_RATE)
+        return rate >= 1 or random.random() < rate
+
     async def dispatch(self, request, call_next):
         """
         Мидлварь, который логирует запросы.
@@ -53,62 +228,490 @@ class LoggingMiddleware(BaseHTTPMiddleware):
         :param call_next:
         :return:
         """
+        start_time = time.perf_counter()
+
+        # Читается только JSON не длиннее LOG_BODY_MAX_BYTES; Starlette
+        # сохраняет прочитанное тело для эндпоинта
+        body, body_size = None, 0
+        if request.method in ["POST", "PUT", "PATCH"] and request.headers.get(
+            "content-type", ""
+        ).startswith("application/json"):
+            length = request.headers.get("content-length", "")
+            if length.isdigit() and int(length) > settings.LOG_BODY_MAX_BYTES:
+                body_size = int(length)
+            else:
+                try:
+                    body = await request.body()
+                    body_size = len(body)
+                except Exception:
+                    body = None
+
+        try:
+            # Выполнение эндпоинта
+            response = await call_next(request)
+        except Exception:
+            await self.write(
+                request,
+                body,
+                body_size,
+                None,
+                None,
+                time.perf_counter() - start_time,
+                traceback.format_exc(),
+            )
+            raise
+
+        # Запись - после отправки тела, без сборки ответа в памяти
+        response.body_iterator = self.stream(
+            request,
+            body,
+            body_size,
+            response.status_code,
+            response.body_iterator,
+            start_time,
+        )
+        return response
+
+    async def stream(self, request, body, body_size, status, body_iterator, start_time):
+        capture = status >= 400 and request.url.path not in UNBUFFERED_PATHS
+        captured = bytearray()
+        size = 0
+        error = None
+        try:
+            async for chunk in body_iterator:
+                if capture and len(captured) <= settings.LOG_BODY_MAX_BYTES:
+                    captured += chunk[: settings.LOG_BODY_MAX_BYTES + 1 - len(captured)]
+                size += len(chunk)
+                yield chunk
+        except Exception:
+            error = traceback.format_exc()
+            raise
+        finally:
+            await self.write(
+                request,
+                body,
+                body_size,
+                status,
+                (bytes(captured), size) if capture else None,
+                time.perf_counter() - start_time,
+                error,
+            )
+
+    async def write(
+        self,
+        request,
+        body: bytes | None,
+        body_size: int,
+        status: int | None,
+        response_body: tuple[bytes, int] | None,
+        duration: float,
+        error: str | None,
+    ) -> None:
+        """
+        Записать запрос, если он попал в выборку.
+
+        :param body: тело запроса или None, если оно не читалось
+        :param body_size: размер тела запроса
+        :param status: код ответа или None, если эндпоинт упал
+        :param response_body: (начало тела ответа, его размер) или None
+        :param duration: время выполнения, секунд
+        :param error: трассировка исключения
+        :return: None
+        """
+        failed = (
+            error is not None or status is None or status >= settings.LOG_ERROR_STATUS
+        )
+        if not self.sampled(request.url.path, failed, duration):
+            return
         from src.setup_logger import logger
 
+        has_body = body is not None or body_size > 0
+        query = redact_query(request.url.query)
+        entry = {
+            "request_id": request_id.get(),
+            "method": request.method,
+            "path": request.url.path,
+            "query": query,
+            "client": request.client.host if request.client else None,
+            "status": status,
+            "duration_ms": round(duration * 1000, 3),
+            "headers": redact_headers(request.headers),
+        }
+        if has_body:
+            entry["body"] = log_body(body, body_size)
+        if response_body is not None:
+            entry["response_body"] = log_body(*response_body)
+        if error is not None:
+            entry["error"] = error
+
+        if settings.LOG_FORMAT == "json":
+            await (logger.error if failed else logger.info)(entry)
+            return
+
         log_buffer = LogBuffer()
-        start_time = time.time()
+        url = request.url.replace(query=query)
+        log_buffer.add_log("info", f"Request received: {request.method} {url}")
+        log_buffer.add_log("info", f"Request headers: {entry['headers']}")
+        if has_body:
+            log_buffer.add_log("info", f"Request body: {entry['body']}")
+        if status is not None:
+            log_buffer.add_log("info", f"Response status: {status}")
+        if response_body is not None:
+            log_buffer.add_log("info", f"Response body: {entry['response_body']}")
+        if error is not None:
+            log_buffer.add_log("error", f"Ошибка:\n {error}")
+        log_buffer.add_log("info", f"Request completed in {duration:.4f} seconds\n\n")
+        # Запись логов одним вызовом в конце запроса
+        await log_to_file(logger, log_buffer.logs)
 
-        # Логирование информации о запросе
-        log_buffer.add_log("info", f"Request received: {request.method} {request.url}")
-        log_buffer.add_log("info", f"Request headers: {dict(request.headers)}")
 
-        # Если тело запроса не пустое, логируем его
-        if request.method in ["POST", "PUT", "PATCH"]:
-            try:
-                body = await request.json()
-                log_buffer.add_log("info", f"Request body: {body}")
-            except Exception as e:
-                log_buffer.add_log("error", f"Error reading request body: {str(e)}")
+class RouteLimit:
+    """Ограничение параллельности маршрута с очередью ожидания конечной длины."""
 
+    def __init__(self, concurrency: int, queue_size: int, timeout: float):
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def acquire(self, deadline: float) -> int | None:
+        """
+        Занять слот маршрута.
+
+        :param deadline: дедлайн запроса (time.monotonic)
+        :return: None - слот занят, иначе код ответа для отказа
+        """
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            return None
+        if self.waiting >= self.queue_size:
+            return 429
+        wait = min(settings.ADMISSION_QUEUE_TIMEOUT, deadline - time.monotonic())
+        self.waiting += 1
         try:
-            # Выполнение эндпоинта
-            response = await call_next(request)
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=max(wait, 0))
+        except asyncio.TimeoutError:
+            return 503
+        finally:
+            self.waiting -= 1
+        return None
 
-            # Логируем успешный ответ
-            log_buffer.add_log("info", f"Response status: {response.status_code}")
-
-            if (
-                isinstance(response, StreamingResponse)
-                and request.url.path != "/api/v3/ftpNotifications"
-            ):
-                body = b""
-
-                async for chunk in response.body_iterator:
-                    body += chunk
-                # После того как мы собрали содержимое, его можно логировать
-                log_buffer.add_log(
-                    "info",
-                    f"Streaming Response body: {body.decode('utf-8', errors='ignore')}",
-                )
+    def release(self) -> None:
+        self._semaphore.release()
+
+
+def parse_route_limits(value: str) -> dict[str, tuple[int, int, float | None]]:
+    """
+    Разобрать ADMISSION_ROUTE_LIMITS: "путь=параллельность:очередь[:таймаут];...".
+
+    :param value: строка настроек
+    :return: dict[str, tuple[int, int, float | None]]
+    """
+    limits = {}
+    for item in filter(None, (part.strip() for part in value.split(";"))):
+        path, _, spec = item.partition("=")
+        parts = spec.split(":")
+        timeout = float(parts[2]) if len(parts) > 2 and parts[2] else None
+        limits[path.strip()] = (int(parts[0]), int(parts[1]), timeout)
+    return limits
+
+
+class AdmissionControlMiddleware:
+    """
+    Контроль допуска запросов: у тяжелых маршрутов свои слоты и короткие
+    очереди, все остальные делят общий лимит, поэтому всплеск массовых
+    запросов не занимает соединения postgres, нужные дешевым GET.
+
+    Когда очередь маршрута заполнена, запрос сразу получает 429, а если слот
+    не освободился за ADMISSION_QUEUE_TIMEOUT - 503. Дедлайн запроса
+    (таймаут маршрута или меньший X-Request-Timeout клиента) передается в БД
+    как statement_timeout через request_deadline.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.default_limit = RouteLimit(
+            settings.ADMISSION_DEFAULT_CONCURRENCY,
+            settings.ADMISSION_DEFAULT_QUEUE,
+            settings.REQUEST_TIMEOUT,
+        )
+        self.route_limits = {
+            path: RouteLimit(
+                concurrency, queue_size, timeout or settings.REQUEST_TIMEOUT
+            )
+            for path, (concurrency, queue_size, timeout) in {
+                **ROUTE_LIMITS,
+                **parse_route_limits(settings.ADMISSION_ROUTE_LIMITS),
+            }.items()
+        }
+
+    @staticmethod
+    def request_timeout(scope: Scope, limit: RouteLimit) -> float:
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-timeout":
+                try:
+                    timeout = float(value)
+                except ValueError:
+                    break
+                # nan, inf и неположительные значения игнорируются
+                if math.isfinite(timeout) and timeout > 0:
+                    return min(timeout, limit.timeout)
+                break
+        return limit.timeout
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.route_limits.get(scope["path"], self.default_limit)
+        deadline = time.monotonic() + self.request_timeout(scope, limit)
+        rejected = await limit.acquire(deadline)
+        if rejected is not None:
+            response = JSONResponse(
+                {"code": "OVERLOADED", "errorText": "Too many concurrent requests"},
+                status_code=rejected,
+                headers={"Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+
+        token = request_deadline.set(deadline)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_deadline.reset(token)
+            limit.release()
+
+
+class IdempotencyMiddleware:
+    """
+    Повтор запроса с тем же заголовком Idempotency-Key не выполняется заново:
+    ответ первого выполнения (кроме 5xx и 429) хранится в Redis и
+    возвращается сразу, без обращения к postgres, с заголовком
+    Idempotent-Replayed. Параллельный повтор ждет, пока первый запрос
+    завершится. Тот же ключ с другим телом запроса - 422.
+
+    Если Redis недоступен, запрос выполняется как обычно.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.store = idempotency_store
+
+    @staticmethod
+    def idempotency_key(scope: Scope) -> str | None:
+        for name, value in scope.get("headers", []):
+            if name == b"idempotency-key":
+                return value.decode("latin-1")
+        return None
+
+    @staticmethod
+    async def read_body(receive: Receive) -> bytes:
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                return body
+
+    @staticmethod
+    def is_storable(status: int) -> bool:
+        return status < 500 and status != 429
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        route = (scope.get("method"), scope.get("path"))
+        if scope["type"] != "http" or route not in IDEMPOTENT_ROUTES:
+            await self.app(scope, receive, send)
+            return
+        idempotency_key = self.idempotency_key(scope)
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not 0 < len(idempotency_key) <= 255:
+            response = JSONResponse(
+                {"code": "ERROR", "errorText": "Invalid Idempotency-Key"},
+                status_code=400,
+            )
+            await response(scope, receive, send)
+            return
+
+        body = await self.read_body(receive)
+        body_sent = False
+
+        async def replay_receive() -> dict:
+            nonlocal body_sent
+            if body_sent:
+                return await receive()
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
 
-                # Заново создаем StreamingResponse с оригинальным содержимым
-                response = StreamingResponse(
-                    content=iter([body]),
-                    status_code=response.status_code,
-                    headers=dict(response.headers),
+        fingerprint = hashlib.sha256(
+            scope.get("query_string", b"") + b"\n" + body
+        ).hexdigest()
+        key = self.store.key(scope["method"], scope["path"], idempotency_key)
+        token = uuid.uuid4().hex
+        try:
+            stored = await self.store.begin(key, token)
+        except IdempotencyInProgress:
+            response = JSONResponse(
+                {"code": "CONFLICT", "errorText": "Request is still in progress"},
+                status_code=409,
+                headers={"Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+        except (RedisError, OSError):
+            await self.app(scope, replay_receive, send)
+            return
+
+        if stored is not None:
+            if stored.fingerprint != fingerprint:
+                response = JSONResponse(
+                    {
+                        "code": "ERROR",
+                        "errorText": "Idempotency-Key is reused with another body",
+                    },
+                    status_code=422,
                 )
+                await response(scope, receive, send)
+                return
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": stored.status,
+                    "headers": stored.headers
+                    + [
+                        (b"content-length", str(len(stored.body)).encode()),
+                        (b"idempotent-replayed", b"true"),
+                    ],
+                }
+            )
+            await send({"type": "http.response.body", "body": stored.body})
+            return
 
-        except Exception as e:
-            error_trace = traceback.format_exc()
-            log_buffer.add_log("error", f"Ошибка:\n {error_trace}")
-            raise
+        status = 500
+        headers = []
+        response_body = b""
+
+        async def capture_send(message: dict) -> None:
+            nonlocal status, headers, response_body
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = [
+                    (name, value)
+                    for name, value in message.get("headers", [])
+                    if name.lower() != b"content-length"
+                ]
+            elif message["type"] == "http.response.body":
+                response_body += message.get("body", b"")
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
         finally:
-            execution_time = time.time() - start_time
-            log_buffer.add_log(
-                "info", f"Request completed in {execution_time:.4f} seconds\n\n"
+            try:
+                if self.is_storable(status):
+                    await self.store.save(
+                        key,
+                        token,
+                        StoredResponse(fingerprint, status, headers, response_body),
+                    )
+                else:
+                    await self.store.release(key, token)
+            except (RedisError, OSError):
+                # Блокировка истечет сама через IDEMPOTENCY_LOCK_TTL
+                pass
+
+
+class ProfilingMiddleware:
+    """
+    Профилирование запроса по заголовку X-Profile с подписанным токеном или
+    с вероятностью PROFILE_SAMPLE_RATE (см. src/profiling.py). Формат можно
+    выбрать заголовком X-Profile-Format: speedscope или pstats. Id профиля -
+    id запроса, он же возвращается в заголовке X-Profile-Id.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.enabled = bool(settings.PROFILE_SECRET_KEY) or (
+            settings.PROFILE_SAMPLE_RATE > 0
+        )
+
+    def should_profile(self, headers: dict[bytes, bytes]) -> bool:
+        token = headers.get(b"x-profile")
+        if token is not None and verify_profile_token(token.decode("latin-1")):
+            return True
+        return random.random() < settings.PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers", []))
+        profile = None
+        if self.should_profile(headers):
+            output = headers.get(b"x-profile-format", b"").decode("latin-1")
+            profile = profiler.start(
+                request_id=request_id.get() or uuid.uuid4().hex,
+                method=scope["method"],
+                path=scope["path"],
+                output=output or settings.PROFILE_FORMAT,
             )
-            # Запись логов в конце выполнения запроса
-            await log_to_file(logger, log_buffer.logs)
-            log_buffer.clear()
+        if profile is None:
+            await self.app(scope, receive, send)
+            return
 
-        return response
+        async def profiled_send(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile.request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        token = current_profile.set(profile)
+        try:
+            await self.app(scope, receive, profiled_send)
+        finally:
+            current_profile.reset(token)
+            profiler.stop(profile)
+            try:
+                await asyncio.to_thread(profile.write, settings.PROFILE_DIR)
+            except OSError:
+                pass
+
+
+class RequestIdMiddleware:
+    """
+    Id запроса: X-Request-ID клиента или новый. Доступен как request_id
+    (src.setup_logger) для логов и спанов и возвращается в X-Request-ID.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        value = None
+        for name, header in scope.get("headers", []):
+            if name == b"x-request-id":
+                value = header.decode("latin-1")[:64]
+                break
+        value = value or uuid.uuid4().hex
+
+        async def send_with_id(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-request-id", value.encode("latin-1"))
+                ]
+            await send(message)
+
+        token = request_id.set(value)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id.reset(token)
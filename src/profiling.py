@@ -0,0 +1,396 @@
+"""
+Профилирование отдельных запросов по требованию.
+
+Запрос профилируется, если у него есть заголовок X-Profile с действующим
+токеном (см. sign_profile_token) или он попал в выборку PROFILE_SAMPLE_RATE.
+Пока идет хотя бы один профиль, фоновый поток раз в PROFILE_INTERVAL снимает
+стеки задач asyncio этого запроса: у выполняющейся задачи - стек потока
+event loop, у ожидающей - цепочку await (так видно и время ожидания БД).
+Параллельно записываются SQL-запросы с длительностью.
+
+Результат - файлы в PROFILE_DIR: <имя>.speedscope.json (https://speedscope.app)
+или <имя>.pstats (python -m pstats) и <имя>.json с id запроса и запросами к БД.
+Когда профилей нет, не работает ни поток, ни обработчики событий.
+
+Токен для заголовка:
+    python -m src.profiling --ttl 600
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import marshal
+import os
+import sys
+import threading
+import time
+import weakref
+from contextvars import ContextVar
+from datetime import datetime
+
+import orjson
+from sqlalchemy import event
+
+from config import settings
+from src.database import engine, replica_set
+
+current_profile: ContextVar["RequestProfile | None"] = ContextVar(
+    "current_profile", default=None
+)
+
+
+def sign_profile_token(expires: int, secret: str = settings.PROFILE_SECRET_KEY) -> str:
+    """
+    Подписать токен для заголовка X-Profile.
+
+    :param expires: unix-время, до которого токен действует
+    :param secret: PROFILE_SECRET_KEY
+    :return: str - "<expires>.<hmac-sha256>"
+    """
+    signature = hmac.new(secret.encode(), str(expires).encode(), hashlib.sha256)
+    return f"{expires}.{signature.hexdigest()}"
+
+
+def verify_profile_token(token: str, secret: str = settings.PROFILE_SECRET_KEY) -> bool:
+    if not secret:
+        return False
+    expires, _, _ = token.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(token, sign_profile_token(int(expires), secret))
+
+
+def _coroutine_frame(awaitable):
+    for name in ("cr_frame", "gi_frame", "ag_frame"):
+        frame = getattr(awaitable, name, None)
+        if frame is not None:
+            return frame
+    return None
+
+
+def _awaited(awaitable):
+    for name in ("cr_await", "gi_yieldfrom", "ag_await"):
+        awaited = getattr(awaitable, name, None)
+        if awaited is not None:
+            return awaited
+    return None
+
+
+class RequestProfile:
+    """Стеки и SQL-запросы одного запроса."""
+
+    def __init__(self, request_id: str, method: str, path: str, output: str):
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.output = output
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.status: int | None = None
+        self.tasks: weakref.WeakSet[asyncio.Task] = weakref.WeakSet()
+        self.frames: dict[tuple, int] = {}
+        # Имя задачи -> [(стек из индексов frames от корня к листу, вес в секундах)]
+        self.samples: dict[str, list[tuple[tuple[int, ...], float]]] = {}
+        self.queries: list[dict] = []
+
+    def _frame_index(self, code) -> int:
+        key = (code.co_filename, code.co_firstlineno, code.co_name)
+        index = self.frames.get(key)
+        if index is None:
+            index = self.frames[key] = len(self.frames)
+        return index
+
+    def _thread_stack(self, frame) -> tuple[int, ...]:
+        stack = []
+        while frame is not None:
+            stack.append(self._frame_index(frame.f_code))
+            frame = frame.f_back
+        return tuple(reversed(stack))
+
+    def _await_stack(self, task: asyncio.Task) -> tuple[int, ...]:
+        stack = []
+        awaitable = task.get_coro()
+        while awaitable is not None:
+            frame = _coroutine_frame(awaitable)
+            if frame is None:
+                # Future, сокет и т.п.: лист стека - тип ожидаемого объекта
+                key = ("<await>", 0, type(awaitable).__name__)
+                index = self.frames.get(key)
+                if index is None:
+                    index = self.frames[key] = len(self.frames)
+                stack.append(index)
+                break
+            stack.append(self._frame_index(frame.f_code))
+            awaitable = _awaited(awaitable)
+        return tuple(stack)
+
+    def sample(self, running: asyncio.Task | None, loop_frame, weight: float) -> None:
+        for task in list(self.tasks):
+            if task.done():
+                continue
+            if task is running:
+                if loop_frame is None:
+                    continue
+                stack = self._thread_stack(loop_frame)
+            else:
+                stack = self._await_stack(task)
+            if stack:
+                self.samples.setdefault(task.get_name(), []).append((stack, weight))
+
+    def metadata(self) -> dict:
+        return {
+            "request_id": self.request_id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration * 1000, 3),
+            "samples": sum(len(samples) for samples in self.samples.values()),
+            "query_count": len(self.queries),
+            "query_ms": round(sum(query["ms"] for query in self.queries), 3),
+            "queries": self.queries,
+        }
+
+    def to_speedscope(self) -> bytes:
+        frames = [
+            {"name": name, "file": file, "line": line}
+            for file, line, name in self.frames
+        ]
+        profiles = []
+        for task_name, samples in self.samples.items():
+            weights = [weight * 1000 for _, weight in samples]
+            profiles.append(
+                {
+                    "type": "sampled",
+                    "name": task_name,
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": [list(stack) for stack, _ in samples],
+                    "weights": weights,
+                }
+            )
+        return orjson.dumps(
+            {
+                "$schema": "https://www.speedscope.app/file-format-schema.json",
+                "name": f"{self.method} {self.path} {self.request_id}",
+                "exporter": "uis-profiling",
+                "activeProfileIndex": 0,
+                "shared": {"frames": frames},
+                "profiles": profiles,
+                "metadata": self.metadata(),
+            }
+        )
+
+    def to_pstats(self) -> bytes:
+        """
+        Статистика в формате marshal для pstats.Stats: количество вызовов -
+        число выборок с функцией, время - сумма весов этих выборок.
+        """
+        functions = list(self.frames)
+        stats: dict[tuple, list] = {}
+        for samples in self.samples.values():
+            for stack, weight in samples:
+                seen = set()
+                for depth, index in enumerate(stack):
+                    func = functions[index]
+                    entry = stats.setdefault(func, [0, 0, 0.0, 0.0, {}])
+                    is_leaf = depth == len(stack) - 1
+                    if is_leaf:
+                        entry[2] += weight
+                    if func not in seen:
+                        seen.add(func)
+                        entry[0] += 1
+                        entry[1] += 1
+                        entry[3] += weight
+                    if depth:
+                        caller = functions[stack[depth - 1]]
+                        calls = entry[4].setdefault(caller, [0, 0, 0.0, 0.0])
+                        calls[0] += 1
+                        calls[1] += 1
+                        calls[2] += weight if is_leaf else 0.0
+                        calls[3] += weight
+        return marshal.dumps(
+            {
+                func: (
+                    cc,
+                    nc,
+                    tt,
+                    ct,
+                    {caller: tuple(calls) for caller, calls in callers.items()},
+                )
+                for func, (cc, nc, tt, ct, callers) in stats.items()
+            }
+        )
+
+    def write(self, directory: str) -> str:
+        """
+        Записать профиль и метаданные.
+
+        :param directory: каталог для файлов
+        :return: str - путь к файлу профиля
+        """
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(
+            directory,
+            f"{self.started_at:%Y%m%d-%H%M%S}_{self.request_id}",
+        )
+        if self.output == "pstats":
+            path, content = f"{base}.pstats", self.to_pstats()
+        else:
+            path, content = f"{base}.speedscope.json", self.to_speedscope()
+        with open(path, "wb") as f:
+            f.write(content)
+        with open(f"{base}.json", "wb") as f:
+            f.write(orjson.dumps(self.metadata(), option=orjson.OPT_INDENT_2))
+        return path
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_profile.get() is not None:
+        conn.info["profile_query_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile.get()
+    started = conn.info.pop("profile_query_started", None)
+    if profile is None or started is None:
+        return
+    profile.queries.append(
+        {
+            "offset_ms": round((started - profile.started) * 1000, 3),
+            "ms": round((time.perf_counter() - started) * 1000, 3),
+            "rows": cursor.rowcount,
+            "statement": statement[: settings.PROFILE_MAX_STATEMENT_LENGTH],
+        }
+    )
+
+
+class Profiler:
+    """
+    Профили запросов текущего процесса. Первый начатый профиль включает
+    поток выборки, фабрику задач и события SQLAlchemy, последний
+    завершенный - выключает.
+    """
+
+    def __init__(
+        self,
+        interval: float = settings.PROFILE_INTERVAL,
+        max_active: int = settings.PROFILE_MAX_ACTIVE,
+    ):
+        self.interval = interval
+        self.max_active = max_active
+        self.active: list[RequestProfile] = []
+        self._lock = threading.Lock()
+        self._stop: threading.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._previous_factory = None
+
+    def _task_factory(self, loop, coro, context=None):
+        if self._previous_factory is not None:
+            if context is None:
+                task = self._previous_factory(loop, coro)
+            else:
+                task = self._previous_factory(loop, coro, context=context)
+        else:
+            task = asyncio.Task(coro, loop=loop, context=context)
+        # Фабрика вызывается в контексте создающей задачи: дочерние задачи
+        # запроса (например, call_next в BaseHTTPMiddleware) попадают в профиль
+        profile = current_profile.get()
+        if profile is not None:
+            with self._lock:
+                profile.tasks.add(task)
+        return task
+
+    def _run(self, loop: asyncio.AbstractEventLoop, thread_id: int, stop) -> None:
+        last = time.perf_counter()
+        while not stop.wait(self.interval):
+            now = time.perf_counter()
+            weight, last = now - last, now
+            loop_frame = sys._current_frames().get(thread_id)
+            running = asyncio.tasks._current_tasks.get(loop)
+            with self._lock:
+                for profile in self.active:
+                    profile.sample(running, loop_frame, weight)
+
+    @staticmethod
+    def _engines() -> list:
+        return [engine.sync_engine] + [
+            replica.sync_engine for replica in replica_set.engines
+        ]
+
+    def _enable(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._previous_factory = self._loop.get_task_factory()
+        self._loop.set_task_factory(self._task_factory)
+        # Чтение может уйти на реплику, поэтому запросы слушаются на всех движках
+        for sync_engine in self._engines():
+            event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+        self._stop = threading.Event()
+        threading.Thread(
+            target=self._run,
+            args=(self._loop, threading.get_ident(), self._stop),
+            name="request-profiler",
+            daemon=True,
+        ).start()
+
+    def _disable(self) -> None:
+        self._stop.set()
+        self._stop = None
+        for sync_engine in self._engines():
+            event.remove(sync_engine, "before_cursor_execute", _before_cursor_execute)
+            event.remove(sync_engine, "after_cursor_execute", _after_cursor_execute)
+        self._loop.set_task_factory(self._previous_factory)
+        self._loop = None
+        self._previous_factory = None
+
+    def start(
+        self, request_id: str, method: str, path: str, output: str
+    ) -> RequestProfile | None:
+        """
+        Начать профиль текущей задачи.
+
+        :return: RequestProfile или None, если уже идет max_active профилей
+        """
+        if len(self.active) >= self.max_active:
+            return None
+        profile = RequestProfile(request_id, method, path, output)
+        profile.tasks.add(asyncio.current_task())
+        with self._lock:
+            self.active.append(profile)
+        if len(self.active) == 1:
+            self._enable()
+        return profile
+
+    def stop(self, profile: RequestProfile) -> None:
+        profile.duration = time.perf_counter() - profile.started
+        with self._lock:
+            self.active.remove(profile)
+        if not self.active:
+            self._disable()
+
+    def reset_after_fork(self) -> None:
+        self.active = []
+        self._lock = threading.Lock()
+        self._stop = None
+        self._loop = None
+        self._previous_factory = None
+
+
+profiler = Profiler()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Токен для заголовка X-Profile")
+    parser.add_argument("--ttl", type=int, default=600, help="время жизни, секунд")
+    args = parser.parse_args()
+    if not settings.PROFILE_SECRET_KEY:
+        sys.exit("PROFILE_SECRET_KEY is not set")
+    print(sign_profile_token(int(time.time()) + args.ttl))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,34 @@
 import functools
-import traceback
+import inspect
+import itertools
+import random
+import reprlib
+import time
+from contextvars import ContextVar
+from datetime import datetime
 from typing import Callable, Union, Any
 
 from aiologger import Logger
 from aiologger.handlers.files import AsyncFileHandler
 import os
-import shutil
 import asyncio
 import logging
 
+import orjson
 from fastapi import UploadFile
 
+from config import settings
+from src.log_segments import compress_segments, segment_name
+
+# Id запроса для связи записей лога и спанов; ставит RequestIdMiddleware
+request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+
 
 class CustomFormatter(logging.Formatter):
     def format(self, record) -> str:
         record.message = record.get_message()
+        # Запись форматируется в задаче, созданной в контексте вызова лога
+        record.request_id = request_id.get() or "-"
         if self.usesTime():
             record.asctime = self.formatTime(record, self.datefmt)
         s = self.formatMessage(record)
@@ -34,12 +48,41 @@ class CustomFormatter(logging.Formatter):
         return s
 
 
+class JsonFormatter(logging.Formatter):
+    """
+    Запись - одна строка JSON (LOG_FORMAT=json). Сообщение-словарь
+    разворачивается в поля записи, остальные пишутся в поле message.
+    """
+
+    def format(self, record) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": request_id.get(),
+        }
+        message = record.msg
+        if isinstance(message, dict):
+            entry.update(message)
+        elif isinstance(message, SpanMessage):
+            entry.update(message.as_dict())
+        else:
+            entry["message"] = record.get_message()
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry, default=str).decode()
+
+
+# Logger процесса: создается один раз и переиспользуется
 logger = None
 
 
-async def setup_logger() -> Logger | Any:
+def get_logger() -> Logger:
     global logger
-    logger = Logger(name="UIS")
+    if logger is None:
+        logger = Logger(name="UIS")
 
     if not logger.handlers:
         current_directory = os.getcwd()
@@ -50,10 +93,15 @@ async def setup_logger() -> Logger | Any:
         )
         # Устанавливаем нужный формат для логов
         # Задайте форматирование для лога
-        log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+        log_format = (
+            "%(asctime)s - %(name)s - %(levelname)s - %(request_id)s - %(message)s"
+        )
         date_format = "%Y-%m-%d %H:%M:%S"  # Формат даты и времени с миллисекундами
 
-        formatter = CustomFormatter(fmt=log_format, datefmt=date_format)
+        if settings.LOG_FORMAT == "json":
+            formatter = JsonFormatter()
+        else:
+            formatter = CustomFormatter(fmt=log_format, datefmt=date_format)
 
         rotating_handler.formatter = formatter
         logger.add_handler(rotating_handler)
@@ -61,6 +109,10 @@ async def setup_logger() -> Logger | Any:
     return logger
 
 
+async def setup_logger() -> Logger | Any:
+    return get_logger()
+
+
 class RotatingAsyncFileHandler(AsyncFileHandler):
     def __init__(self, filename, max_bytes=1 * 1024 * 1024, backup_count=10, **kwargs):
         super().__init__(filename=filename, **kwargs)
@@ -71,9 +123,25 @@ class RotatingAsyncFileHandler(AsyncFileHandler):
 
     async def emit(self, record) -> None:
         async with self._lock:
+            await self._reopen_if_replaced()
             await self._rotate_logs_if_needed()
             await super().emit(record)
 
+    async def _reopen_if_replaced(self) -> None:
+        # В лог пишут все воркеры gunicorn, а ротирует его первый, кто увидел
+        # превышение размера: остальные замечают, что файл по имени уже
+        # другой (или его нет), и переоткрывают его, как WatchedFileHandler
+        if not self.initialized:
+            return
+        try:
+            current = os.stat(self.filename)
+        except FileNotFoundError:
+            await self.close()
+            return
+        opened = os.fstat(self.stream.fileno())
+        if (current.st_dev, current.st_ino) != (opened.st_dev, opened.st_ino):
+            await self.close()
+
     async def _rotate_logs_if_needed(self) -> None:
 
         if (
@@ -83,25 +151,37 @@ class RotatingAsyncFileHandler(AsyncFileHandler):
             await self._rotate_logs()
 
     async def _rotate_logs(self) -> None:
-        # Удаляем старый самый "древний" лог (если backup_count > 0)
-        if self.backup_count > 0:
-            oldest_log = f"{self.filename}.{self.backup_count}"
-            if os.path.exists(oldest_log):
-                os.remove(oldest_log)
-
-            # Переименовываем файлы с обратного порядка
-            for i in range(self.backup_count - 1, 0, -1):
-                src = f"{self.filename}.{i}"
-                dst = f"{self.filename}.{i + 1}"
-                if os.path.exists(src):
-                    shutil.move(src, dst)
-
-            # Переименовываем текущий лог-файл
-            shutil.move(self.filename, f"{self.filename}.1")
-            if not os.path.exists(self.filename):
-                open(self.filename, "a").close()
-            # Обновляем имя файла в обработчике
-            self.stream = open(self.filename, "a")
+        if self.backup_count <= 0:
+            return
+        # Поток закрывается, AsyncFileHandler откроет новый файл при записи
+        await self.close()
+        try:
+            os.replace(self.filename, segment_name(self.filename))
+        except FileNotFoundError:
+            # Лог одновременно ротировал другой воркер
+            return
+        # Сжатие, индекс и удаление старых сегментов - в фоне, запись в лог
+        # их не ждет. Сегмент сжимается не раньше чем через
+        # LOG_SEGMENT_GRACE секунд: другие воркеры могут дописывать в него,
+        # пока не заметили ротацию
+        asyncio.get_running_loop().call_later(
+            settings.LOG_SEGMENT_GRACE + 1, self._compress_segments
+        )
+
+    def _compress_segments(self) -> None:
+        future = asyncio.get_running_loop().run_in_executor(
+            None, compress_segments, self.filename, self.backup_count
+        )
+        future.add_done_callback(self._log_compress_error)
+
+    @staticmethod
+    def _log_compress_error(future: asyncio.Future) -> None:
+        # Иначе ошибка сжатия (нет места, нет прав) пропала бы молча
+        if future.cancelled() or future.exception() is None:
+            return
+        get_logger().error(
+            "Не удалось сжать сегменты лога", exc_info=future.exception()
+        )
 
 
 def log_bytes_info(file: Union[UploadFile, bytes], additional_info: str = "") -> str:
@@ -117,40 +197,186 @@ def log_bytes_info(file: Union[UploadFile, bytes], additional_info: str = "") ->
         return f"{additional_info} Unknown file type"
 
 
-def logger(func: Callable) -> Any:
-    @functools.wraps(func)
-    async def wrapper(*args, **kwargs) -> Any:
-        logger_log = await setup_logger()
+_span_ids = itertools.count(1)
+_arg_repr = reprlib.Repr()
+_arg_repr.maxstring = settings.TRACE_MAX_ARG_LENGTH
+_arg_repr.maxother = settings.TRACE_MAX_ARG_LENGTH
 
-        args_info = [
-            (
-                log_bytes_info(arg, additional_info="Received argument")
-                if isinstance(arg, (UploadFile, bytes))
-                else str(arg)
-            )
-            for arg in args
-        ]
-        kwargs_info = {
-            k: (
-                log_bytes_info(v, additional_info="Received keyword argument")
-                if isinstance(v, (UploadFile, bytes))
-                else v
-            )
-            for k, v in kwargs.items()
+
+class Span:
+    """Вызов функции под trace: id, родитель и время выполнения."""
+
+    __slots__ = ("name", "span_id", "parent_id", "trace_id", "args", "kwargs")
+
+    def __init__(self, name: str, parent: "Span | None", args, kwargs):
+        self.name = name
+        self.span_id = next(_span_ids)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = request_id.get() or (
+            parent.trace_id if parent is not None else f"span-{self.span_id}"
+        )
+        self.args = args
+        self.kwargs = kwargs
+
+
+# False - вызов верхнего уровня не попал в выборку, вложенные тоже не пишутся
+current_span: ContextVar[Span | bool | None] = ContextVar("current_span", default=None)
+
+
+def format_arg(value: Any) -> str:
+    if isinstance(value, (UploadFile, bytes)):
+        return log_bytes_info(value).strip()
+    return _arg_repr.repr(value)[: settings.TRACE_MAX_ARG_LENGTH]
+
+
+class SpanMessage:
+    """Сообщение о спане; аргументы форматируются, только когда запись пишется."""
+
+    __slots__ = ("span", "duration", "result", "error")
+
+    def __init__(self, span: Span, duration: float, result: Any, error: str | None):
+        self.span = span
+        self.duration = duration
+        self.result = result
+        self.error = error
+
+    def format_args(self) -> str:
+        return ", ".join(
+            [format_arg(arg) for arg in self.span.args]
+            + [f"{key}={format_arg(value)}" for key, value in self.span.kwargs.items()]
+        )
+
+    def as_dict(self) -> dict:
+        span = self.span
+        entry = {
+            "request_id": span.trace_id,
+            "span": span.span_id,
+            "parent": span.parent_id,
+            "name": span.name,
+            "args": self.format_args(),
+            "duration_ms": round(self.duration * 1000, 3),
         }
+        if self.error is not None:
+            entry["error"] = self.error
+        else:
+            entry["result"] = format_arg(self.result)
+        return entry
 
-        try:
-            await logger_log.info(
-                f"Вызов функции {func.__name__} с аргументами: {args_info}, ключевыми аргументами: {kwargs_info}"
-            )
-            result = await func(*args, **kwargs)
-            await logger_log.info(f"Функция {func.__name__} вернула: {result}")
-            return result
-        except Exception as e:
-            error_trace = traceback.format_exc()
-            await logger_log.error(
-                f"Ошибка в функции {func.__name__}: {str(e)}\nТрассировка: {error_trace}"
+    def __str__(self) -> str:
+        span = self.span
+        message = (
+            f"trace={span.trace_id} span={span.span_id} parent={span.parent_id} "
+            f"{span.name}({self.format_args()}) {self.duration * 1000:.3f}ms"
+        )
+        if self.error is not None:
+            return f"{message} error: {self.error}"
+        return f"{message} -> {format_arg(self.result)}"
+
+
+def _emit(message: SpanMessage, error: BaseException | None = None) -> None:
+    try:
+        log = get_logger()
+        if error is None:
+            log.info(message)
+        elif getattr(error, "__traced__", False):
+            # Трассировка уже записана вложенным спаном
+            log.error(message)
+        else:
+            try:
+                error.__traced__ = True
+            except AttributeError:
+                pass
+            log.error(message, exc_info=error)
+    except Exception:
+        # Сбой записи (в том числе нет запущенного event loop) не должен
+        # ломать трассируемую функцию
+        pass
+
+
+def trace(
+    func: Callable | None = None,
+    *,
+    name: str | None = None,
+    sample_rate: float | None = None,
+) -> Any:
+    """
+    Декоратор трассировки для async и обычных функций.
+
+    Решение о записи принимается один раз на верхнем вызове с вероятностью
+    sample_rate (по умолчанию TRACE_SAMPLE_RATE); вложенные вызовы под trace
+    пишутся вместе с ним как дочерние спаны с тем же trace (id запроса).
+    Аргументы и результат форматируются лениво, с ограничением длины
+    TRACE_MAX_ARG_LENGTH. Исключения пишутся всегда.
+
+        @trace
+        async def get_file(...): ...
+
+        @trace(sample_rate=0.001)
+        def encode(...): ...
+    """
+
+    def decorate(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+        rate = settings.TRACE_SAMPLE_RATE if sample_rate is None else sample_rate
+
+        def enter(args, kwargs) -> tuple[Span | None, Any]:
+            parent = current_span.get()
+            if parent is False:
+                return None, None
+            if parent is None and random.random() >= rate:
+                return None, current_span.set(False)
+            span = Span(span_name, parent, args, kwargs)
+            return span, current_span.set(span)
+
+        def exit_(span, started, result, error) -> None:
+            _emit(
+                SpanMessage(
+                    span,
+                    time.perf_counter() - started,
+                    result,
+                    None if error is None else repr(error),
+                ),
+                error,
             )
-            raise e
 
-    return wrapper
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs) -> Any:
+                span, token = enter(args, kwargs)
+                started = time.perf_counter()
+                try:
+                    result = await func(*args, **kwargs)
+                except Exception as e:
+                    exit_(span or Span(span_name, None, args, kwargs), started, None, e)
+                    raise
+                finally:
+                    if token is not None:
+                        current_span.reset(token)
+                if span is not None:
+                    exit_(span, started, result, None)
+                return result
+
+        else:
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs) -> Any:
+                span, token = enter(args, kwargs)
+                started = time.perf_counter()
+                try:
+                    result = func(*args, **kwargs)
+                except Exception as e:
+                    exit_(span or Span(span_name, None, args, kwargs), started, None, e)
+                    raise
+                finally:
+                    if token is not None:
+                        current_span.reset(token)
+                if span is not None:
+                    exit_(span, started, result, None)
+                return result
+
+        return wrapper
+
+    if func is not None:
+        return decorate(func)
+    return decorate
@@ -0,0 +1,53 @@
+import asyncio
+import gc
+
+from src.api.services.bucket_tiering import reset_minio_client
+from src.api.services.dictionary_cache import dictionary_cache
+from src.api.services.file_search_index import reset_es_client
+from src.api.services.ftp_ingest import reset_ftp_ingest_poller
+from src.api.services.redis_client import reset_redis_client
+from src.api.services.rel_db_engines import rel_db_engines
+from src.api.services.uow import UnitOfWork
+from src.database import SessionLocal, reset_engines_after_fork
+from src.profiling import profiler
+
+
+async def warm_up() -> None:
+    """
+    Прогреть кэши, которые иначе заполнит первый запрос каждого воркера.
+
+    :return: None
+    """
+    async with UnitOfWork(SessionLocal) as uow:
+        await dictionary_cache.refresh_if_stale(uow.dictionary)
+        await uow.reference_data.get_reference_snapshot()
+
+
+def prepare_master() -> None:
+    """
+    Подготовить мастер-процесс gunicorn к fork воркеров: прогреть кэши и
+    заморозить уже созданные объекты, чтобы сборщик мусора в воркерах не
+    трогал их страницы памяти и они оставались общими (copy-on-write).
+
+    :return: None
+    """
+    asyncio.run(warm_up())
+    gc.collect()
+    gc.freeze()
+
+
+def reset_after_fork() -> None:
+    """
+    Сбросить в воркере все, что привязано к соединениям, сокетам и event loop
+    мастер-процесса. Прогретые данные кэшей остаются.
+
+    :return: None
+    """
+    reset_engines_after_fork()
+    rel_db_engines.reset_after_fork()
+    dictionary_cache.reset_after_fork()
+    reset_es_client()
+    reset_minio_client()
+    reset_ftp_ingest_poller()
+    reset_redis_client()
+    profiler.reset_after_fork()